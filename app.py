@@ -1,19 +1,41 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import time
+_MODULE_LOAD_START = time.perf_counter()  # 콜드 스타트 측정 기준점
 
 import sqlite3
 import requests
 import json
+import click
 import re
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, g, Response
+from flask import before_render_template, template_rendered
+from werkzeug.local import LocalProxy
 import os
+import sys
 import csv
 import io
 from urllib.parse import quote
 import threading
 import uuid
-import time
+import functools
+import logging
+import logging.handlers
+import queue
+import atexit
+import copy
+import contextvars
+import hashlib
+import gzip
+import zlib
+import base64
+import binascii
+from collections import OrderedDict
+import bisect
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, urljoin
+from contextlib import contextmanager
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'
@@ -28,73 +50,1594 @@ app.config['MAX_CONTENT_PATH'] = 5 * 1024 * 1024
 NAVER_CLIENT_ID = os.getenv('NAVER_CLIENT_ID', 'IvsMX1RyTuWZiGR6Reot')  # 네이버 개발자센터에서 발급
 NAVER_CLIENT_SECRET = os.getenv('NAVER_CLIENT_SECRET', '4CqizzHQ2J')  # 네이버 개발자센터에서 발급
 
-class BookTracker:
-    def __init__(self, db_path='books.db'):
+# 응답 압축 (brotli 패키지가 설치되어 있으면 br도 지원)
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 표지 대표색 계산용 (requirements.txt에 포함, 설치되지 않은 환경에서는 대표색 계산을 건너뛰고 회색 자리표시자 사용)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/plain', 'text/csv', 'application/x-ndjson'}
+
+# 외부 API 주소 (로컬 스텁 서버로 벤치마크할 때 환경변수로 교체)
+NAVER_API_BASE_URL = os.getenv('NAVER_API_BASE_URL', 'https://openapi.naver.com').rstrip('/')
+GOOGLE_BOOKS_API_BASE_URL = os.getenv('GOOGLE_BOOKS_API_BASE_URL', 'https://www.googleapis.com').rstrip('/')
+
+# ============== 로깅 ==============
+# 환경변수로 설정합니다.
+#   LOG_LEVEL=INFO                                        기본 레벨 (운영 기본값은 요약 로그만 출력)
+#   LOG_LEVELS=booktracker.search=DEBUG,booktracker.db=WARNING   로거별 레벨
+#   LOG_FORMAT=text|json                                  출력 형식
+#   LOG_SAMPLE_EVERY=20,booktracker.search=100            DEBUG 로그 샘플링 (메시지 템플릿별 N건 중 1건)
+
+# LogRecord 기본 속성 (이 외의 속성은 extra로 전달된 구조화 필드로 취급)
+_LOG_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+def _parse_logger_settings(value):
+    """'기본값,로거=값,...' 형식 파싱 -> (기본값, {로거: 값})"""
+    default, per_logger = None, {}
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            per_logger[name.strip()] = setting.strip()
+        else:
+            default = item
+    return default, per_logger
+
+class StructuredFormatter(logging.Formatter):
+    """레벨/로거/메시지 뒤에 구조화 필드를 key=value (또는 JSON)로 출력"""
+
+    def __init__(self, as_json=False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _LOG_RECORD_ATTRS}
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}"
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if self.as_json:
+            payload = {'ts': timestamp, 'level': record.levelname, 'logger': record.name, 'msg': message}
+            payload.update(fields)
+            if record.exc_text:
+                payload['exc'] = record.exc_text
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name} {message}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+class SamplingFilter(logging.Filter):
+    """대량 발생하는 DEBUG 로그를 메시지 템플릿별로 N건 중 1건만 통과 (INFO 이상은 항상 통과)"""
+
+    def __init__(self, default_every=1, per_logger=None):
+        super().__init__()
+        self.default_every = default_every
+        self.per_logger = per_logger or {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _every_for(self, name):
+        # 가장 구체적인(긴) 로거 이름 설정 우선
+        while name:
+            if name in self.per_logger:
+                return self.per_logger[name]
+            name = name.rpartition('.')[0]
+        return self.default_every
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        every = self._every_for(record.name)
+        if every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+        if count % every != 1:
+            return False
+        record.sampled = f"1/{every}"
+        return True
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """메시지와 예외 문자열만 요청 스레드에서 확정하고, 포맷과 출력은 리스너 스레드에 맡김"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_log_listener = None
+
+def configure_logging():
+    """booktracker 로거 설정 - 큐 핸들러로 출력 I/O를 요청 스레드 밖으로 분리"""
+    global _log_listener
+    root_logger = logging.getLogger('booktracker')
+    if _log_listener is not None:
+        return root_logger
+
+    default_level, per_logger_levels = _parse_logger_settings(os.getenv('LOG_LEVELS', ''))
+    root_logger.setLevel((default_level or os.getenv('LOG_LEVEL', 'INFO')).upper())
+    for name, level in per_logger_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    default_every, per_logger_every = _parse_logger_settings(os.getenv('LOG_SAMPLE_EVERY', ''))
+    sampling = SamplingFilter(int(default_every or 1), {name: int(every) for name, every in per_logger_every.items()})
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(as_json=os.getenv('LOG_FORMAT', 'text').lower() == 'json'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(sampling)
+    root_logger.addHandler(queue_handler)
+    root_logger.propagate = False
+
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    return root_logger
+
+configure_logging()
+search_logger = logging.getLogger('booktracker.search')
+db_logger = logging.getLogger('booktracker.db')
+bulk_logger = logging.getLogger('booktracker.bulk')
+job_logger = logging.getLogger('booktracker.jobs')
+app_logger = logging.getLogger('booktracker.app')
+
+# ============== 메트릭 (Prometheus 텍스트 형식) ==============
+# 프로세스 단위로 집계됩니다. gunicorn 워커를 여러 개 띄우면 /metrics는 응답한 워커의 값만 보여줍니다.
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, values, extra=None):
+    """Prometheus 레이블 문자열 생성"""
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value):
+    """숫자를 Prometheus 표기로 변환"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """단조 증가 카운터"""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+class Gauge(Counter):
+    """임의로 설정 가능한 게이지"""
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    """누적 버킷 히스토그램"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}  # 레이블 -> [버킷별 개수..., 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))]), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), state[-2]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), state[-1]
+
+class MetricsRegistry:
+    """메트릭 등록 및 텍스트 출력"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+UPSTREAM_REQUESTS = metrics.counter(
+    'booktracker_upstream_requests_total', '외부 API 요청 수', ('provider', 'status'))
+UPSTREAM_ERRORS = metrics.counter(
+    'booktracker_upstream_errors_total', '외부 API 오류 수 (HTTP 4xx/5xx 또는 예외)', ('provider', 'reason'))
+UPSTREAM_LATENCY = metrics.histogram(
+    'booktracker_upstream_request_duration_seconds', '외부 API 응답 시간', ('provider',))
+CACHE_REQUESTS = metrics.counter(
+    'booktracker_cache_requests_total', '캐시 조회 수 (hit/miss)', ('cache', 'result'))
+DB_OPERATION_LATENCY = metrics.histogram(
+    'booktracker_db_operation_duration_seconds', 'BookTracker SQLite 작업 시간', ('method',))
+DB_OPERATION_ERRORS = metrics.counter(
+    'booktracker_db_operation_errors_total', 'BookTracker SQLite 작업 예외 수', ('method',))
+ROUTE_LATENCY = metrics.histogram(
+    'booktracker_http_request_duration_seconds', '라우트별 응답 시간', ('route', 'method', 'status'))
+BACKGROUND_BOOKS = metrics.counter(
+    'booktracker_background_books_processed_total', '백그라운드 업데이트로 처리한 책 수', ('result',))
+BACKGROUND_JOBS = metrics.counter(
+    'booktracker_background_jobs_total', '종료된 백그라운드 업데이트 작업 수', ('status',))
+PROCESS_START_TIME = metrics.gauge(
+    'booktracker_process_start_time_seconds', '프로세스 시작 시각 (unix time)')
+PROCESS_START_TIME.set(time.time())
+SINGLEFLIGHT_CALLS = metrics.counter(
+    'booktracker_singleflight_calls_total', '동시 중복 조회 합치기 결과 (leader: 직접 조회, shared: 다른 호출 결과 공유)',
+    ('scope', 'role'))
+MAINTENANCE_ROWS = metrics.counter(
+    'booktracker_maintenance_total', '주기 정리 결과 (요약한 작업, 삭제한 로그/작업, 반환한 페이지 수, 갱신/확인/깨진 필드 수, 채운 표지 대표색 수)', ('action',))
+QUOTA_REMAINING = metrics.gauge(
+    'booktracker_provider_quota_remaining', '외부 API 호출 예산 남은 양 (scope: second:<제공자> 또는 day:<한도 그룹>)', ('scope',))
+TIME_TO_FIRST_REQUEST = metrics.gauge(
+    'booktracker_time_to_first_request_seconds', '앱 모듈 로드 시작부터 첫 요청 처리 시작까지 걸린 시간')
+
+def record_cache_lookup(cache_name, hit):
+    """캐시 적중 여부 기록 (적중률 = hit / (hit + miss))"""
+    CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
+
+def stats_month():
+    """이번 달 통계(added_this_month)가 기준으로 삼는 달 - SQLite date('now')와 같은 UTC 기준 'YYYY-MM'
+
+    도서관 버전만으로는 달이 바뀌어도 캐시가 무효화되지 않으므로 통계를 담는 캐시 키에 함께 넣습니다.
+    """
+    return time.strftime('%Y-%m', time.gmtime())
+
+class VersionedCache:
+    """도서관 버전과 함께 값을 저장하는 LRU 캐시 - 저장 당시 버전과 다르면 miss (쓰기가 일어나면 자동 무효화)"""
+
+    def __init__(self, name, max_entries=32):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == version
+            if hit:
+                self._entries.move_to_end(key)
+        record_cache_lookup(self.name, hit)
+        return entry[1] if hit else None
+
+    def set(self, key, version, value):
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > version:
+                return  # 동시 요청이 이미 더 새로운 버전을 저장함
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나로 합쳐, 먼저 온 호출(leader)의 결과를 모두가 받도록 함"""
+
+    class _Call:
+        __slots__ = ('done', 'result', 'error')
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """진행 중인 같은 키의 호출이 있으면 그 결과를 기다리고, 없으면 func() 실행"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            SINGLEFLIGHT_CALLS.inc(scope=self.name, role='shared')
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)  # 호출자가 결과를 수정해도 서로 영향이 없도록
+
+        SINGLEFLIGHT_CALLS.inc(scope=self.name, role='leader')
+        try:
+            result = func()
+            # leader가 돌려받은 결과를 수정하는 동안에도 기다리던 호출이 안전하게 복사할 수 있도록 별도 사본 보관
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+# ============== 요청별 시간 분해 (Server-Timing) ==============
+# 요청 처리 중 DB 작업, 외부 API 호출, 필터링 단계를 이름 붙은 구간(span)으로 모아
+# Server-Timing 응답 헤더로 돌려줍니다. 브라우저 개발자도구 Network > Timing 탭에서 확인할 수 있습니다.
+
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING', '1') != '0'
+SLOW_REQUEST_LOG_MS = float(os.getenv('SLOW_REQUEST_LOG_MS', '0'))  # 0이면 느린 요청 로그 비활성
+
+# 현재 요청의 구간 목록 (요청 밖이나 백그라운드 스레드에서는 None)
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+def record_span(name, duration):
+    """현재 요청에 구간 기록 (요청 컨텍스트 밖이면 무시)"""
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration))
+
+class timing_span:
+    """with 블록 또는 데코레이터로 구간 시간을 기록"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_span(self.name, time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timing_span(self.name):
+                return func(*args, **kwargs)
+        return wrapper
+
+def summarize_spans(spans):
+    """같은 이름의 구간을 합쳐 [(이름, 합계 초, 횟수)] 반환 (처음 나온 순서 유지)"""
+    totals = {}
+    for name, duration in spans:
+        total, count = totals.get(name, (0.0, 0))
+        totals[name] = (total + duration, count + 1)
+    return [(name, total, count) for name, (total, count) in totals.items()]
+
+def format_server_timing(spans, total=None):
+    """Server-Timing 헤더 값 생성 (예: api.naver_book;dur=120.5;desc="x2")"""
+    entries = []
+    for name, duration, count in summarize_spans(spans):
+        entry = f"{name};dur={duration * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+# 요청 URL 경로 -> 제공자 이름
+UPSTREAM_PROVIDERS = {
+    '/v1/search/book.json': 'naver_book',
+    '/v1/search/shop.json': 'naver_shop',
+    '/books/v1/volumes': 'google'
+}
+
+# 외부 API 호출 우선순위 - 대화형 요청(검색 등)이 기본이고, 상세정보 보강 같은 일괄 작업은 background로 표시
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+_api_priority = contextvars.ContextVar('api_priority', default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def api_priority(priority):
+    """블록 안의 외부 API 호출 우선순위 지정 (with api_priority(PRIORITY_BACKGROUND): ...)"""
+    token = _api_priority.set(priority)
+    try:
+        yield
+    finally:
+        _api_priority.reset(token)
+
+def background_priority(func):
+    """함수 안의 외부 API 호출을 background 우선순위로 실행하는 데코레이터 (일괄 보강 작업용)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with api_priority(PRIORITY_BACKGROUND):
+            return func(*args, **kwargs)
+    return wrapper
+
+class ProviderQuotaExceeded(requests.RequestException):
+    """제공자의 일일 호출 한도 소진 - 다른 제공자로 넘어가도록 요청 예외로 취급"""
+
+# 일일 한도는 같은 API 키를 쓰는 제공자끼리 공유 (네이버 검색 API는 책/쇼핑 검색 합산)
+PROVIDER_QUOTA_GROUPS = {'naver_book': 'naver', 'naver_shop': 'naver', 'google': 'google'}
+QUOTA_DAY_UTC_OFFSET = 9 * 3600  # 네이버 일일 한도는 한국 시간 자정에 초기화
+PROVIDER_QUOTA_LEASE_SIZE = int(os.getenv('PROVIDER_QUOTA_LEASE_SIZE', '20'))  # 워커가 DB에서 한 번에 받아 두는 일일 예산
+
+class ProviderScheduler:
+    """제공자별 외부 API 예산(초당, 일일)을 관리하는 스케줄러 - 모든 외부 호출이 보내기 전에 acquire()
+    
+    - 초당 한도: 1초 고정 구간마다 호출 수를 세고, 다 쓰면 다음 구간까지 대기
+    - 일일 한도: 소진되면 ProviderQuotaExceeded (검색은 다른 제공자로 넘어감)
+    - background 호출은 초당/일일 한도의 (1 - reserve)까지만 쓰고, 같은 프로세스에서 대화형 호출이
+      기다리는 동안에는 양보합니다.
+    초당 한도는 항상 프로세스 메모리에서 셉니다. bind(db_path) 후 일일 한도는 SQLite(provider_quota 테이블)에서
+    lease_size개씩 미리 받아 두고 메모리에서 쓰므로, 호출마다 DB 쓰기 잠금을 잡지 않으면서 워커 간, 재시작 후에도 한도가 유지됩니다.
+    (받아 두고 못 쓴 몫은 사용한 것으로 남으므로 한도보다 조금 일찍 멈출 수는 있어도 넘지는 않음)
+    """
+    
+    def __init__(self, per_second, per_day, reserve=0.3, lease_size=PROVIDER_QUOTA_LEASE_SIZE):
+        self.per_second = per_second    # 제공자 -> 초당 호출 수 (없으면 제한 없음)
+        self.per_day = per_day          # 한도 그룹 -> 일일 호출 수 (없으면 제한 없음)
+        self.reserve = reserve          # 대화형 호출 몫으로 남겨 두는 비율
+        self.lease_size = max(1, lease_size)
+        self.db_path = None
+        self._counters = {}             # 메모리 사용량: scope -> (window, used) (bind 후에는 초당 한도만)
+        self._leases = {}               # bind 후 일일 한도: scope -> (window, 받을 때 DB 사용량, 남은 몫)
+        self._lock = threading.Lock()
+        self._interactive_waiting = {}  # 제공자 -> 대기 중인 대화형 호출 수
+    
+    def bind(self, db_path):
+        """사용량 기록을 SQLite로 전환 (provider_quota 테이블은 마이그레이션이 생성)"""
         self.db_path = db_path
-        self.init_db()
     
-    def init_db(self):
-        """데이터베이스 초기화"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _limits(self, provider, priority):
+        """(scope, 구간, 한도) 목록 - background는 대화형 몫을 남긴 한도 사용"""
+        now = time.time()
+        share = 1.0 if priority == PRIORITY_INTERACTIVE else 1.0 - self.reserve
+        limits = []
+        rate = self.per_second.get(provider)
+        if rate:
+            limits.append((f"second:{provider}", str(int(now)), max(1, int(rate * share))))
+        group = PROVIDER_QUOTA_GROUPS.get(provider, provider)
+        quota = self.per_day.get(group)
+        if quota:
+            day = time.strftime('%Y-%m-%d', time.gmtime(now + QUOTA_DAY_UTC_OFFSET))
+            limits.append((f"day:{group}", day, max(1, int(quota * share))))
+        return limits
+    
+    @staticmethod
+    def _decide(limits, usage):
+        """현재 사용량으로 호출 가능 여부 판단 - 가능하면 0, 초당 한도면 대기할 초, 일일 한도면 예외"""
+        for scope, window, limit in limits:
+            stored_window, used = usage.get(scope, (None, 0))
+            if stored_window == window and used >= limit:
+                if scope.startswith('day:'):
+                    raise ProviderQuotaExceeded(f"{scope[4:]} 일일 호출 한도({limit}) 소진")
+                return 1.0 - (time.time() % 1.0) + 0.001
+        return 0.0
+    
+    def _take(self, limits):
+        """한도 안이면 사용량을 1 늘리고 0, 아니면 대기할 초 반환 (일일 한도 소진 시 예외)"""
+        with self._lock:
+            if self.db_path is None:
+                counted, leased = limits, []
+            else:
+                counted = [limit for limit in limits if not limit[0].startswith('day:')]
+                leased = [limit for limit in limits if limit[0].startswith('day:')]
+            wait = self._decide(counted, self._counters)
+            if wait:
+                return wait
+            for scope, window, limit in leased:
+                self._take_leased(scope, window, limit)
+            for scope, window, limit in counted:
+                stored_window, used = self._counters.get(scope, (None, 0))
+                used = used + 1 if stored_window == window else 1
+                self._counters[scope] = (window, used)
+                QUOTA_REMAINING.set(limit - used, scope=scope)
+            return 0.0
+    
+    def _take_leased(self, scope, window, limit):
+        """받아 둔 일일 예산에서 하나 사용 - 다 썼거나 날짜가 바뀌었으면 DB에서 새로 받음 (self._lock 보유 상태로 호출)"""
+        lease_window, leased_used, remaining = self._leases.get(scope, (None, 0, 0))
+        if lease_window == window:
+            # 받을 때의 DB 사용량에서 아직 안 쓴 몫을 빼면 지금까지 쓴 양 (다른 워커 사용량 포함, 그 뒤로 늘어날 수만 있음)
+            if leased_used - remaining >= limit:
+                raise ProviderQuotaExceeded(f"{scope[4:]} 일일 호출 한도({limit}) 소진")
+            if remaining > 0:
+                self._leases[scope] = (window, leased_used, remaining - 1)
+                QUOTA_REMAINING.set(limit - (leased_used - remaining + 1), scope=scope)
+                return
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                authors TEXT,
-                publisher TEXT,
-                published_date TEXT,
-                isbn TEXT,
-                description TEXT,
-                thumbnail_url TEXT,
-                purchase_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                price REAL,
-                notes TEXT,
-                kyobo_link TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT window_key, used FROM provider_quota WHERE scope = ?', (scope,)).fetchone()
+            used = row[1] if row and row[0] == window else 0
+            if used >= limit:
+                conn.execute('ROLLBACK')
+                raise ProviderQuotaExceeded(f"{scope[4:]} 일일 호출 한도({limit}) 소진")
+            grant = min(self.lease_size, limit - used)
+            conn.execute('''
+                INSERT INTO provider_quota (scope, window_key, used) VALUES (?, ?, ?)
+                ON CONFLICT (scope) DO UPDATE SET window_key = excluded.window_key, used = excluded.used
+            ''', (scope, window, used + grant))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        self._leases[scope] = (window, used + grant, grant - 1)
+        QUOTA_REMAINING.set(limit - used - 1, scope=scope)
+    
+    def acquire(self, provider):
+        """provider 호출 예산 하나를 얻을 때까지 대기하고 대기한 시간(초) 반환 (일일 한도 소진 시 예외)"""
+        priority = _api_priority.get()
+        if not self.per_second.get(provider) and not self.per_day.get(PROVIDER_QUOTA_GROUPS.get(provider, provider)):
+            return 0.0
+        
+        interactive = priority == PRIORITY_INTERACTIVE
+        waited = 0.0
+        if interactive:
+            with self._lock:
+                self._interactive_waiting[provider] = self._interactive_waiting.get(provider, 0) + 1
+        try:
+            while True:
+                yielding = False
+                if not interactive:
+                    with self._lock:
+                        yielding = bool(self._interactive_waiting.get(provider))
+                if yielding:
+                    delay = 0.05  # 대화형 호출에 양보
+                else:
+                    delay = self._take(self._limits(provider, priority))
+                    if not delay:
+                        return waited
+                time.sleep(delay)
+                waited += delay
+        finally:
+            if interactive:
+                with self._lock:
+                    self._interactive_waiting[provider] -= 1
+
+def _build_provider_scheduler(rate_limits, daily_quotas, reserve):
+    """'제공자=초당요청수,...', '그룹=일일요청수,...' 설정으로 스케줄러 생성 (0이면 제한 없음)"""
+    default, per_provider = _parse_logger_settings(rate_limits)
+    per_second = {}
+    for provider in PROVIDER_QUOTA_GROUPS:
+        rate = float(per_provider.get(provider, default or 0))
+        if rate > 0:
+            per_second[provider] = rate
+    default, per_group = _parse_logger_settings(daily_quotas)
+    per_day = {}
+    for group in set(PROVIDER_QUOTA_GROUPS.values()):
+        quota = int(per_group.get(group, default or 0))
+        if quota > 0:
+            per_day[group] = quota
+    return ProviderScheduler(per_second, per_day, reserve=float(reserve))
+
+# 모든 외부 API 호출이 공유하는 예산 - 동시 검색과 일괄 작업이 합쳐서 외부 API 한도를 넘지 않도록 함
+provider_scheduler = _build_provider_scheduler(
+    os.getenv('PROVIDER_RATE_LIMITS', '10'),
+    os.getenv('PROVIDER_DAILY_QUOTAS', 'naver=25000'),
+    os.getenv('PROVIDER_INTERACTIVE_RESERVE', '0.3')
+)
+
+class InstrumentedSession(requests.Session):
+    """외부 API 호출을 제공자별로 계측하고 호출 예산을 지키는 세션 (연결 재사용 포함)"""
+
+    def request(self, method, url, *args, **kwargs):
+        provider = UPSTREAM_PROVIDERS.get(urlparse(url).path, 'other')
+        try:
+            waited = provider_scheduler.acquire(provider)
+        except ProviderQuotaExceeded:
+            UPSTREAM_ERRORS.inc(provider=provider, reason='quota')
+            raise
+        if waited:
+            record_span(f"ratelimit.{provider}", waited)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException as e:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_LATENCY.observe(elapsed, provider=provider)
+            record_span(f"api.{provider}", elapsed)
+            UPSTREAM_REQUESTS.inc(provider=provider, status='exception')
+            UPSTREAM_ERRORS.inc(provider=provider, reason=type(e).__name__)
+            raise
+
+        elapsed = time.perf_counter() - start
+        UPSTREAM_LATENCY.observe(elapsed, provider=provider)
+        record_span(f"api.{provider}", elapsed)
+        UPSTREAM_REQUESTS.inc(provider=provider, status=response.status_code)
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.inc(provider=provider, reason=f"http_{response.status_code}")
+        return response
+
+# 모든 외부 API 호출은 이 세션을 통해 나갑니다
+api_session = InstrumentedSession()
+
+class RawPayloadCache:
+    """최근 외부 API 응답 항목 원본을 잠시 보관하는 LRU - 검색 결과에는 payload_key만 싣고, 책을 저장할 때 원본을 꺼내 기록"""
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (provider, 원본 JSON 문자열)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(provider, raw):
+        """원본 JSON 문자열의 키('제공자:내용 해시') - book_payloads.payload_key와 같은 값"""
+        return f"{provider}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+    def put(self, provider, item):
+        """원본 항목을 보관하고 키 반환"""
+        raw = json.dumps(item, ensure_ascii=False, sort_keys=True)
+        key = self.key_for(provider, raw)
+        with self._lock:
+            self._entries[key] = (provider, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key
+
+    def get(self, key):
+        """(provider, 원본 JSON 문자열) 또는 None (다른 워커에서 받았거나 밀려난 원본)"""
+        with self._lock:
+            return self._entries.get(key)
+
+# 책 저장 전까지 외부 응답 원본 보관 (book_payloads 테이블에 압축 저장)
+raw_payloads = RawPayloadCache(max_entries=int(os.getenv('PAYLOAD_CACHE_MAX_ENTRIES', '2000')))
+PAYLOAD_COMPRESS_LEVEL = 9  # 한 번 쓰고 가끔 다시 읽으므로 압축률 우선
+
+# 표지 대표색 - 썸네일이 새로 생기거나 바뀐 책은 별도 스레드에서 표지를 받아 계산 (요청/보강 작업을 기다리게 하지 않음)
+COVER_COLOR_MAX_BYTES = 2 * 1024 * 1024                                  # 이보다 큰 이미지는 받지 않음
+COVER_COLOR_MAX_PIXELS = 4096 * 4096                                     # 이보다 큰 이미지는 해석하지 않음
+COVER_COLOR_BATCH_SIZE = int(os.getenv('COVER_COLOR_BATCH_SIZE', '50'))  # 주기 정리 때 채울 최대 권수 (0이면 비활성)
+cover_color_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cover-color')
+if Image is not None:
+    Image.MAX_IMAGE_PIXELS = COVER_COLOR_MAX_PIXELS  # 압축 폭탄 방지 (2배를 넘으면 Image.open이 거부)
+
+# 표지를 받아도 되는 제공자 이미지 호스트 (하위 도메인 포함)
+# 책의 thumbnail_url은 클라이언트가 보낸 값일 수 있으므로 이 호스트가 아니면 요청하지 않습니다 (내부 주소 요청 방지).
+COVER_IMAGE_HOSTS = tuple(
+    host.strip().lower()
+    for host in os.getenv('COVER_IMAGE_HOSTS', 'pstatic.net,books.google.com,googleusercontent.com,kyobobook.co.kr').split(',')
+    if host.strip()
+)
+COVER_IMAGE_MAX_REDIRECTS = 3
+
+def is_cover_image_url(url):
+    """http(s) 주소이고 호스트가 제공자 이미지 호스트(또는 그 하위 도메인)인지"""
+    try:
+        parsed = urlparse(url or '')
+        host = (parsed.hostname or '').lower()
+    except ValueError:
+        return False
+    return parsed.scheme in ('http', 'https') and any(
+        host == allowed or host.endswith('.' + allowed) for allowed in COVER_IMAGE_HOSTS
+    )
+
+def request_cover_image(method, url, **kwargs):
+    """제공자 이미지 호스트에만 요청 - 리디렉션도 한 단계씩 허용 호스트인지 확인 (허용되지 않으면 None)"""
+    for _ in range(COVER_IMAGE_MAX_REDIRECTS + 1):
+        if not is_cover_image_url(url):
+            return None
+        response = api_session.request(method, url, allow_redirects=False, timeout=5, **kwargs)
+        if not response.is_redirect:
+            return response
+        response.close()
+        url = urljoin(url, response.headers['Location'])
+    return None
+
+def _read_capped(response, limit):
+    """응답 본문을 limit 바이트까지만 읽음 (넘으면 None)"""
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) > limit:
+        return None
+    chunks, size = [], 0
+    for chunk in response.iter_content(64 * 1024):
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+def cover_dominant_color(image_bytes):
+    """표지 이미지에서 가장 많이 쓰인 색 '#rrggbb' (해석할 수 없거나 너무 크면 None)"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            if image.width * image.height > COVER_COLOR_MAX_PIXELS:
+                return None
+            image = image.convert('RGB')
+            image.thumbnail((32, 32))
+            paletted = image.quantize(colors=4)
+            _, index = max(paletted.getcolors())
+            red, green, blue = paletted.getpalette()[index * 3:index * 3 + 3]
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+def fetch_cover_color(url):
+    """표지 이미지를 받아 대표색 계산 - 색, 받을 수 없거나 허용되지 않은 주소/해석할 수 없으면 '' (다시 시도하지 않음), 일시 오류면 None"""
+    try:
+        response = request_cover_image('GET', url, stream=True)
+        if response is None:
+            return ''
+        try:
+            if response.status_code >= 500 or response.status_code == 429:
+                return None
+            if response.status_code >= 400:
+                return ''
+            content = _read_capped(response, COVER_COLOR_MAX_BYTES)
+        finally:
+            response.close()
+    except requests.RequestException:
+        return None
+    if content is None:
+        return ''
+    return cover_dominant_color(content) or ''
+
+# 같은 검색어의 동시 외부 조회 합치기 (프로세스 내, 선택적으로 워커 간)
+search_flight = SingleFlight('process')
+SEARCH_COALESCE_ACROSS_WORKERS = os.getenv('SEARCH_COALESCE_ACROSS_WORKERS', '0').lower() in ('1', 'true', 'yes')
+SEARCH_COALESCE_LEASE_SECONDS = float(os.getenv('SEARCH_COALESCE_LEASE_SECONDS', '15'))  # 조회 한 건의 최대 대기 시간
+SEARCH_COALESCE_RESULT_TTL = float(os.getenv('SEARCH_COALESCE_RESULT_TTL', '5'))  # 끝난 조회 결과를 다른 워커와 공유하는 시간
+
+def _timed_db_method(name, original):
+    """메서드 실행 시간과 예외를 DB 작업 메트릭으로 기록하는 래퍼 생성"""
+    @functools.wraps(original)
+    def timed(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        except Exception:
+            DB_OPERATION_ERRORS.inc(method=name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_OPERATION_LATENCY.observe(elapsed, method=name)
+            record_span(f"db.{name}", elapsed)
+    return timed
+
+def instrument_db_methods(*method_names):
+    """지정한 BookTracker 메서드의 실행 시간을 자동으로 기록하는 클래스 데코레이터"""
+    def decorate(cls):
+        for name in method_names:
+            setattr(cls, name, _timed_db_method(name, getattr(cls, name)))
+        return cls
+    return decorate
+
+_TITLE_WHITESPACE_RE = re.compile(r'\s+')
+_TITLE_SYMBOL_RE = re.compile(r'[^\w가-힣]')
+_TITLE_SYMBOL_KEEP_SPACE_RE = re.compile(r'[^\w가-힣\s]')
+_TITLE_REPEAT_RE = re.compile(r'(.)\1{2,}')
+
+def normalize_title_key(title):
+    """중복 검사용 제목 키 - 소문자화 후 공백/특수문자를 제거하고 3번 이상 반복된 문자를 하나로 줄임"""
+    try:
+        if not title or not isinstance(title, str):
+            return ""
         
-        # 백그라운드 업데이트 작업 큐 테이블
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS update_jobs (
-                job_id TEXT PRIMARY KEY,
-                status TEXT NOT NULL DEFAULT 'pending',
-                total_books INTEGER NOT NULL,
-                processed_books INTEGER DEFAULT 0,
-                success_count INTEGER DEFAULT 0,
-                error_count INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                completed_at DATETIME NULL
-            )
-        ''')
+        # 기본 정규화
+        normalized = title.strip().lower()
         
-        # 업데이트 로그 테이블
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS update_logs (
-                log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id TEXT NOT NULL,
-                book_id INTEGER NOT NULL,
-                book_title TEXT NOT NULL,
-                success BOOLEAN NOT NULL,
-                message TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (job_id) REFERENCES update_jobs (job_id),
-                FOREIGN KEY (book_id) REFERENCES books (id)
-            )
-        ''')
+        # 공백문자 정규화 (일반 공백, 전각 공백, 탭 등)
+        normalized = _TITLE_WHITESPACE_RE.sub('', normalized)
         
-        # 기존 테이블에 kyobo_link 컬럼 추가 (이미 있으면 무시됨)
-        try:
-            cursor.execute('ALTER TABLE books ADD COLUMN kyobo_link TEXT')
-        except sqlite3.OperationalError:
-            # 컬럼이 이미 존재하면 무시
-            pass
+        # 특수문자 제거 (괄호, 하이픈, 콜론 등)
+        normalized = _TITLE_SYMBOL_RE.sub('', normalized)
         
-        conn.commit()
+        # 연속된 문자 정리
+        normalized = _TITLE_REPEAT_RE.sub(r'\1', normalized)
+        
+        return normalized
+        
+    except Exception as e:
+        db_logger.warning("제목 정규화 오류: %s -> %s", title, e)
+        # 정규화 실패 시 기본 처리
+        return title.strip().lower() if title else ""
+
+def normalize_isbn_key(isbn):
+    """중복 검사용 ISBN 키 - 하이픈과 공백 제거"""
+    if not isbn or not isinstance(isbn, str):
+        return ""
+    return isbn.strip().replace('-', '').replace(' ', '')
+
+def isbn_keys(isbn):
+    """ISBN별 중복 검사 키 목록 - 네이버처럼 "ISBN10 ISBN13"을 공백으로 이어 준 값은 ISBN마다 따로 정규화"""
+    if not isbn or not isinstance(isbn, str):
+        return []
+    keys = []
+    for part in isbn.split():
+        key = normalize_isbn_key(part)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+def canonical_isbn(isbn):
+    """외부 조회용 ISBN 하나 - "ISBN10 ISBN13"처럼 여러 개 저장된 경우 ISBN-13을 우선 사용"""
+    parts = isbn_keys(isbn)
+    for length in (13, 10):
+        for part in parts:
+            if len(part) == length:
+                return part
+    return parts[0] if parts else ''
+
+class BookRecord:
+    """도서관 목록의 책 한 권 - __slots__ 기반 읽기 전용 레코드
+    
+    행마다 dict를 만드는 것보다 메모리를 덜 쓰고, book['title'] / book.get('title') / book.title
+    모두 지원해 dict 행을 쓰던 라우트와 템플릿이 그대로 동작합니다.
+    """
+    
+    FIELDS = ('id', 'title', 'authors', 'publisher', 'published_date', 'isbn', 'thumbnail_url',
+              'purchase_date', 'price', 'notes', 'kyobo_link', 'created_at', 'cover_color')
+    __slots__ = FIELDS
+    
+    # FIELDS 순서와 같은 SELECT 목록 (kyobo_link는 dict 행과 같게 None 대신 '')
+    SELECT_COLUMNS = '''id, title, authors, publisher, published_date, isbn,
+                        thumbnail_url, purchase_date, price, notes,
+                        COALESCE(kyobo_link, ''), created_at, cover_color'''
+    
+    @classmethod
+    def from_row(cls, row):
+        record = object.__new__(cls)
+        # 슬롯 디스크립터로 직접 채움 (읽기 전용 __setattr__ 우회, object.__setattr__보다 빠름)
+        for setter, value in zip(cls._SLOT_SETTERS, row):
+            setter(record, value)
+        return record
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("BookRecord는 읽기 전용입니다")
+    
+    def __delattr__(self, name):
+        raise AttributeError("BookRecord는 읽기 전용입니다")
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+    
+    def keys(self):
+        return self.FIELDS
+    
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    def __repr__(self):
+        return f"BookRecord(id={self.id!r}, title={self.title!r})"
+
+BookRecord._SLOT_SETTERS = tuple(BookRecord.__dict__[field].__set__ for field in BookRecord.FIELDS)
+
+class LibrarySnapshot:
+    """도서관 전체 책 목록 (구매일 최신순 튜플 + id 조회표)
+    
+    쓰기는 id 조회표(오래된 책부터 들어간 순서의 dict)에 제자리에서 O(1)로 반영하고,
+    목록 튜플은 쓰기 뒤 처음 읽을 때 한 번만 다시 만듭니다. 이미 받아 간 튜플은 바뀌지 않으므로 읽던 요청에는 영향 없음.
+    """
+    
+    __slots__ = ('version', 'by_id', '_records', '_lock')
+    
+    def __init__(self, version, records):
+        self.version = version
+        self.by_id = {record.id: record for record in reversed(records)}
+        self._records = tuple(records)
+        self._lock = threading.Lock()
+    
+    @property
+    def records(self):
+        """구매일 최신순 튜플 (쓰기 뒤 처음 읽을 때 조회표 순서를 뒤집어 다시 만듦)"""
+        with self._lock:
+            if self._records is None:
+                self._records = tuple(reversed(self.by_id.values()))
+            return self._records
+    
+    def apply_change(self, version, book_id, record):
+        """쓰기 한 건을 제자리에 반영하고 True 반환
+        
+        새 책이 맨 앞(가장 최근 구매일)에 오지 않으면 순서를 맞추기 어려우므로 False를 반환해 다음 조회 때 다시 읽게 합니다.
+        """
+        with self._lock:
+            if record is None:
+                self.by_id.pop(book_id, None)
+            elif book_id in self.by_id:
+                # 수정 쓰기는 구매일을 바꾸지 않으므로 같은 자리에 교체
+                self.by_id[book_id] = record
+            else:
+                newest = next(reversed(self.by_id.values()), None)
+                if newest is not None and (record.purchase_date or '') < (newest.purchase_date or ''):
+                    return False
+                self.by_id[book_id] = record
+            self.version = version
+            self._records = None
+            return True
+
+class SuggestIndex:
+    """검색어 자동완성용 접두어 인덱스 - 정렬된 정규화 키 배열(과 나란한 항목 id 배열)을 bisect로 조회
+    
+    내 도서관의 책(library, 항목 id = 책 id)과 외부 API 검색 결과(cache, 항목 id < 0)를 함께 담습니다.
+    제목의 각 단어부터 시작하는 키를 만들어 "코드"로도 "클린 코드"를 찾을 수 있습니다.
+    """
+    
+    SUGGEST_FIELDS = ('title', 'authors', 'publisher', 'published_date', 'isbn', 'description',
+                      'thumbnail_url', 'kyobo_link')
+    MAX_WORD_KEYS = 4  # 제목당 단어 시작 키 수 제한
+    MAX_SCAN = 500     # 조회 한 번에 훑는 최대 키 수
+    
+    def __init__(self, max_cached=5000):
+        self.max_cached = max_cached
+        self.library_version = None
+        self._keys = []                     # 정렬된 정규화 키
+        self._ids = []                      # _keys와 같은 위치의 항목 id
+        self._entries = {}                  # 항목 id -> (keys, 항목 dict)
+        self._cached_ids = OrderedDict()    # 외부 결과 식별자 -> 항목 id (오래된 순)
+        self._next_cached_id = -1
+        self._owned = {}                    # 정규화된 제목/ISBN -> 보유 책 id
+        self._lock = threading.RLock()
+    
+    @classmethod
+    def _entry_keys(cls, title, isbn):
+        """항목의 인덱스 키 - 단어 시작 위치별 정규화 제목 + ISBN
+        
+        normalize_title_key와 같은 결과가 나오도록 하되, 특수문자 제거는 제목당 한 번만 수행합니다.
+        """
+        keys = []
+        words = _TITLE_SYMBOL_KEEP_SPACE_RE.sub('', (title or '').lower()).split()
+        has_repeats = _TITLE_REPEAT_RE.search(''.join(words)) is not None
+        for i in range(min(len(words), cls.MAX_WORD_KEYS)):
+            key = ''.join(words[i:])
+            if has_repeats:
+                key = _TITLE_REPEAT_RE.sub(r'\1', key)
+            if key and key not in keys:
+                keys.append(key)
+        for key in isbn_keys(isbn):
+            key = key.lower()
+            if key not in keys:
+                keys.append(key)
+        return keys
+    
+    def _insert(self, entry_id, entry):
+        keys = self._entry_keys(entry.get('title'), entry.get('isbn'))
+        for key in keys:
+            i = bisect.bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._ids.insert(i, entry_id)
+        self._entries[entry_id] = (keys, entry)
+    
+    def _remove(self, entry_id):
+        keys, entry = self._entries.pop(entry_id)
+        for key in keys:
+            lo, hi = bisect.bisect_left(self._keys, key), bisect.bisect_right(self._keys, key)
+            for i in range(lo, hi):
+                if self._ids[i] == entry_id:
+                    del self._keys[i]
+                    del self._ids[i]
+                    break
+        return entry
+    
+    @staticmethod
+    def _ownership_keys(entry):
+        # rebuild_library가 받는 owned_keys(title_norm, book_isbns)와 같은 키
+        return [normalize_title_key(entry.get('title'))] + isbn_keys(entry.get('isbn'))
+    
+    def _set_owned(self, book_id, entry, owned):
+        """보유 책 조회 테이블 갱신 (owned=False면 제거)"""
+        for key in self._ownership_keys(entry):
+            if not key:
+                continue
+            if owned:
+                self._owned[key] = book_id
+            elif self._owned.get(key) == book_id:
+                del self._owned[key]
+    
+    @staticmethod
+    def _library_entry(record):
+        return {
+            'book_id': record.id, 'title': record.title, 'authors': record.authors,
+            'publisher': record.publisher, 'published_date': record.published_date,
+            'isbn': record.isbn, 'thumbnail_url': record.thumbnail_url
+        }
+    
+    def rebuild_library(self, version, records, owned_keys=()):
+        """도서관 항목 전체 재구성 (외부 결과 항목은 유지)
+        
+        records: 도서관 스냅샷의 BookRecord
+        owned_keys: (정규화 키, 책 id) - DB에 저장된 title_norm과 ISBN별 키(book_isbns)를 그대로 사용
+        """
+        with self._lock:
+            entries = {entry_id: value for entry_id, value in self._entries.items() if entry_id < 0}
+            for record in records:
+                entry = self._library_entry(record)
+                entries[record.id] = (self._entry_keys(entry['title'], entry['isbn']), entry)
+            
+            all_keys, all_ids = [], []
+            for entry_id, (keys, _) in entries.items():
+                all_keys.extend(keys)
+                all_ids.extend([entry_id] * len(keys))
+            # 키 문자열만 비교하도록 위치 배열을 정렬 (튜플 정렬보다 빠르고, insert 반복보다 훨씬 빠름)
+            order = sorted(range(len(all_keys)), key=all_keys.__getitem__)
+            self._keys = [all_keys[i] for i in order]
+            self._ids = [all_ids[i] for i in order]
+            self._entries = entries
+            self._owned = {key: book_id for key, book_id in owned_keys if key}
+            self.library_version = version
+    
+    def apply_library_change(self, version, book_id, record):
+        """쓰기 한 건 반영 - 인덱스가 바로 앞 버전일 때만 증분 적용 (아니면 다음 조회 때 재구성)"""
+        with self._lock:
+            if self.library_version is None or self.library_version != version - 1:
+                return
+            if book_id in self._entries:
+                self._set_owned(book_id, self._remove(book_id), False)
+            if record is not None:
+                entry = self._library_entry(record)
+                self._insert(book_id, entry)
+                self._set_owned(book_id, entry, True)
+            self.library_version = version
+    
+    def add_provider_results(self, books):
+        """외부 API 검색 결과를 자동완성 후보로 추가 (최근 것부터 max_cached개까지 유지)"""
+        with self._lock:
+            for book in books or []:
+                title = book.get('title')
+                if not title:
+                    continue
+                ident = normalize_isbn_key(book.get('isbn')) or f"{normalize_title_key(title)}|{book.get('authors', '')}"
+                if ident in self._cached_ids:
+                    self._cached_ids.move_to_end(ident)
+                    continue
+                entry_id = self._next_cached_id
+                self._next_cached_id -= 1
+                self._insert(entry_id, {field: book.get(field, '') for field in self.SUGGEST_FIELDS})
+                self._cached_ids[ident] = entry_id
+                while len(self._cached_ids) > self.max_cached:
+                    _, oldest = self._cached_ids.popitem(last=False)
+                    self._remove(oldest)
+    
+    def lookup(self, query, limit=8):
+        """접두어로 후보 조회 - 내 책 먼저, 같은 출처 안에서는 짧은 제목 먼저"""
+        prefix = normalize_title_key(query)
+        if not prefix:
+            return []
+        with self._lock:
+            found = set()
+            i = bisect.bisect_left(self._keys, prefix)
+            end = min(len(self._keys), i + self.MAX_SCAN)
+            while i < end and self._keys[i].startswith(prefix):
+                found.add(self._ids[i])
+                i += 1
+            
+            ranked = sorted(found, key=lambda entry_id: (entry_id < 0, len(self._entries[entry_id][1].get('title') or ''),
+                                                         abs(entry_id)))
+            suggestions = []
+            shown_books = set()
+            for entry_id in ranked:
+                if len(suggestions) >= limit:
+                    break
+                entry = self._entries[entry_id][1]
+                if entry_id > 0:
+                    suggestion = dict(entry, source='library', is_owned=True)
+                    shown_books.add(entry_id)
+                else:
+                    owned_id = next((self._owned[key] for key in self._ownership_keys(entry) if key in self._owned), None)
+                    if owned_id in shown_books:
+                        continue  # 이미 내 책으로 표시된 책
+                    suggestion = dict(entry, source='cache', is_owned=owned_id is not None, owned_book_id=owned_id)
+                suggestions.append(suggestion)
+            return suggestions
+
+# 상세정보 보강 대기열 우선순위 (작을수록 먼저 처리)
+ENRICH_PRIORITY_REQUESTED = 0    # 화면에서 열었거나 직접 요청한 책
+ENRICH_PRIORITY_IMPORTED = 10    # 새로 추가(대량 추가 포함)한 책
+ENRICH_PRIORITY_BACKLOG = 20     # 그 외 Unknown 책
+ENRICH_PRIORITY_FAILING = 30     # 여러 번 실패한 책
+ENRICH_FAILING_AFTER_ATTEMPTS = 3
+
+# 신선도를 추적하는 외부 제공자 필드 (book_field_status 테이블)
+FRESHNESS_FIELDS = ('authors', 'publisher', 'published_date', 'description', 'thumbnail_url', 'kyobo_link')
+FRESHNESS_ISBN_FIELDS = ('authors', 'publisher', 'published_date', 'description', 'thumbnail_url')  # ISBN 조회로 다시 받는 필드
+
+def field_value_hash(value):
+    """제공자 값 비교용 짧은 해시 (빈 값이나 'Unknown'은 None = 값 없음)"""
+    if not value or value == 'Unknown':
+        return None
+    return hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:16]
+
+# ============== 스키마 마이그레이션 ==============
+# 각 단계는 (버전, 이름, 함수)이며 PRAGMA user_version에 마지막으로 적용한 버전을 기록합니다.
+# 새 스키마 변경은 기존 단계를 고치지 말고 목록 끝에 단계를 추가하세요.
+# 버전 기록이 없던 기존 DB도 그대로 올라오도록 각 단계는 여러 번 실행해도 안전하게 작성합니다.
+
+def _migrate_initial_schema(cursor):
+    """books, update_jobs, update_logs 테이블 생성"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            authors TEXT,
+            publisher TEXT,
+            published_date TEXT,
+            isbn TEXT,
+            description TEXT,
+            thumbnail_url TEXT,
+            purchase_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            price REAL,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # 백그라운드 업데이트 작업 큐 테이블
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS update_jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            total_books INTEGER NOT NULL,
+            processed_books INTEGER DEFAULT 0,
+            success_count INTEGER DEFAULT 0,
+            error_count INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            completed_at DATETIME NULL
+        )
+    ''')
+    
+    # 업데이트 로그 테이블
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS update_logs (
+            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            book_title TEXT NOT NULL,
+            success BOOLEAN NOT NULL,
+            message TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES update_jobs (job_id),
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+
+def _table_columns(cursor, table):
+    """테이블의 컬럼 이름 목록"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    return [row[1] for row in cursor.fetchall()]
+
+def _migrate_kyobo_link(cursor):
+    """books 테이블에 kyobo_link 컬럼 추가"""
+    if 'kyobo_link' not in _table_columns(cursor, 'books'):
+        cursor.execute('ALTER TABLE books ADD COLUMN kyobo_link TEXT')
+
+def _migrate_library_version(cursor):
+    """도서관 버전 카운터 - books 테이블에 쓰기가 일어날 때마다 트리거로 1씩 증가
+    
+    ETag, 페이지 캐시의 키로 사용되며 모든 워커 프로세스가 같은 값을 봅니다.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS library_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO library_meta (key, value) VALUES ('version', 1)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS books_version_after_{event.lower()}
+            AFTER {event} ON books
+            BEGIN
+                UPDATE library_meta SET value = value + 1 WHERE key = 'version';
+            END
+        ''')
+
+def _migrate_book_count(cursor):
+    """책 수 카운터 - 메인 페이지가 COUNT(*)로 전체 테이블을 훑지 않도록 트리거로 유지"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO library_meta (key, value)
+        SELECT 'book_count', COUNT(*) FROM books
+    ''')
+    for event, delta in (('INSERT', '+ 1'), ('DELETE', '- 1')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS books_count_after_{event.lower()}
+            AFTER {event} ON books
+            BEGIN
+                UPDATE library_meta SET value = value {delta} WHERE key = 'book_count';
+            END
+        ''')
+    
+    # 최근 추가된 책 조회용 인덱스
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_purchase_date ON books (purchase_date)')
+
+def _migrate_book_details(cursor):
+    """책 소개(description) 같은 큰 필드를 book_details 보조 테이블로 분리
+    
+    목록 조회가 읽는 books 행을 작게 유지하고, 상세 필드는 책 상세보기에서만 읽습니다.
+    books.description 컬럼은 호환을 위해 남겨 두되 값은 비웁니다.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS book_details (
+            book_id INTEGER PRIMARY KEY,
+            description TEXT,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO book_details (book_id, description)
+        SELECT id, description FROM books WHERE description IS NOT NULL AND description != ''
+    ''')
+    cursor.execute("UPDATE books SET description = NULL WHERE description IS NOT NULL")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_details_after_delete
+        AFTER DELETE ON books
+        BEGIN
+            DELETE FROM book_details WHERE book_id = OLD.id;
+        END
+    ''')
+
+def _migrate_normalized_keys(cursor):
+    """중복 검사용 정규화 키 컬럼(title_norm, isbn_norm)과 인덱스 추가
+    
+    키는 파이썬 정규화 함수로 계산되므로, 정규화 규칙을 바꾸면 다시 채우는 단계를 추가해야 합니다.
+    """
+    columns = _table_columns(cursor, 'books')
+    for column in ('title_norm', 'isbn_norm'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE books ADD COLUMN {column} TEXT')
+    
+    cursor.execute('SELECT id, title, isbn FROM books')
+    keys = [(normalize_title_key(title) or None, normalize_isbn_key(isbn) or None, book_id)
+            for book_id, title, isbn in cursor.fetchall()]
+    cursor.executemany('UPDATE books SET title_norm = ?, isbn_norm = ? WHERE id = ?', keys)
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_title_norm ON books (title_norm)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_books_isbn_norm ON books (isbn_norm)')
+
+def _migrate_inflight_lookups(cursor):
+    """워커 프로세스 간 외부 조회 합치기용 테이블 (SEARCH_COALESCE_ACROSS_WORKERS=1일 때 사용)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS inflight_lookups (
+            lookup_key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            result TEXT
+        )
+    ''')
+
+def _migrate_update_log_retention(cursor):
+    """업데이트 로그 조회/정리용 인덱스와 작업 요약 컬럼 추가
+    
+    update_logs는 (job_id, log_id) 인덱스로 작업별 최근 로그를 바로 찾고,
+    보존 기간이 지나 로그를 지운 작업은 update_jobs.log_summary에 요약을 남깁니다.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_update_logs_job ON update_logs (job_id, log_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_update_jobs_completed_at ON update_jobs (completed_at)')
+    columns = _table_columns(cursor, 'update_jobs')
+    if 'log_summary' not in columns:
+        cursor.execute('ALTER TABLE update_jobs ADD COLUMN log_summary TEXT')
+    if 'logs_pruned_at' not in columns:
+        cursor.execute('ALTER TABLE update_jobs ADD COLUMN logs_pruned_at DATETIME')
+    # 여러 워커 중 한 곳만 정리 작업을 하도록 다음 실행 시각(unix time)을 공유
+    cursor.execute("INSERT OR IGNORE INTO library_meta (key, value) VALUES ('maintenance_next_run', 0)")
+
+def _migrate_provider_quota(cursor):
+    """외부 API 호출 예산 사용량 (scope별 현재 구간과 사용 횟수) - 워커 간, 재시작 후에도 한도 유지"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS provider_quota (
+            scope TEXT PRIMARY KEY,
+            window_key TEXT NOT NULL,
+            used INTEGER NOT NULL
+        )
+    ''')
+
+def _migrate_enrichment_queue(cursor):
+    """상세정보 보강 대기열 - 우선순위(작을수록 먼저)와 실패 횟수를 저장해 재시작 후에도 순서 유지
+    
+    책이 삭제되거나 저자 정보가 채워지면 트리거가 대기열에서 뺍니다.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS enrichment_queue (
+            book_id INTEGER PRIMARY KEY,
+            priority INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            last_job_id TEXT,
+            enqueued_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_enrichment_queue_order
+        ON enrichment_queue (priority, attempts, enqueued_at, book_id)
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO enrichment_queue (book_id, priority)
+        SELECT id, ? FROM books WHERE authors = 'Unknown'
+    ''', (ENRICH_PRIORITY_BACKLOG,))
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_enrichment_after_delete
+        AFTER DELETE ON books
+        BEGIN
+            DELETE FROM enrichment_queue WHERE book_id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_enrichment_after_update
+        AFTER UPDATE OF authors ON books
+        WHEN NEW.authors IS NOT 'Unknown'
+        BEGIN
+            DELETE FROM enrichment_queue WHERE book_id = NEW.id;
+        END
+    ''')
+
+def _migrate_field_freshness(cursor):
+    """필드별 신선도 기록 - 제공자 값을 마지막으로 받은/확인한 시각, 값 해시, ETag, 깨짐 여부
+    
+    기존 책은 추가 시각을 마지막 확인 시각으로 보고, 값이 빈 필드(썸네일, 교보문고 링크 등)는 깨진 것으로 표시합니다.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS book_field_status (
+            book_id INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            source TEXT,
+            value_hash TEXT,
+            etag TEXT,
+            fetched_at REAL NOT NULL DEFAULT 0,
+            checked_at REAL NOT NULL DEFAULT 0,
+            broken INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (book_id, field),
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    cursor.execute('''
+        SELECT b.id, b.authors, b.publisher, b.published_date, COALESCE(d.description, ''),
+               b.thumbnail_url, b.kyobo_link, CAST(strftime('%s', b.created_at) AS REAL)
+        FROM books b LEFT JOIN book_details d ON d.book_id = b.id
+        WHERE b.authors != 'Unknown'
+    ''')
+    rows = []
+    for row in cursor.fetchall():
+        book_id, values, created_at = row[0], row[1:7], row[7] or 0
+        for field, value in zip(FRESHNESS_FIELDS, values):
+            value_hash = field_value_hash(value)
+            rows.append((book_id, field, value_hash, created_at, value_hash is None))
+    cursor.executemany('''
+        INSERT OR IGNORE INTO book_field_status (book_id, field, value_hash, fetched_at, broken)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_field_status_after_delete
+        AFTER DELETE ON books
+        BEGIN
+            DELETE FROM book_field_status WHERE book_id = OLD.id;
+        END
+    ''')
+
+def _migrate_book_payloads(cursor):
+    """책 값을 만든 외부 API 응답 원본(zlib 압축 JSON) - 파서를 고친 뒤 다시 조회하지 않고 재해석하는 데 사용"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS book_payloads (
+            book_id INTEGER PRIMARY KEY,
+            provider TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            payload BLOB NOT NULL,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_payloads_after_delete
+        AFTER DELETE ON books
+        BEGIN
+            DELETE FROM book_payloads WHERE book_id = OLD.id;
+        END
+    ''')
+
+def _migrate_cover_color(cursor):
+    """표지 대표색 컬럼 ('#rrggbb', 계산 실패는 '', 아직 계산 전이면 NULL) - 표지를 늦게 불러오는 동안 자리표시자 색으로 사용"""
+    if 'cover_color' not in _table_columns(cursor, 'books'):
+        cursor.execute('ALTER TABLE books ADD COLUMN cover_color TEXT')
+
+def _migrate_book_isbns(cursor):
+    """ISBN별 중복 검사 키 테이블(book_isbns) - "ISBN10 ISBN13"으로 저장된 책도 어느 한 ISBN으로 찾도록
+    
+    books.isbn_norm은 두 ISBN을 이어 붙인 키였으므로 대표 ISBN 하나(canonical_isbn)로 다시 채웁니다.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS book_isbns (
+            book_id INTEGER NOT NULL,
+            isbn_norm TEXT NOT NULL,
+            PRIMARY KEY (book_id, isbn_norm),
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_isbns_isbn_norm ON book_isbns (isbn_norm)')
+    
+    cursor.execute("SELECT id, isbn FROM books WHERE isbn IS NOT NULL AND isbn != ''")
+    rows = cursor.fetchall()
+    cursor.executemany('INSERT OR IGNORE INTO book_isbns (book_id, isbn_norm) VALUES (?, ?)',
+                       [(book_id, key) for book_id, isbn in rows for key in isbn_keys(isbn)])
+    cursor.executemany('UPDATE books SET isbn_norm = ? WHERE id = ?',
+                       [(canonical_isbn(isbn) or None, book_id) for book_id, isbn in rows])
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_isbns_after_delete
+        AFTER DELETE ON books
+        BEGIN
+            DELETE FROM book_isbns WHERE book_id = OLD.id;
+        END
+    ''')
+
+def _migrate_payload_keys(cursor):
+    """book_payloads에 원본 키(payload_key) 추가 - 다른 워커 메모리에 있던 원본도 이미 저장된 같은 원본을 찾아 복사하도록"""
+    if 'payload_key' not in _table_columns(cursor, 'book_payloads'):
+        cursor.execute('ALTER TABLE book_payloads ADD COLUMN payload_key TEXT')
+    cursor.execute('SELECT book_id, provider, payload FROM book_payloads')
+    cursor.executemany('UPDATE book_payloads SET payload_key = ? WHERE book_id = ?', [
+        (RawPayloadCache.key_for(provider, zlib.decompress(payload).decode('utf-8')), book_id)
+        for book_id, provider, payload in cursor.fetchall()
+    ])
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_payloads_payload_key ON book_payloads (payload_key)')
+
+MIGRATIONS = [
+    (1, 'initial_schema', _migrate_initial_schema),
+    (2, 'kyobo_link', _migrate_kyobo_link),
+    (3, 'library_version', _migrate_library_version),
+    (4, 'book_count', _migrate_book_count),
+    (5, 'book_details', _migrate_book_details),
+    (6, 'normalized_keys', _migrate_normalized_keys),
+    (7, 'inflight_lookups', _migrate_inflight_lookups),
+    (8, 'update_log_retention', _migrate_update_log_retention),
+    (9, 'provider_quota', _migrate_provider_quota),
+    (10, 'enrichment_queue', _migrate_enrichment_queue),
+    (11, 'field_freshness', _migrate_field_freshness),
+    (12, 'book_payloads', _migrate_book_payloads),
+    (13, 'cover_color', _migrate_cover_color),
+    (14, 'book_isbns', _migrate_book_isbns),
+    (15, 'payload_keys', _migrate_payload_keys),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations(db_path):
+    """대기 중인 마이그레이션 실행 후 적용한 단계 이름 목록 반환
+    
+    여러 워커가 동시에 시작해도 BEGIN IMMEDIATE 쓰기 잠금을 잡은 한 프로세스만 마이그레이션하고,
+    나머지는 잠금이 풀린 뒤 user_version을 다시 읽어 할 일이 없음을 확인합니다.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        if current >= SCHEMA_VERSION:
+            return []  # 최신 스키마 - 잠금 없이 바로 반환
+        if current == 0:
+            # 새 DB는 테이블을 만들기 전에 설정해야 바로 적용됨 (기존 DB는 정리 작업이 한 번 VACUUM해서 전환)
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            current = conn.execute('PRAGMA user_version').fetchone()[0]
+            applied = []
+            cursor = conn.cursor()
+            for version, name, step in MIGRATIONS:
+                if version <= current:
+                    continue
+                step(cursor)
+                conn.execute(f'PRAGMA user_version = {version}')
+                applied.append(name)
+            conn.execute('COMMIT')
+            return applied
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
         conn.close()
+
+@instrument_db_methods(
+    'init_db', 'add_book', 'add_book_simple', 'update_book_details', 'get_all_books', 'get_book', 'get_recent_books',
+    'get_book_count', 'get_library_stats', 'get_book_details', 'suggest', 'delete_book',
+    'check_duplicate', 'annotate_owned', 'bulk_add_books_safe', 'get_library_version', 'create_update_job', 'get_update_job_status',
+    'update_job_progress', 'complete_update_job', 'log_update_result', 'get_update_logs',
+    'run_log_maintenance', 'claim_maintenance_run', 'prioritize_enrichment', 'sync_enrichment_queue',
+    'next_enrichment_book', 'pending_enrichment_books', 'record_enrichment_failure', 'enrichment_queue_size'
+)
+class BookTracker:
+    def __init__(self, db_path='books.db'):
+        self.db_path = db_path
+        # 자주 읽는 조회 결과 캐시 (도서관 버전이 바뀌면 자동 무효화)
+        self._query_cache = VersionedCache('query', max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '16')))
+        # 도서관 전체 목록 스냅샷 (쓰기 메서드가 증분 갱신, 다른 워커의 쓰기는 버전 비교로 감지)
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        # 자동완성 접두어 인덱스 (내 책 + 외부 검색 결과)
+        self._suggest_index = SuggestIndex(max_cached=int(os.getenv('SUGGEST_CACHE_MAX_RESULTS', '5000')))
+        self.init_db()
+    
+    def init_db(self):
+        """데이터베이스 초기화 (대기 중인 스키마 마이그레이션만 실행)"""
+        applied = run_migrations(self.db_path)
+        if applied:
+            db_logger.info("스키마 마이그레이션 적용: %s (%s)", ', '.join(applied), self.db_path)
     
     def detect_language(self, text):
         """언어 감지: 한국어면 True, 영어면 False 반환"""
@@ -103,26 +1646,114 @@ class BookTracker:
         return bool(korean_pattern.search(text))
     
     def search_book_info(self, query):
+        """언어별 API 선택하여 도서 정보 검색 - 같은 검색어의 동시 호출은 외부 조회 한 번으로 합침"""
+        key = self._lookup_key(query)
+        books = search_flight.do(
+            (self.db_path, key),
+            lambda: self._coalesce_across_workers(key, lambda: self._search_book_info(query))
+        )
+        # 검색 결과는 자동완성 후보로도 사용
+        self._suggest_index.add_provider_results(books)
+        return books
+    
+    def _lookup_key(self, query):
+        """조회 합치기 키 - ISBN은 숫자만, 제목은 공백 정리 후 소문자"""
+        if self._is_isbn(query):
+            return 'isbn:' + re.sub(r'[\s-]', '', query.strip()).upper()
+        return 'title:' + ' '.join(query.split()).lower()
+    
+    def _coalesce_across_workers(self, key, lookup):
+        """다른 워커 프로세스가 같은 키를 조회 중이면 그 결과를 기다려 사용 (SQLite 임대 테이블)"""
+        if not SEARCH_COALESCE_ACROSS_WORKERS:
+            return lookup()
+        
+        if not self._claim_lookup(key):
+            result = self._wait_for_lookup(key)
+            if result is not None:
+                SINGLEFLIGHT_CALLS.inc(scope='workers', role='shared')
+                return result
+            # 기다린 조회가 실패했거나 임대 시간이 지나면 직접 조회
+        
+        SINGLEFLIGHT_CALLS.inc(scope='workers', role='leader')
+        try:
+            result = lookup()
+        except Exception:
+            self._release_lookup(key)
+            raise
+        self._publish_lookup(key, result)
+        return result
+    
+    def _claim_lookup(self, key):
+        """조회 임대 획득 시도 - 오래된 임대와 공유 기간이 지난 결과는 먼저 정리"""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        cursor = conn.cursor()
+        cursor.execute('''
+            DELETE FROM inflight_lookups
+            WHERE (finished_at IS NULL AND started_at < ?) OR finished_at < ?
+        ''', (now - SEARCH_COALESCE_LEASE_SECONDS, now - SEARCH_COALESCE_RESULT_TTL))
+        cursor.execute('''
+            INSERT OR IGNORE INTO inflight_lookups (lookup_key, owner, started_at) VALUES (?, ?, ?)
+        ''', (key, f"{os.getpid()}-{threading.get_ident()}", now))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return claimed
+    
+    def _wait_for_lookup(self, key):
+        """다른 워커의 조회 결과를 임대 시간까지 기다림 (실패/만료 시 None)"""
+        deadline = time.time() + SEARCH_COALESCE_LEASE_SECONDS
+        with timing_span('search.coalesce_wait'):
+            while time.time() < deadline:
+                conn = sqlite3.connect(self.db_path, timeout=10)
+                row = conn.execute(
+                    'SELECT finished_at, result FROM inflight_lookups WHERE lookup_key = ?', (key,)
+                ).fetchone()
+                conn.close()
+                if row is None:
+                    return None  # 조회한 워커가 실패해 임대를 반납함
+                if row[0] is not None:
+                    return json.loads(row[1])
+                time.sleep(0.05)
+        return None
+    
+    def _publish_lookup(self, key, result):
+        """조회 결과를 기록해 기다리는 워커가 사용할 수 있도록 함"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('''
+            UPDATE inflight_lookups SET finished_at = ?, result = ? WHERE lookup_key = ?
+        ''', (time.time(), json.dumps(result, ensure_ascii=False), key))
+        conn.commit()
+        conn.close()
+    
+    def _release_lookup(self, key):
+        """조회 실패 시 임대 반납"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute('DELETE FROM inflight_lookups WHERE lookup_key = ? AND finished_at IS NULL', (key,))
+        conn.commit()
+        conn.close()
+    
+    def _search_book_info(self, query):
         """언어별 API 선택하여 도서 정보 검색 - 단순화된 ISBN 지원"""
         
         # ISBN 번호인지 확인 (개별 검색에서만 지원)
         if self._is_isbn(query):
-            print(f"개별 ISBN 검색: {query}")
+            search_logger.debug("개별 ISBN 검색: %s", query)
             try:
                 books = self.search_by_isbn(query)
                 if books:
                     return books
                 else:
-                    print(f"ISBN 검색 실패, 일반 검색으로 대체")
+                    search_logger.debug("ISBN 검색 실패, 일반 검색으로 대체: %s", query)
             except Exception as e:
-                print(f"ISBN 검색 오류: {e}, 일반 검색으로 대체")
+                search_logger.warning("ISBN 검색 오류: %s, 일반 검색으로 대체", e)
         
         # 일반 제목 검색
         # 검색용 제목 전처리
         clean_query = self._preprocess_title_for_search(query)
         is_korean = self.detect_language(clean_query)
         
-        print(f"원본 제목: '{query}' -> 검색용: '{clean_query}'")
+        search_logger.debug("원본 제목: '%s' -> 검색용: '%s'", query, clean_query)
         
         if is_korean:
             # 한국어 제목: 네이버 Books API 사용
@@ -168,39 +1799,39 @@ class BookTracker:
     def search_by_isbn(self, isbn):
         """ISBN으로 책 검색 - 한국 도서 특화"""
         isbn = re.sub(r'[\s-]', '', isbn.strip())  # 공백, 하이픈 제거
-        print(f"  정규화된 ISBN: {isbn}")
+        search_logger.debug("정규화된 ISBN: %s", isbn)
         
         # 한국 도서인지 확인 (979-11로 시작하는 신 한국 ISBN)
         is_korean_book = isbn.startswith('979') or isbn.startswith('978') and len(isbn) >= 5 and isbn[3:5] in ['89', '11']
         
         if is_korean_book:
-            print(f"  한국 도서로 판단, 네이버 우선 검색")
+            search_logger.debug("한국 도서로 판단, 네이버 우선 검색: %s", isbn)
             # 한국 도서면 네이버 먼저
             books = self._search_naver_books_by_isbn(isbn)
             if books:
-                print(f"  네이버 Books ISBN 검색 성공: {len(books)}권")
+                search_logger.debug("네이버 Books ISBN 검색 성공: %d권", len(books))
                 return books
             
             # 네이버 실패시 Google Books 시도
             books = self._search_google_books_by_isbn(isbn)
             if books:
-                print(f"  Google Books ISBN 검색 성공: {len(books)}권")
+                search_logger.debug("Google Books ISBN 검색 성공: %d권", len(books))
                 return books
         else:
-            print(f"  해외 도서로 판단, Google Books 우선 검색")
+            search_logger.debug("해외 도서로 판단, Google Books 우선 검색: %s", isbn)
             # 해외 도서면 Google Books 먼저
             books = self._search_google_books_by_isbn(isbn)
             if books:
-                print(f"  Google Books ISBN 검색 성공: {len(books)}권")
+                search_logger.debug("Google Books ISBN 검색 성공: %d권", len(books))
                 return books
             
             # Google 실패시 네이버 시도
             books = self._search_naver_books_by_isbn(isbn)
             if books:
-                print(f"  네이버 Books ISBN 검색 성공: {len(books)}권")
+                search_logger.debug("네이버 Books ISBN 검색 성공: %d권", len(books))
                 return books
             
-        print(f"  모든 ISBN 전용 검색 실패: {isbn}")
+        search_logger.info("모든 ISBN 전용 검색 실패: %s", isbn)
         return []
     
     def _search_google_books_by_isbn(self, isbn):
@@ -216,13 +1847,13 @@ class BookTracker:
         
         for query in search_queries:
             try:
-                print(f"  Google Books 검색 시도: {query}")
-                url = f"https://www.googleapis.com/books/v1/volumes?q={quote(query)}"
-                response = requests.get(url, timeout=5)
+                search_logger.debug("Google Books 검색 시도: %s", query)
+                url = f"{GOOGLE_BOOKS_API_BASE_URL}/books/v1/volumes?q={quote(query)}"
+                response = api_session.get(url, timeout=5)
                 
                 if response.status_code == 200:
                     data = response.json()
-                    print(f"    응답: {data.get('totalItems', 0)}개 결과")
+                    search_logger.debug("응답: %d개 결과", data.get('totalItems', 0))
                     
                     if data.get('totalItems', 0) > 0:
                         for item in data['items'][:3]:  # 상위 3개 결과
@@ -241,39 +1872,34 @@ class BookTracker:
                             
                             # ISBN이 매칭되지 않으면 제목으로라도 확인
                             if not isbn_found and query == isbn:
-                                print(f"    ISBN 매칭 실패하지만 일반 검색 결과 사용")
+                                search_logger.debug("ISBN 매칭 실패하지만 일반 검색 결과 사용")
                                 isbn_found = True
                             
                             if isbn_found:
-                                book_info = {
-                                    'title': volume_info.get('title', 'Unknown'),
-                                    'authors': ', '.join(volume_info.get('authors', ['Unknown'])),
-                                    'publisher': volume_info.get('publisher', 'Unknown'),
-                                    'published_date': volume_info.get('publishedDate', 'Unknown'),
-                                    'description': volume_info.get('description', ''),
-                                    'thumbnail_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
+                                book_info = self._book_info_from_payload('google', item)
+                                book_info.update({
                                     'isbn': isbn,
                                     'api_source': f'google_isbn_{query}',
                                     'similarity_score': 1.0 if isbn_found else 0.8
-                                }
+                                })
                                 books.append(book_info)
-                                print(f"    찾은 책: {book_info['title']} by {book_info['authors']}")
+                                search_logger.debug("찾은 책: %s by %s", book_info['title'], book_info['authors'])
                         
                         if books:
-                            print(f"  Google Books 성공: {len(books)}권 찾음")
+                            search_logger.debug("Google Books 성공: %d권 찾음", len(books))
                             return books
                             
             except Exception as e:
-                print(f"    검색 오류 ({query}): {e}")
+                search_logger.warning("Google Books ISBN 검색 오류 (%s): %s", query, e)
                 continue
         
-        print(f"  Google Books ISBN 검색 실패: {isbn}")
+        search_logger.debug("Google Books ISBN 검색 실패: %s", isbn)
         return []
     
     def _search_naver_books_by_isbn(self, isbn):
         """네이버 Books API로 ISBN 검색 - 개선된 검색"""
         if not NAVER_CLIENT_ID or not NAVER_CLIENT_SECRET:
-            print("  네이버 API 키 없음, 건너뜀")
+            search_logger.debug("네이버 API 키 없음, 건너뜀")
             return []
         
         # 여러 검색 방법 시도
@@ -285,8 +1911,8 @@ class BookTracker:
         
         for query in search_queries:
             try:
-                print(f"  네이버 검색 시도: {query}")
-                url = "https://openapi.naver.com/v1/search/book.json"
+                search_logger.debug("네이버 검색 시도: %s", query)
+                url = f"{NAVER_API_BASE_URL}/v1/search/book.json"
                 headers = {
                     'X-Naver-Client-Id': NAVER_CLIENT_ID,
                     'X-Naver-Client-Secret': NAVER_CLIENT_SECRET
@@ -298,17 +1924,16 @@ class BookTracker:
                     'sort': 'sim'  # 정확도순
                 }
                 
-                response = requests.get(url, headers=headers, params=params, timeout=5)
+                response = api_session.get(url, headers=headers, params=params, timeout=5)
                 
                 if response.status_code == 200:
                     data = response.json()
                     items = data.get('items', [])
-                    print(f"    응답: {len(items)}개 결과")
+                    search_logger.debug("응답: %d개 결과", len(items))
                     
                     books = []
                     for item in items:
                         item_isbn = item.get('isbn', '')
-                        item_title = self._clean_html_tags(item.get('title', ''))
                         
                         # ISBN 매칭 확인 (더 관대하게)
                         isbn_match = False
@@ -324,32 +1949,28 @@ class BookTracker:
                         
                         # 첫 번째 쿼리에서는 모든 결과 포함 (네이버가 관련성 판단)
                         if isbn_match or query == isbn:
-                            book_info = {
-                                'title': item_title,
-                                'authors': self._clean_html_tags(item.get('author', 'Unknown')),
-                                'publisher': self._clean_html_tags(item.get('publisher', 'Unknown')),
-                                'published_date': item.get('pubdate', 'Unknown'),
-                                'description': self._clean_html_tags(item.get('description', '')),
-                                'thumbnail_url': item.get('image', ''),
+                            book_info = self._book_info_from_payload('naver_book', item)
+                            book_info.update({
                                 'isbn': isbn,
                                 'kyobo_link': item.get('link', ''),
                                 'api_source': f'naver_isbn_{query}',
                                 'similarity_score': 1.0 if isbn_match else 0.8
-                            }
+                            })
                             books.append(book_info)
-                            print(f"    찾은 책: {item_title} (ISBN 매칭: {isbn_match})")
+                            search_logger.debug("찾은 책: %s (ISBN 매칭: %s)", book_info['title'], isbn_match)
                     
                     if books:
-                        print(f"  네이버 성공: {len(books)}권 찾음")
+                        search_logger.debug("네이버 성공: %d권 찾음", len(books))
                         return books
                         
             except Exception as e:
-                print(f"    네이버 검색 오류 ({query}): {e}")
+                search_logger.warning("네이버 ISBN 검색 오류 (%s): %s", query, e)
                 continue
         
-        print(f"  네이버 ISBN 검색 실패: {isbn}")
+        search_logger.debug("네이버 ISBN 검색 실패: %s", isbn)
         return []
     
+    @timing_span('search.preprocess')
     def _preprocess_title_for_search(self, title):
         """검색용 제목 전처리 - 부제목, 설명문 제거"""
         if not title:
@@ -377,6 +1998,7 @@ class BookTracker:
         
         return clean_title
     
+    @timing_span('search.filter')
     def _filter_search_results(self, books, original_title):
         """검색 결과 필터링 - 제목 유사성 검증"""
         if not books:
@@ -398,7 +2020,7 @@ class BookTracker:
                 common_words = original_words.intersection(result_words)
                 similarity = len(common_words) / min(len(original_words), len(result_words))
                 
-                print(f"  유사도 {similarity:.2f}: '{book.get('title')}' by {book.get('authors')}")
+                search_logger.debug("유사도 %.2f: '%s' by %s", similarity, book.get('title'), book.get('authors'))
                 
                 # 유사도 0.3 이상만 허용 (30% 이상 단어 일치)
                 if similarity >= 0.3:
@@ -412,18 +2034,18 @@ class BookTracker:
         # 유사도 순으로 정렬
         filtered_books.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
         
-        print(f"  필터링 결과: {len(books)} -> {len(filtered_books)}권")
+        search_logger.debug("필터링 결과: %d -> %d권", len(books), len(filtered_books))
         return filtered_books
     
     def search_naver_books(self, query):
         """네이버 Books API로 도서 정보 검색"""
         if not NAVER_CLIENT_ID or not NAVER_CLIENT_SECRET:
-            print("네이버 API 키가 설정되지 않았습니다. Google Books API를 사용합니다.")
+            search_logger.info("네이버 API 키가 설정되지 않았습니다. Google Books API를 사용합니다.")
             return self.search_google_books(query)
         
         try:
             # 네이버 검색 API 호출
-            url = "https://openapi.naver.com/v1/search/book.json"
+            url = f"{NAVER_API_BASE_URL}/v1/search/book.json"
             headers = {
                 'X-Naver-Client-Id': NAVER_CLIENT_ID,
                 'X-Naver-Client-Secret': NAVER_CLIENT_SECRET
@@ -435,23 +2057,15 @@ class BookTracker:
                 'sort': 'sim'  # 정확도순
             }
             
-            response = requests.get(url, headers=headers, params=params, timeout=3)
+            response = api_session.get(url, headers=headers, params=params, timeout=3)
             
             if response.status_code == 200:
                 data = response.json()
                 books = []
                 
                 for item in data.get('items', []):
-                    book_info = {
-                        'title': self._clean_html_tags(item.get('title', 'Unknown')),
-                        'authors': self._clean_html_tags(item.get('author', 'Unknown')),
-                        'publisher': self._clean_html_tags(item.get('publisher', 'Unknown')),
-                        'published_date': item.get('pubdate', 'Unknown'),
-                        'description': self._clean_html_tags(item.get('description', '')),
-                        'thumbnail_url': item.get('image', ''),
-                        'isbn': item.get('isbn', ''),
-                        'api_source': 'naver'
-                    }
+                    book_info = self._book_info_from_payload('naver_book', item)
+                    book_info['api_source'] = 'naver'
                     
                     # 네이버 쇼핑에서 교보문고 링크 찾기
                     kyobo_link = self._find_kyobo_link(book_info['title'], book_info['isbn'])
@@ -462,10 +2076,10 @@ class BookTracker:
                 
                 return books
             else:
-                print(f"네이버 API 오류: {response.status_code}")
+                search_logger.warning("네이버 API 오류: %s", response.status_code)
                 
         except Exception as e:
-            print(f"네이버 API 호출 오류: {e}")
+            search_logger.warning("네이버 API 호출 오류: %s", e)
         
         return []
     
@@ -476,7 +2090,7 @@ class BookTracker:
         
         try:
             # 네이버 쇼핑 API 호출
-            url = "https://openapi.naver.com/v1/search/shop.json"
+            url = f"{NAVER_API_BASE_URL}/v1/search/shop.json"
             headers = {
                 'X-Naver-Client-Id': NAVER_CLIENT_ID,
                 'X-Naver-Client-Secret': NAVER_CLIENT_SECRET
@@ -491,7 +2105,7 @@ class BookTracker:
                 'sort': 'sim'
             }
             
-            response = requests.get(url, headers=headers, params=params, timeout=3)
+            response = api_session.get(url, headers=headers, params=params, timeout=3)
             
             if response.status_code == 200:
                 data = response.json()
@@ -509,7 +2123,7 @@ class BookTracker:
                         return link
                 
         except Exception as e:
-            print(f"교보문고 링크 검색 오류: {e}")
+            search_logger.warning("교보문고 링크 검색 오류: %s", e)
         
         return None
     
@@ -517,8 +2131,8 @@ class BookTracker:
         """Google Books API로 도서 정보 검색"""
         try:
             # Google Books API 호출
-            url = f"https://www.googleapis.com/books/v1/volumes?q={quote(query)}"
-            response = requests.get(url, timeout=3)
+            url = f"{GOOGLE_BOOKS_API_BASE_URL}/books/v1/volumes?q={quote(query)}"
+            response = api_session.get(url, timeout=3)
             
             if response.status_code == 200:
                 data = response.json()
@@ -526,27 +2140,51 @@ class BookTracker:
                 if data.get('totalItems', 0) > 0:
                     books = []
                     for item in data['items'][:5]:  # 상위 5개 결과만
-                        volume_info = item.get('volumeInfo', {})
-                        
-                        book_info = {
-                            'title': volume_info.get('title', 'Unknown'),
-                            'authors': ', '.join(volume_info.get('authors', ['Unknown'])),
-                            'publisher': volume_info.get('publisher', 'Unknown'),
-                            'published_date': volume_info.get('publishedDate', 'Unknown'),
-                            'description': volume_info.get('description', ''),
-                            'thumbnail_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
-                            'isbn': self._extract_isbn(volume_info.get('industryIdentifiers', [])),
-                            'api_source': 'google'
-                        }
+                        book_info = self._book_info_from_payload('google', item)
+                        book_info['api_source'] = 'google'
                         books.append(book_info)
                     
                     return books
                 
         except Exception as e:
-            print(f"Google Books API 호출 오류: {e}")
+            search_logger.warning("Google Books API 호출 오류: %s", e)
         
         return []
     
+    def _book_info_from_payload(self, provider, item, remember=True):
+        """외부 응답 항목 하나를 현재 파서로 해석 (remember면 원본을 보관하고 payload_key를 붙임)"""
+        parser = self._parse_naver_item if provider == 'naver_book' else self._parse_google_volume
+        book_info = parser(item)
+        if remember:
+            book_info['payload_key'] = raw_payloads.put(provider, item)
+        return book_info
+    
+    def _parse_naver_item(self, item):
+        """네이버 책 검색 응답 항목 -> 책 정보"""
+        return {
+            'title': self._clean_html_tags(item.get('title', 'Unknown')),
+            'authors': self._clean_html_tags(item.get('author', 'Unknown')),
+            'publisher': self._clean_html_tags(item.get('publisher', 'Unknown')),
+            'published_date': item.get('pubdate', 'Unknown'),
+            'description': self._clean_html_tags(item.get('description', '')),
+            'thumbnail_url': item.get('image', ''),
+            'isbn': item.get('isbn', '')
+        }
+    
+    def _parse_google_volume(self, item):
+        """Google Books 볼륨 항목 -> 책 정보"""
+        volume_info = item.get('volumeInfo', {})
+        return {
+            'title': volume_info.get('title', 'Unknown'),
+            'authors': ', '.join(volume_info.get('authors', ['Unknown'])),
+            'publisher': volume_info.get('publisher', 'Unknown'),
+            'published_date': volume_info.get('publishedDate', 'Unknown'),
+            'description': volume_info.get('description', ''),
+            'thumbnail_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
+            'isbn': self._extract_isbn(volume_info.get('industryIdentifiers', [])),
+            'etag': item.get('etag', '')
+        }
+    
     def _clean_html_tags(self, text):
         """HTML 태그 제거"""
         if not text:
@@ -569,24 +2207,32 @@ class BookTracker:
         
         cursor.execute('''
             INSERT INTO books (title, authors, publisher, published_date, isbn, 
-                             description, thumbnail_url, price, notes, kyobo_link)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                             thumbnail_url, price, notes, kyobo_link, title_norm, isbn_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             book_info['title'],
             book_info['authors'],
             book_info['publisher'],
             book_info['published_date'],
             book_info['isbn'],
-            book_info['description'],
             book_info['thumbnail_url'],
             price,
             notes,
-            book_info.get('kyobo_link', '')
+            book_info.get('kyobo_link', ''),
+            normalize_title_key(book_info['title']) or None,
+            canonical_isbn(book_info['isbn']) or None
         ))
+        book_id = cursor.lastrowid
+        self._save_isbn_keys(cursor, book_id, book_info['isbn'])
+        self._save_book_details(cursor, book_id, book_info)
+        self._record_field_fetch(cursor, book_id, book_info)
+        self._save_payload(cursor, book_id, book_info)
+        change = self._read_library_change(cursor, book_id)
         
         conn.commit()
-        book_id = cursor.lastrowid
         conn.close()
+        self._apply_library_change(change)
+        self._schedule_cover_color(change)
         
         return book_id
     
@@ -597,7 +2243,7 @@ class BookTracker:
         
         cursor.execute('''
             INSERT INTO books (title, authors, publisher, published_date, isbn, 
-                             description, thumbnail_url, price, notes, kyobo_link)
+                             thumbnail_url, price, notes, kyobo_link, title_norm)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             title,
@@ -606,15 +2252,20 @@ class BookTracker:
             'Unknown',  # 기본값
             '',         # 기본값
             '',         # 기본값
-            '',         # 기본값
             price,
             notes,
-            ''          # 기본값
+            '',         # 기본값
+            normalize_title_key(title) or None
         ))
+        book_id = cursor.lastrowid
+        cursor.execute('''
+            INSERT OR IGNORE INTO enrichment_queue (book_id, priority) VALUES (?, ?)
+        ''', (book_id, ENRICH_PRIORITY_IMPORTED))
+        change = self._read_library_change(cursor, book_id)
         
         conn.commit()
-        book_id = cursor.lastrowid
         conn.close()
+        self._apply_library_change(change)
         
         return book_id
     
@@ -626,58 +2277,314 @@ class BookTracker:
         cursor.execute('''
             UPDATE books SET 
                 authors = ?, publisher = ?, published_date = ?, isbn = ?,
-                description = ?, thumbnail_url = ?, kyobo_link = ?
+                thumbnail_url = ?, kyobo_link = ?, isbn_norm = ?,
+                cover_color = CASE WHEN thumbnail_url IS ? THEN cover_color END
             WHERE id = ?
         ''', (
             book_info['authors'],
             book_info['publisher'],
             book_info['published_date'],
             book_info['isbn'],
-            book_info['description'],
             book_info['thumbnail_url'],
             book_info.get('kyobo_link', ''),
+            canonical_isbn(book_info['isbn']) or None,
+            book_info['thumbnail_url'],
             book_id
         ))
+        rows_affected = cursor.rowcount
+        if rows_affected > 0:
+            self._save_isbn_keys(cursor, book_id, book_info['isbn'])
+            self._save_book_details(cursor, book_id, book_info)
+            self._record_field_fetch(cursor, book_id, book_info)
+            self._save_payload(cursor, book_id, book_info)
+            change = self._read_library_change(cursor, book_id)
         
         conn.commit()
-        rows_affected = cursor.rowcount
         conn.close()
+        if rows_affected > 0:
+            self._apply_library_change(change)
+            self._schedule_cover_color(change)
         
         return rows_affected > 0
     
-    def get_all_books(self):
-        """모든 책 목록 조회"""
+    def _read_library_change(self, cursor, book_id):
+        """쓰기 직후(커밋 전) 같은 트랜잭션에서 새 도서관 버전과 바뀐 책 레코드를 읽음 (스냅샷/자동완성 증분 갱신용)"""
+        version = self._read_library_version(cursor)
+        cursor.execute(f'SELECT {BookRecord.SELECT_COLUMNS} FROM books WHERE id = ?', (book_id,))
+        row = cursor.fetchone()
+        return version, book_id, BookRecord.from_row(row) if row else None
+    
+    def _apply_library_change(self, change):
+        """커밋된 쓰기 한 건을 도서관 스냅샷과 자동완성 인덱스에 반영 (바로 앞 버전일 때만, 아니면 다음 조회 때 다시 읽음)"""
+        version, book_id, record = change
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version - 1:
+                if not snapshot.apply_change(version, book_id, record):
+                    self._snapshot = None
+        self._suggest_index.apply_library_change(version, book_id, record)
+    
+    def _library_snapshot(self):
+        """현재 도서관 버전의 스냅샷 - 버전이 같으면 메모리의 것을 그대로, 다르면 DB에서 다시 읽음"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            # 버전과 목록을 같은 읽기 트랜잭션에서 조회해 스냅샷 버전과 내용이 어긋나지 않도록 함
+            cursor.execute('BEGIN')
+            version = self._read_library_version(cursor)
+            snapshot = self._snapshot
+            record_cache_lookup('library_snapshot', snapshot is not None and snapshot.version == version)
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            
+            cursor.execute(f'SELECT {BookRecord.SELECT_COLUMNS} FROM books ORDER BY purchase_date DESC')
+            snapshot = LibrarySnapshot(version, tuple(BookRecord.from_row(row) for row in cursor.fetchall()))
+        finally:
+            conn.close()
+        
+        with self._snapshot_lock:
+            if self._snapshot is None or self._snapshot.version < version:
+                self._snapshot = snapshot
+        return snapshot
+    
+    def suggest(self, query, limit=8):
+        """검색어 자동완성 - 도서관이 바뀌었으면(다른 워커의 쓰기 등) 스냅샷으로 인덱스를 다시 만든 뒤 조회"""
+        version = self.get_library_version()
+        if self._suggest_index.library_version != version:
+            with self._suggest_index._lock:
+                if self._suggest_index.library_version != version:
+                    snapshot = self._library_snapshot()
+                    conn = sqlite3.connect(self.db_path)
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT title_norm, id FROM books WHERE title_norm IS NOT NULL
+                        UNION ALL
+                        SELECT isbn_norm, book_id FROM book_isbns
+                    ''')
+                    self._suggest_index.rebuild_library(snapshot.version, snapshot.records, cursor.fetchall())
+                    conn.close()
+        return self._suggest_index.lookup(query, limit)
+    
+    def _save_isbn_keys(self, cursor, book_id, isbn):
+        """책의 ISBN별 중복 검사 키를 book_isbns에 저장 (기존 키는 교체)"""
+        cursor.execute('DELETE FROM book_isbns WHERE book_id = ?', (book_id,))
+        cursor.executemany('INSERT OR IGNORE INTO book_isbns (book_id, isbn_norm) VALUES (?, ?)',
+                           [(book_id, key) for key in isbn_keys(isbn)])
+    
+    def _save_book_details(self, cursor, book_id, book_info):
+        """큰 상세 필드를 book_details 테이블에 저장 (값이 없으면 행 삭제)"""
+        description = book_info.get('description') or ''
+        if description:
+            cursor.execute('''
+                INSERT OR REPLACE INTO book_details (book_id, description) VALUES (?, ?)
+            ''', (book_id, description))
+        else:
+            cursor.execute('DELETE FROM book_details WHERE book_id = ?', (book_id,))
+    
+    def _record_field_fetch(self, cursor, book_id, book_info, fields=FRESHNESS_FIELDS):
+        """제공자에서 받은 필드 값을 신선도 기록에 반영 (값이 없는 필드는 깨진 것으로 표시)"""
+        now = time.time()
+        rows = []
+        for field in fields:
+            value_hash = field_value_hash(book_info.get(field))
+            rows.append((book_id, field, book_info.get('api_source'), value_hash, book_info.get('etag') or None,
+                         now, now, value_hash is None))
+        cursor.executemany('''
+            INSERT INTO book_field_status (book_id, field, source, value_hash, etag, fetched_at, checked_at, broken)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (book_id, field) DO UPDATE SET
+                source = excluded.source, value_hash = excluded.value_hash, etag = excluded.etag,
+                fetched_at = excluded.fetched_at, checked_at = excluded.checked_at, broken = excluded.broken
+        ''', rows)
+    
+    def _save_payload(self, cursor, book_id, book_info):
+        """책 값을 만든 외부 응답 원본을 압축해 저장
+        
+        이 워커 메모리에 원본이 없으면 book_payloads에 이미 저장된 같은 원본(payload_key)을 압축된 그대로 복사하고,
+        그것도 없으면 예전 원본이 새 값을 되돌리지 않도록 삭제합니다.
+        """
+        payload_key = book_info.get('payload_key') or ''
+        cached = raw_payloads.get(payload_key)
+        if cached is not None:
+            provider, raw = cached
+            cursor.execute('''
+                INSERT OR REPLACE INTO book_payloads (book_id, provider, fetched_at, payload, payload_key)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (book_id, provider, time.time(), zlib.compress(raw.encode('utf-8'), PAYLOAD_COMPRESS_LEVEL), payload_key))
+            return
+        if payload_key:
+            cursor.execute('''
+                INSERT OR REPLACE INTO book_payloads (book_id, provider, fetched_at, payload, payload_key)
+                SELECT ?, provider, fetched_at, payload, payload_key FROM book_payloads WHERE payload_key = ? LIMIT 1
+            ''', (book_id, payload_key))
+            if cursor.rowcount > 0:
+                return
+        cursor.execute('DELETE FROM book_payloads WHERE book_id = ?', (book_id,))
+    
+    def get_book_details(self, book_id):
+        """책 상세정보 조회 - 목록에서 제외된 큰 필드(description) 포함, 없는 책이면 None"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT b.id, COALESCE(d.description, '')
+            FROM books b LEFT JOIN book_details d ON d.book_id = b.id
+            WHERE b.id = ?
+        ''', (book_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'description': row[1]
+        }
+    
+    def get_library_version(self):
+        """도서관 버전 조회 (책이 추가/수정/삭제될 때마다 증가)"""
+        conn = sqlite3.connect(self.db_path)
+        version = self._read_library_version(conn.cursor())
+        conn.close()
+        return version
+    
+    def _read_library_version(self, cursor):
+        """주어진 커서로 도서관 버전 조회"""
+        cursor.execute("SELECT value FROM library_meta WHERE key = 'version'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    
+    def get_book_count(self):
+        """전체 책 수 조회 (트리거로 유지되는 카운터 사용)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM library_meta WHERE key = 'book_count'")
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else 0
+    
+    def get_recent_books(self, limit=6):
+        """최근 추가된 책 조회 - 메인 페이지용 (description 등 무거운 컬럼 제외)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        cursor.execute('BEGIN')
+        version = self._read_library_version(cursor)
+        cache_key = ('recent_books', limit)
+        cached = self._query_cache.get(cache_key, version)
+        if cached is not None:
+            conn.close()
+            return list(cached)
+        
         cursor.execute('''
-            SELECT id, title, authors, publisher, published_date, isbn, 
-                   description, thumbnail_url, purchase_date, price, notes, 
-                   kyobo_link, created_at 
-            FROM books ORDER BY purchase_date DESC
-        ''')
+            SELECT id, title, authors, publisher, thumbnail_url, purchase_date, price, cover_color
+            FROM books ORDER BY purchase_date DESC LIMIT ?
+        ''', (limit,))
         
         books = []
         for row in cursor.fetchall():
-            book = {
+            books.append({
                 'id': row[0],
                 'title': row[1],
                 'authors': row[2],
                 'publisher': row[3],
-                'published_date': row[4],
-                'isbn': row[5],
-                'description': row[6],
-                'thumbnail_url': row[7],
-                'purchase_date': row[8],
-                'price': row[9],
-                'notes': row[10],
-                'kyobo_link': row[11] if row[11] else '',
-                'created_at': row[12]
-            }
-            books.append(book)
+                'thumbnail_url': row[4],
+                'purchase_date': row[5],
+                'price': row[6],
+                'cover_color': row[7]
+            })
         
         conn.close()
-        return books
+        self._query_cache.set(cache_key, version, books)
+        return list(books)
+    
+    def get_library_stats(self, top_publishers=10):
+        """도서관 통계 조회 - SQL 집계로 계산하고 도서관 버전이 같으면 캐시된 결과 재사용"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        version = self._read_library_version(cursor)
+        cache_key = ('stats', top_publishers, stats_month())
+        cached = self._query_cache.get(cache_key, version)
+        if cached is not None:
+            conn.close()
+            return dict(cached)
+        
+        cursor.execute('''
+            SELECT COUNT(*),
+                   COALESCE(SUM(price), 0),
+                   COUNT(price),
+                   SUM(CASE WHEN purchase_date >= date('now', 'start of month') THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN notes IS NOT NULL AND notes != '' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN authors = 'Unknown' THEN 1 ELSE 0 END)
+            FROM books
+        ''')
+        total_count, total_price, priced_count, added_this_month, notes_count, unknown_count = cursor.fetchone()
+        unknown_count = unknown_count or 0
+        
+        cursor.execute('''
+            SELECT publisher, COUNT(*) AS book_count FROM books
+            WHERE publisher IS NOT NULL AND publisher != '' AND publisher != 'Unknown'
+            GROUP BY publisher ORDER BY book_count DESC, publisher LIMIT ?
+        ''', (top_publishers,))
+        publishers = [{'publisher': row[0], 'count': row[1]} for row in cursor.fetchall()]
+        conn.close()
+        
+        detailed_count = total_count - unknown_count
+        stats = {
+            'version': version,
+            'total_count': total_count,
+            'total_price': total_price,
+            'priced_count': priced_count,
+            'added_this_month': added_this_month or 0,
+            'notes_count': notes_count or 0,
+            'unknown_count': unknown_count,
+            'detailed_count': detailed_count,
+            'detail_coverage': round(detailed_count / total_count * 100, 1) if total_count else 0.0,
+            'top_publishers': publishers
+        }
+        self._query_cache.set(cache_key, version, stats)
+        return dict(stats)
+    
+    # 내보내기 컬럼 순서 - 첫 컬럼(title)은 CSV 가져오기(parse_csv_content)가 읽는 제목 컬럼
+    EXPORT_FIELDS = ('title', 'authors', 'publisher', 'published_date', 'isbn', 'price', 'notes',
+                     'purchase_date', 'kyobo_link', 'thumbnail_url', 'description', 'id')
+    
+    def iter_export_rows(self, batch_size=500):
+        """내보내기용 책 행을 id 순서로 batch_size개씩 읽어 하나씩 반환 (메모리 사용량 일정)
+        
+        느린 클라이언트에게 스트리밍하는 동안 읽기 잠금을 오래 잡지 않도록
+        배치마다 짧은 쿼리(id > 마지막 id)를 새로 실행합니다.
+        """
+        last_id = 0
+        while True:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT b.title, b.authors, b.publisher, b.published_date, b.isbn, b.price, b.notes,
+                       b.purchase_date, b.kyobo_link, b.thumbnail_url, COALESCE(d.description, ''), b.id
+                FROM books b LEFT JOIN book_details d ON d.book_id = b.id
+                WHERE b.id > ? ORDER BY b.id LIMIT ?
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            conn.close()
+            
+            for row in rows:
+                yield dict(zip(self.EXPORT_FIELDS, row))
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][-1]
+    
+    def get_all_books(self):
+        """모든 책 목록 조회 - 도서관 스냅샷의 읽기 전용 BookRecord 튜플 (구매일 최신순)
+        
+        책 소개(description)는 포함하지 않습니다. 필요하면 get_book_details()를 사용하세요.
+        """
+        return self._library_snapshot().records
+    
+    def get_book(self, book_id):
+        """id로 책 한 권 조회 (스냅샷에서, 없으면 None)"""
+        return self._library_snapshot().by_id.get(book_id)
     
     def delete_book(self, book_id):
         """책 삭제"""
@@ -695,11 +2602,14 @@ class BookTracker:
             
             # 책 삭제
             cursor.execute('DELETE FROM books WHERE id = ?', (book_id,))
+            deleted = cursor.rowcount
+            change = self._read_library_change(cursor, book_id)
             conn.commit()
             
             # 삭제된 행 수 확인
-            if cursor.rowcount > 0:
+            if deleted > 0:
                 conn.close()
+                self._apply_library_change(change)
                 return True, f'"{book[0]}" 책이 삭제되었습니다'
             else:
                 conn.close()
@@ -711,92 +2621,88 @@ class BookTracker:
             return False, f'삭제 중 오류가 발생했습니다: {str(e)}'
     
     def check_duplicate(self, title, isbn=None):
-        """중복 도서 검사 - 강화된 중복 검사"""
+        """중복 도서 검사 - 정규화된 ISBN/제목 키 인덱스로 조회"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # 1. ISBN이 있으면 ISBN 우선 검사
-            if isbn and isbn.strip():
+            # 1. ISBN이 있으면 ISBN 우선 검사 (ISBN이 여러 개면 어느 하나라도 같으면 중복)
+            keys = isbn_keys(isbn)
+            if keys:
                 try:
-                    clean_isbn = isbn.strip().replace('-', '').replace(' ', '')
-                    if clean_isbn:
-                        cursor.execute('SELECT title FROM books WHERE isbn = ? AND isbn != ""', (isbn,))
-                        result = cursor.fetchone()
-                        if result:
-                            conn.close()
-                            print(f"ISBN 중복 발견: {isbn} -> {result[0]}")
-                            return True
-                        
-                        # ISBN 정규화해서도 체크
-                        cursor.execute('SELECT isbn, title FROM books WHERE isbn != ""')
-                        existing_isbns = cursor.fetchall()
-                        for existing_isbn, existing_title in existing_isbns:
-                            clean_existing = existing_isbn.strip().replace('-', '').replace(' ', '')
-                            if clean_isbn == clean_existing:
-                                conn.close()
-                                print(f"정규화된 ISBN 중복 발견: {clean_isbn} -> {existing_title}")
-                                return True
+                    cursor.execute(f'''
+                        SELECT b.title FROM book_isbns i JOIN books b ON b.id = i.book_id
+                        WHERE i.isbn_norm IN ({','.join('?' * len(keys))}) LIMIT 1
+                    ''', keys)
+                    result = cursor.fetchone()
+                    if result:
+                        conn.close()
+                        db_logger.debug("ISBN 중복 발견: %s -> %s", isbn, result[0])
+                        return True
                 except Exception as isbn_error:
-                    print(f"ISBN 중복 검사 오류: {str(isbn_error)}")
+                    db_logger.warning("ISBN 중복 검사 오류: %s", isbn_error)
                     # ISBN 검사 실패해도 제목 검사 계속
             
-            # 2. 제목으로 중복 검사 (더 강화된 방식)
+            # 2. 정규화된 제목으로 중복 검사
             try:
-                cursor.execute('SELECT title FROM books')
-                existing_titles = [row[0] for row in cursor.fetchall()]
-                
-                # 더 엄격한 정규화
                 clean_title = self._normalize_title_for_duplicate_check(title)
-                
-                for existing in existing_titles:
-                    try:
-                        clean_existing = self._normalize_title_for_duplicate_check(existing)
-                        if clean_title and clean_existing and clean_title == clean_existing:
-                            conn.close()
-                            print(f"제목 중복 발견: '{title}' -> '{existing}'")
-                            return True
-                    except Exception as title_norm_error:
-                        print(f"제목 정규화 오류: {str(title_norm_error)}")
-                        continue
+                if clean_title:
+                    cursor.execute('SELECT title FROM books WHERE title_norm = ? LIMIT 1', (clean_title,))
+                    result = cursor.fetchone()
+                    if result:
+                        conn.close()
+                        db_logger.debug("제목 중복 발견: '%s' -> '%s'", title, result[0])
+                        return True
                         
             except Exception as title_error:
-                print(f"제목 중복 검사 오류: {str(title_error)}")
+                db_logger.warning("제목 중복 검사 오류: %s", title_error)
                 
             conn.close()
             return False
             
         except Exception as e:
-            print(f"중복 검사 전체 오류: {str(e)}")
+            db_logger.error("중복 검사 전체 오류: %s", e)
             # 오류 발생 시 안전하게 중복 아님으로 처리
             return False
     
+    def annotate_owned(self, books):
+        """검색 결과 각 후보에 보유 여부(is_owned, owned_book_id) 표시 - ISBN/제목 키를 한 번의 IN 쿼리로 조회"""
+        keys = []
+        for book in books:
+            keys.append((isbn_keys(book.get('isbn')), self._normalize_title_for_duplicate_check(book.get('title'))))
+        
+        all_isbns = sorted({key for book_isbn_keys, _ in keys for key in book_isbn_keys})
+        all_titles = sorted({title_key for _, title_key in keys if title_key})
+        owned_by_isbn, owned_by_title = {}, {}
+        
+        if all_isbns or all_titles:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT book_id, isbn_norm, NULL FROM book_isbns WHERE isbn_norm IN ({','.join('?' * len(all_isbns))})
+                UNION ALL
+                SELECT id, NULL, title_norm FROM books WHERE title_norm IN ({','.join('?' * len(all_titles))})
+            ''', all_isbns + all_titles)
+            for book_id, isbn_key, title_key in cursor.fetchall():
+                if isbn_key:
+                    owned_by_isbn.setdefault(isbn_key, book_id)
+                if title_key:
+                    owned_by_title.setdefault(title_key, book_id)
+            conn.close()
+        
+        for book, (book_isbn_keys, title_key) in zip(books, keys):
+            owned_id = next((owned_by_isbn[key] for key in book_isbn_keys if key in owned_by_isbn), None)
+            if owned_id is None:
+                owned_id = owned_by_title.get(title_key)
+            book['is_owned'] = owned_id is not None
+            book['owned_book_id'] = owned_id
+        return books
+    
     def _normalize_title_for_duplicate_check(self, title):
         """중복 검사용 제목 정규화 - 안전한 버전"""
-        try:
-            import re
-            if not title or not isinstance(title, str):
-                return ""
-            
-            # 기본 정규화
-            normalized = title.strip().lower()
-            
-            # 공백문자 정규화 (일반 공백, 전각 공백, 탭 등)
-            normalized = re.sub(r'\s+', '', normalized)
-            
-            # 특수문자 제거 (괄호, 하이픈, 콜론 등)
-            normalized = re.sub(r'[^\w가-힣]', '', normalized)
-            
-            # 연속된 문자 정리
-            normalized = re.sub(r'(.)\1{2,}', r'\1', normalized)
-            
-            return normalized
-            
-        except Exception as e:
-            print(f"제목 정규화 오류: {title} -> {str(e)}")
-            # 정규화 실패 시 기본 처리
-            return title.strip().lower() if title else ""
+        return normalize_title_key(title)
     
+    @background_priority
     def bulk_add_books(self, book_titles, progress_callback=None):
         """대량 책 추가 - 강화된 오류 처리"""
         results = {
@@ -812,7 +2718,7 @@ class BookTracker:
                 continue
                 
             try:
-                print(f"처리 중 ({i+1}/{len(book_titles)}): {title[:50]}...")
+                bulk_logger.debug("처리 중 (%d/%d): %s...", i + 1, len(book_titles), title[:50])
                 
                 # 진행률 콜백 호출
                 if progress_callback:
@@ -827,7 +2733,7 @@ class BookTracker:
                         })
                         continue
                 except Exception as dup_error:
-                    print(f"중복 검사 오류: {str(dup_error)}")
+                    bulk_logger.warning("중복 검사 오류: %s", dup_error)
                     # 중복 검사 실패해도 계속 진행
                 
                 # 책 정보 검색 - 더 강력한 재시도 로직
@@ -841,9 +2747,9 @@ class BookTracker:
                         if books:
                             break
                         else:
-                            print(f"검색 결과 없음 (시도 {retry+1}/{max_retries}): {title}")
+                            bulk_logger.debug("검색 결과 없음 (시도 %d/%d): %s", retry + 1, max_retries, title)
                     except Exception as search_error:
-                        print(f"검색 오류 (시도 {retry+1}/{max_retries}): {str(search_error)}")
+                        bulk_logger.warning("검색 오류 (시도 %d/%d): %s", retry + 1, max_retries, search_error)
                         if retry == max_retries - 1:
                             # 마지막 시도에서도 실패하면 오류로 기록
                             raise search_error
@@ -862,10 +2768,10 @@ class BookTracker:
                             'authors': book_info['authors'],
                             'id': book_id
                         })
-                        print(f"추가 성공: {book_info['title']}")
+                        bulk_logger.debug("추가 성공: %s", book_info['title'])
                         
                     except Exception as add_error:
-                        print(f"DB 추가 오류: {str(add_error)}")
+                        bulk_logger.error("DB 추가 오류: %s", add_error)
                         results['errors'].append({
                             'title': title,
                             'reason': f'데이터베이스 추가 실패: {str(add_error)}'
@@ -878,22 +2784,16 @@ class BookTracker:
                     
             except Exception as e:
                 # 상세한 오류 정보 기록
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"책 처리 중 예외: {title} - {str(e)}")
-                print(f"상세 오류: {error_trace}")
+                bulk_logger.exception("책 처리 중 예외: %s - %s", title, e)
                 
                 results['errors'].append({
                     'title': title,
                     'reason': f'처리 중 오류: {str(e)}'
                 })
             
-            # 서버 부하 방지를 위한 짧은 대기
-            if i > 0 and i % 5 == 0:  # 5권마다 잠시 대기
-                import time
-                time.sleep(0.1)
         
-        print(f"벌크 처리 완료: 성공 {len(results['success'])}, 중복 {len(results['duplicates'])}, 실패 {len(results['errors'])}")
+        bulk_logger.info("벌크 처리 완료: 성공 %d, 중복 %d, 실패 %d",
+                         len(results['success']), len(results['duplicates']), len(results['errors']))
         return results
     
     def bulk_add_books_safe(self, book_titles):
@@ -911,11 +2811,11 @@ class BookTracker:
                 continue
                 
             try:
-                print(f"안전 모드 처리 ({i+1}/{len(book_titles)}): {query[:50]}...")
+                bulk_logger.debug("안전 모드 처리 (%d/%d): %s...", i + 1, len(book_titles), query[:50])
                 
                 # 대량 추가에서는 ISBN 검색 제거 - 안전 모드로 단순화
                 actual_title = query.strip()
-                print(f"  안전 모드: 제목 '{actual_title}' 그대로 저장")
+                bulk_logger.debug("안전 모드: 제목 '%s' 그대로 저장", actual_title)
                 
                 # 중복 검사 (실제 제목으로)
                 try:
@@ -926,7 +2826,7 @@ class BookTracker:
                         })
                         continue
                 except Exception as dup_error:
-                    print(f"  중복 검사 실패, 계속 진행: {str(dup_error)}")
+                    bulk_logger.warning("중복 검사 실패, 계속 진행: %s", dup_error)
                     # 중복 검사 실패해도 계속 진행
                 
                 # 실제 제목으로 책 추가
@@ -937,18 +2837,20 @@ class BookTracker:
                     'authors': 'Unknown',
                     'id': book_id
                 })
-                print(f"안전 추가 성공: {actual_title}")
+                bulk_logger.debug("안전 추가 성공: %s", actual_title)
                 
             except Exception as e:
-                print(f"안전 모드에서도 오류: {query} - {str(e)}")
+                bulk_logger.error("안전 모드에서도 오류: %s - %s", query, e)
                 results['errors'].append({
                     'title': query,
                     'reason': f'데이터베이스 오류: {str(e)}'
                 })
         
-        print(f"안전 모드 처리 완료: 성공 {len(results['success'])}, 중복 {len(results['duplicates'])}, 실패 {len(results['errors'])}")
+        bulk_logger.info("안전 모드 처리 완료: 성공 %d, 중복 %d, 실패 %d",
+                         len(results['success']), len(results['duplicates']), len(results['errors']))
         return results
     
+    @background_priority
     def bulk_add_books_batch(self, book_titles, batch_size=50):
         """배치 단위로 대량 책 추가 - 435권 같은 대용량 처리용"""
         results = {
@@ -969,7 +2871,7 @@ class BookTracker:
             batch_num = (batch_start // batch_size) + 1
             total_batches = (total_books + batch_size - 1) // batch_size
             
-            print(f"배치 {batch_num}/{total_batches} 처리 중... ({len(batch_titles)}권)")
+            bulk_logger.info("배치 %d/%d 처리 중... (%d권)", batch_num, total_batches, len(batch_titles))
             
             # 각 배치 처리
             batch_results = self.bulk_add_books(batch_titles)
@@ -988,11 +2890,6 @@ class BookTracker:
                 'duplicate_count': len(batch_results['duplicates']),
                 'error_count': len(batch_results['errors'])
             })
-            
-            # 배치 간 잠시 대기 (서버 부하 방지)
-            if batch_end < total_books:
-                import time
-                time.sleep(2)
         
         return results
     
@@ -1027,7 +2924,7 @@ class BookTracker:
                         
         except Exception as e:
             # CSV 파싱 실패시 간단한 라인 단위 파싱으로 대체
-            print(f"CSV 파싱 오류 ({str(e)}), 라인 단위 파싱으로 전환")
+            bulk_logger.warning("CSV 파싱 오류 (%s), 라인 단위 파싱으로 전환", e)
             return self._parse_csv_fallback(csv_content)
         
         return titles
@@ -1108,7 +3005,8 @@ class BookTracker:
         
         cursor.execute('''
             SELECT job_id, status, total_books, processed_books, 
-                   success_count, error_count, created_at, updated_at, completed_at
+                   success_count, error_count, created_at, updated_at, completed_at,
+                   log_summary
             FROM update_jobs 
             WHERE job_id = ?
         ''', (job_id,))
@@ -1127,7 +3025,9 @@ class BookTracker:
                 'created_at': row[6],
                 'updated_at': row[7],
                 'completed_at': row[8],
-                'progress': (row[3] / row[2] * 100) if row[2] > 0 else 0
+                'progress': (row[3] / row[2] * 100) if row[2] > 0 else 0,
+                # 보존 기간이 지나 로그가 정리된 작업이면 로그 요약 (아니면 None)
+                'log_summary': json.loads(row[9]) if row[9] else None
             }
         return None
     
@@ -1159,6 +3059,8 @@ class BookTracker:
         
         conn.commit()
         conn.close()
+        
+        BACKGROUND_JOBS.inc(status=final_status)
     
     def log_update_result(self, job_id, book_id, book_title, success, message=""):
         """개별 책 업데이트 결과 로그"""
@@ -1172,117 +3074,683 @@ class BookTracker:
         
         conn.commit()
         conn.close()
+        
+        BACKGROUND_BOOKS.inc(result='success' if success else 'error')
     
     def get_update_logs(self, job_id, limit=10):
         """업데이트 로그 조회 (최근 N개)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
+        
+        cursor.execute('''
+            SELECT book_id, book_title, success, message, created_at
+            FROM update_logs 
+            WHERE job_id = ?
+            ORDER BY log_id DESC
+            LIMIT ?
+        ''', (job_id, limit))
+        
+        logs = []
+        for row in cursor.fetchall():
+            logs.append({
+                'book_id': row[0],
+                'book_title': row[1],
+                'success': bool(row[2]),
+                'message': row[3],
+                'created_at': row[4]
+            })
+        
+        conn.close()
+        return logs
+    
+    def run_log_maintenance(self, retention_days=None, job_retention_days=None, batch_size=None, vacuum_pages=None):
+        """업데이트 로그 보존 정책 적용 - 끝난 지 오래된 작업의 로그를 요약 후 삭제하고 빈 페이지 반환
+        
+        삭제는 batch_size 행씩 짧은 트랜잭션으로 나눠 실행해 요청 처리 중인 쓰기를 오래 막지 않습니다.
+        반환값: {'summarized_jobs', 'deleted_logs', 'deleted_jobs', 'vacuumed_pages'}
+        """
+        retention_days = UPDATE_LOG_RETENTION_DAYS if retention_days is None else retention_days
+        job_retention_days = UPDATE_JOB_RETENTION_DAYS if job_retention_days is None else job_retention_days
+        batch_size = LOG_PRUNE_BATCH_SIZE if batch_size is None else batch_size
+        vacuum_pages = INCREMENTAL_VACUUM_PAGES if vacuum_pages is None else vacuum_pages
+        stats = {'summarized_jobs': 0, 'deleted_logs': 0, 'deleted_jobs': 0, 'vacuumed_pages': 0}
+        
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            if retention_days >= 0:
+                # 요약 후 삭제가 중간에 끊긴 작업(요약은 있고 로그가 남음)도 이어서 삭제
+                cursor = conn.execute('''
+                    SELECT job_id, logs_pruned_at IS NULL FROM update_jobs
+                    WHERE completed_at IS NOT NULL AND completed_at < datetime('now', ?)
+                      AND (logs_pruned_at IS NULL
+                           OR EXISTS (SELECT 1 FROM update_logs WHERE update_logs.job_id = update_jobs.job_id))
+                ''', (f'-{retention_days} days',))
+                for job_id, needs_summary in cursor.fetchall():
+                    stats['deleted_logs'] += self._prune_job_logs(conn, job_id, batch_size, summarize=bool(needs_summary))
+                    stats['summarized_jobs'] += 1 if needs_summary else 0
+            
+            if job_retention_days >= 0:
+                # 아주 오래된 작업은 요약까지 삭제 (로그가 남아 있으면 위와 같이 나눠서 먼저 삭제)
+                cursor = conn.execute('''
+                    SELECT job_id FROM update_jobs
+                    WHERE completed_at IS NOT NULL AND completed_at < datetime('now', ?)
+                ''', (f'-{job_retention_days} days',))
+                for (job_id,) in cursor.fetchall():
+                    stats['deleted_logs'] += self._prune_job_logs(conn, job_id, batch_size, summarize=False)
+                    conn.execute('DELETE FROM update_jobs WHERE job_id = ?', (job_id,))
+                    stats['deleted_jobs'] += 1
+            
+            stats['vacuumed_pages'] = self._incremental_vacuum(conn, vacuum_pages)
+        finally:
+            conn.close()
+        
+        if any(stats.values()):
+            job_logger.info("로그 정리: 작업 %d개 요약, 로그 %d건 삭제, 작업 %d개 삭제, %d페이지 반환",
+                            stats['summarized_jobs'], stats['deleted_logs'], stats['deleted_jobs'], stats['vacuumed_pages'])
+        for action, count in stats.items():
+            if count:
+                MAINTENANCE_ROWS.inc(count, action=action)
+        return stats
+    
+    def _prune_job_logs(self, conn, job_id, batch_size, summarize=True):
+        """작업 하나의 로그를 (필요하면 요약을 남긴 뒤) batch_size 행씩 삭제하고 삭제한 행 수 반환"""
+        if summarize:
+            summary = self._summarize_job_logs(conn, job_id)
+            conn.execute('''
+                UPDATE update_jobs SET log_summary = ?, logs_pruned_at = CURRENT_TIMESTAMP WHERE job_id = ?
+            ''', (json.dumps(summary, ensure_ascii=False), job_id))
+        
+        deleted = 0
+        while True:
+            cursor = conn.execute('''
+                DELETE FROM update_logs WHERE log_id IN (
+                    SELECT log_id FROM update_logs WHERE job_id = ? ORDER BY log_id LIMIT ?
+                )
+            ''', (job_id, batch_size))
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+            time.sleep(0)  # 배치 사이에 다른 스레드가 쓰기 잠금을 잡을 기회를 줌
+    
+    @staticmethod
+    def _summarize_job_logs(conn, job_id):
+        """삭제 전 작업 로그 요약 - 건수, 성공/실패 수, 기간, 실패 사례 몇 건"""
+        total, success, first_at, last_at = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(success), 0), MIN(created_at), MAX(created_at)
+            FROM update_logs WHERE job_id = ?
+        ''', (job_id,)).fetchone()
+        errors = conn.execute('''
+            SELECT book_id, book_title, message FROM update_logs
+            WHERE job_id = ? AND NOT success ORDER BY log_id LIMIT ?
+        ''', (job_id, LOG_SUMMARY_ERROR_SAMPLES)).fetchall()
+        return {
+            'logs': total,
+            'success': success,
+            'errors': total - success,
+            'first_log_at': first_at,
+            'last_log_at': last_at,
+            'sample_errors': [
+                {'book_id': book_id, 'book_title': title, 'message': message}
+                for book_id, title, message in errors
+            ]
+        }
+    
+    @staticmethod
+    def _incremental_vacuum(conn, max_pages):
+        """빈 페이지를 최대 max_pages개 파일에서 반환하고 반환한 페이지 수를 돌려줌
+        
+        auto_vacuum이 INCREMENTAL이 아닌 예전 DB는 처음 한 번 전체 VACUUM으로 전환합니다.
+        """
+        if max_pages <= 0:
+            return 0
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            job_logger.info("DB를 incremental auto_vacuum 모드로 전환")
+        free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if free_before:
+            # execute()는 첫 단계(한 페이지)만 실행하므로 끝까지 실행되는 executescript 사용
+            conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+        return free_before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    
+    def claim_maintenance_run(self, interval):
+        """다음 정리 작업 실행 권한 획득 - 여러 워커 중 예정 시각이 지난 뒤 처음 요청한 한 곳만 True"""
+        now = int(time.time())
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.execute('''
+                UPDATE library_meta SET value = ? WHERE key = 'maintenance_next_run' AND value <= ?
+            ''', (now + int(interval), now))
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+    
+    # ============== 상세정보 보강 대기열 ==============
+    
+    def prioritize_enrichment(self, book_id):
+        """책을 대기열 맨 앞 등급으로 올림 (Unknown 책이 아니면 False)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO enrichment_queue (book_id, priority, enqueued_at)
+            SELECT id, ?, CURRENT_TIMESTAMP FROM books WHERE id = ? AND authors = 'Unknown'
+            ON CONFLICT (book_id) DO UPDATE SET priority = excluded.priority, enqueued_at = excluded.enqueued_at
+        ''', (ENRICH_PRIORITY_REQUESTED, book_id))
+        queued = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return queued
+    
+    def sync_enrichment_queue(self):
+        """대기열에 없는 Unknown 책을 backlog 등급으로 추가하고 대기열 크기 반환"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO enrichment_queue (book_id, priority)
+            SELECT id, ? FROM books WHERE authors = 'Unknown'
+        ''', (ENRICH_PRIORITY_BACKLOG,))
+        cursor.execute('SELECT COUNT(*) FROM enrichment_queue')
+        size = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        return size
+    
+    def next_enrichment_book(self, job_id, book_ids=None):
+        """작업이 아직 시도하지 않은 책 중 우선순위가 가장 높은 책을 꺼냄 -> (book_id, title) 또는 None
+        
+        매번 대기열을 다시 읽으므로 작업 도중 화면에서 요청한 책도 바로 다음 차례가 됩니다.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        id_filter = ''
+        params = [job_id]
+        if book_ids is not None:
+            id_filter = f"AND q.book_id IN ({','.join('?' * len(book_ids))})" if book_ids else 'AND 0'
+            params.extend(book_ids)
+        cursor.execute(f'''
+            SELECT q.book_id, b.title FROM enrichment_queue q JOIN books b ON b.id = q.book_id
+            WHERE q.last_job_id IS NOT ? {id_filter}
+            ORDER BY q.priority, q.attempts, q.enqueued_at, q.book_id
+            LIMIT 1
+        ''', params)
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('UPDATE enrichment_queue SET last_job_id = ? WHERE book_id = ?', (job_id, row[0]))
+        conn.commit()
+        conn.close()
+        return row
+    
+    def pending_enrichment_books(self, skip_ids=()):
+        """대기열의 책을 우선순위 순서로 반환 (skip_ids 제외) -> [{'id', 'title'}, ...]"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT q.book_id, b.title FROM enrichment_queue q JOIN books b ON b.id = q.book_id
+            ORDER BY q.priority, q.attempts, q.enqueued_at, q.book_id
+        ''')
+        books = [{'id': book_id, 'title': title} for book_id, title in cursor.fetchall() if book_id not in skip_ids]
+        conn.close()
+        return books
+    
+    def record_enrichment_failure(self, book_id, error):
+        """보강 실패 기록 - 여러 번 실패한 책은 맨 뒤 등급으로 내림 (성공한 책은 트리거가 대기열에서 뺌)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE enrichment_queue
+            SET attempts = attempts + 1, last_error = ?,
+                priority = CASE WHEN attempts + 1 >= ? THEN ? ELSE priority END
+            WHERE book_id = ?
+        ''', (error, ENRICH_FAILING_AFTER_ATTEMPTS, ENRICH_PRIORITY_FAILING, book_id))
+        conn.commit()
+        conn.close()
+    
+    def enrichment_queue_size(self, book_ids=None):
+        """대기열 크기 (book_ids를 주면 그 중 대기열에 있는 책 수)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        if book_ids is None:
+            cursor.execute('SELECT COUNT(*) FROM enrichment_queue')
+        elif book_ids:
+            cursor.execute(f"SELECT COUNT(*) FROM enrichment_queue WHERE book_id IN ({','.join('?' * len(book_ids))})",
+                           list(book_ids))
+        else:
+            conn.close()
+            return 0
+        size = cursor.fetchone()[0]
+        conn.close()
+        return size
+    
+    # ============== 메타데이터 신선도 ==============
+    
+    def due_field_statuses(self, limit, max_age_days, retry_days):
+        """다시 확인할 필드가 있는 ISBN 보유 책 -> {book_id: {field: status}} (깨진 필드가 있는 책, 오래된 책 순)
+        
+        확인한 지 max_age_days가 지났거나 깨진 필드 중, 마지막 시도 후 retry_days가 지난 필드만 고릅니다.
+        """
+        now = time.time()
+        stale_before = now - max_age_days * 86400
+        retry_before = now - retry_days * 86400
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            WITH due AS (
+                SELECT * FROM book_field_status
+                WHERE checked_at < :retry_before AND (broken OR fetched_at < :stale_before)
+            )
+            SELECT book_id, field, value_hash, etag, broken FROM due
+            WHERE book_id IN (
+                SELECT due.book_id FROM due JOIN books b ON b.id = due.book_id
+                WHERE b.isbn_norm IS NOT NULL
+                GROUP BY due.book_id
+                ORDER BY MAX(due.broken) DESC, MIN(due.fetched_at), due.book_id
+                LIMIT :limit
+            )
+        ''', {'retry_before': retry_before, 'stale_before': stale_before, 'limit': limit})
+        books = {}
+        for book_id, field, value_hash, etag, broken in cursor.fetchall():
+            books.setdefault(book_id, {})[field] = {'value_hash': value_hash, 'etag': etag, 'broken': bool(broken)}
+        conn.close()
+        return books
+    
+    @background_priority
+    def refresh_stale_fields(self, limit=None, max_age_days=None, retry_days=None):
+        """오래됐거나 깨진 필드만 ISBN으로 다시 받아 갱신 (제목 검색 없이 책 한 권당 조회 1~2회)
+        
+        - 썸네일: HEAD 요청(If-None-Match)으로 살아 있는지 먼저 확인하고, 죽은 경우에만 ISBN으로 다시 조회
+        - 서지 정보/썸네일: search_by_isbn 결과의 값 해시가 지난번과 다를 때만 책에 씀
+        - 교보문고 링크: 네이버 쇼핑에서 ISBN으로 다시 찾음
+        값이 바뀌지 않은 필드는 확인 시각만 갱신하므로 도서관 버전(페이지 캐시)이 바뀌지 않습니다.
+        반환값: {'books', 'lookups', 'updated_fields', 'confirmed_fields', 'broken_fields'}
+        """
+        limit = REFRESH_BATCH_SIZE if limit is None else limit
+        max_age_days = REFRESH_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        retry_days = REFRESH_RETRY_DAYS if retry_days is None else retry_days
+        stats = {'books': 0, 'lookups': 0, 'updated_fields': 0, 'confirmed_fields': 0, 'broken_fields': 0}
+        if limit <= 0:
+            return stats
+        
+        for book_id, statuses in self.due_field_statuses(limit, max_age_days, retry_days).items():
+            record = self.get_book(book_id)
+            if record is None:
+                continue
+            try:
+                self._refresh_book_fields(record, statuses, stats)
+            except Exception as e:
+                job_logger.warning("필드 갱신 실패: %s - %s", record['title'], e)
+            stats['books'] += 1
+        
+        if stats['books']:
+            job_logger.info("필드 갱신: 책 %d권, 조회 %d회, 변경 %d개, 확인 %d개, 깨짐 %d개",
+                            stats['books'], stats['lookups'], stats['updated_fields'],
+                            stats['confirmed_fields'], stats['broken_fields'])
+        for action in ('updated_fields', 'confirmed_fields', 'broken_fields'):
+            if stats[action]:
+                MAINTENANCE_ROWS.inc(stats[action], action=action)
+        return stats
+    
+    def _refresh_book_fields(self, record, statuses, stats):
+        """책 한 권의 확인 대상 필드를 다시 받아 바뀐 값만 저장"""
+        updates = {}     # 책에 쓸 새 값
+        confirmed = {}   # field -> (source, value_hash, etag) 제공자 값을 다시 확인한 필드
+        dead = set()     # 확인 결과 깨진 필드
+        isbn = canonical_isbn(record['isbn'])
+        isbn_fields = [field for field in FRESHNESS_ISBN_FIELDS if field in statuses]
+        
+        thumbnail = statuses.get('thumbnail_url')
+        if thumbnail and not thumbnail['broken'] and record['thumbnail_url']:
+            alive, etag = self._check_thumbnail(record['thumbnail_url'], thumbnail['etag'])
+            if alive is False:
+                dead.add('thumbnail_url')
+            else:
+                isbn_fields.remove('thumbnail_url')
+                if alive:
+                    confirmed['thumbnail_url'] = ('http', thumbnail['value_hash'], etag)
+        
+        if isbn_fields:
+            stats['lookups'] += 1
+            results = self.search_by_isbn(isbn)
+            found = results[0] if results else {}
+            for field in isbn_fields:
+                value_hash = field_value_hash(found.get(field))
+                if value_hash is None:
+                    continue  # 제공자에도 값이 없으면 지금 값 유지
+                if field == 'thumbnail_url' and field in dead and found[field] == record['thumbnail_url']:
+                    continue  # 제공자가 같은 죽은 주소를 돌려줌
+                if value_hash != statuses[field]['value_hash']:
+                    updates[field] = found[field]
+                confirmed[field] = (found.get('api_source'), value_hash, found.get('etag') or None)
+        
+        if 'kyobo_link' in statuses:
+            stats['lookups'] += 1
+            link = self._find_kyobo_link(record['title'], isbn)
+            value_hash = field_value_hash(link)
+            if value_hash is not None:
+                if value_hash != statuses['kyobo_link']['value_hash']:
+                    updates['kyobo_link'] = link
+                confirmed['kyobo_link'] = ('naver_shop', value_hash, None)
+        
+        self._save_field_refresh(record['id'], statuses, updates, confirmed, dead,
+                                 found if any(field in confirmed for field in isbn_fields) else None)
+        stats['updated_fields'] += len(updates)
+        stats['confirmed_fields'] += len(confirmed) - len(updates)
+        stats['broken_fields'] += sum(1 for field in statuses
+                                      if field not in confirmed and (field in dead or statuses[field]['broken']))
+    
+    def _save_field_refresh(self, book_id, statuses, updates, confirmed, dead, payload_info=None):
+        """갱신 결과 저장 - 바뀐 값은 책에, 확인/시도 시각과 깨짐 여부는 신선도 기록에, ISBN 조회 응답 원본은 book_payloads에"""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        change = None
+        book_updates = {field: value for field, value in updates.items() if field != 'description'}
+        if book_updates:
+            cursor.execute(f'UPDATE books SET {self._update_assignments(book_updates)} WHERE id = ?',
+                           (*book_updates.values(), book_id))
+        if 'description' in updates:
+            self._save_book_details(cursor, book_id, updates)
+        if payload_info is not None:
+            self._save_payload(cursor, book_id, payload_info)
+        for field in statuses:
+            if field in confirmed:
+                source, value_hash, etag = confirmed[field]
+                cursor.execute('''
+                    UPDATE book_field_status
+                    SET source = ?, value_hash = ?, etag = ?, fetched_at = ?, checked_at = ?, broken = 0
+                    WHERE book_id = ? AND field = ?
+                ''', (source, value_hash, etag, now, now, book_id, field))
+            else:
+                cursor.execute('''
+                    UPDATE book_field_status SET checked_at = ?, broken = broken OR ?
+                    WHERE book_id = ? AND field = ?
+                ''', (now, field in dead, book_id, field))
+        if book_updates:
+            change = self._read_library_change(cursor, book_id)
+        conn.commit()
+        conn.close()
+        if change:
+            self._apply_library_change(change)
+            self._schedule_cover_color(change)
+    
+    # ============== 표지 대표색 ==============
+    
+    def _schedule_cover_color(self, change):
+        """쓰기 결과 썸네일은 있는데 대표색이 비어 있으면 별도 스레드에서 계산 (Pillow가 없으면 건너뜀)"""
+        record = change[2]
+        if Image is None or record is None or not record.thumbnail_url or record.cover_color is not None:
+            return
+        cover_color_executor.submit(self.update_cover_color, record.id, record.thumbnail_url)
+    
+    def update_cover_color(self, book_id, thumbnail_url):
+        """표지 대표색을 계산해 저장하고 반환 (그 사이 썸네일이 바뀌었거나 일시 오류면 저장하지 않음)"""
+        color = fetch_cover_color(thumbnail_url)
+        if color is None:
+            return None
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE books SET cover_color = ? WHERE id = ? AND thumbnail_url = ? AND cover_color IS NULL
+        ''', (color, book_id, thumbnail_url))
+        change = self._read_library_change(cursor, book_id) if cursor.rowcount else None
+        conn.commit()
+        conn.close()
+        if change:
+            self._apply_library_change(change)
+        return color
+    
+    def fill_cover_colors(self, limit=None):
+        """대표색을 아직 계산하지 않은 책(예전 책, Pillow 설치 전에 보강한 책)을 limit권까지 채우고 계산한 권수 반환"""
+        limit = COVER_COLOR_BATCH_SIZE if limit is None else limit
+        if Image is None or limit <= 0:
+            return 0
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
         cursor.execute('''
-            SELECT book_id, book_title, success, message, created_at
-            FROM update_logs 
-            WHERE job_id = ?
-            ORDER BY created_at DESC
-            LIMIT ?
-        ''', (job_id, limit))
+            SELECT id, thumbnail_url FROM books
+            WHERE cover_color IS NULL AND thumbnail_url IS NOT NULL AND thumbnail_url != ''
+            ORDER BY id LIMIT ?
+        ''', (limit,))
+        rows = cursor.fetchall()
+        conn.close()
         
-        logs = []
-        for row in cursor.fetchall():
-            logs.append({
-                'book_id': row[0],
-                'book_title': row[1],
-                'success': bool(row[2]),
-                'message': row[3],
-                'created_at': row[4]
-            })
+        filled = sum(1 for book_id, url in rows if self.update_cover_color(book_id, url) is not None)
+        if filled:
+            MAINTENANCE_ROWS.inc(filled, action='cover_colors')
+        return filled
+    
+    @staticmethod
+    def _update_assignments(fields):
+        """부분 UPDATE의 SET 목록 - 썸네일이 바뀌면 표지 대표색도 다시 계산하도록 비움"""
+        assignments = [f'{field} = ?' for field in fields]
+        if 'thumbnail_url' in fields:
+            assignments.append('cover_color = NULL')
+        return ', '.join(assignments)
+    
+    @staticmethod
+    def _check_thumbnail(url, etag=None):
+        """썸네일 주소가 살아 있는지 HEAD 요청으로 확인 -> (True/False, 일시 오류나 허용되지 않은 주소면 None, ETag)"""
+        headers = {'If-None-Match': etag} if etag else {}
+        try:
+            response = request_cover_image('HEAD', url, headers=headers)
+        except requests.RequestException:
+            return None, etag
+        if response is None:
+            return None, etag  # 제공자 이미지 호스트가 아니거나 리디렉션이 너무 많음
+        if response.status_code in (404, 410):
+            return False, None
+        if response.status_code >= 400:
+            return None, etag
+        return True, response.headers.get('ETag', etag)  # 304 Not Modified 포함
+    
+    # ============== 외부 응답 원본 재해석 ==============
+    
+    def reprocess_payloads(self, batch_size=None, dry_run=False):
+        """저장된 외부 응답 원본을 현재 파서로 다시 해석해 바뀐 필드만 갱신 (외부 API 호출 없음)
+        
+        batch_size 권씩 짧은 트랜잭션으로 나눠 실행하며, 원본에 값이 없는 필드는 지금 값을 유지합니다.
+        반환값: {'payloads', 'books_updated', 'fields_updated', 'errors'}
+        """
+        batch_size = REPROCESS_BATCH_SIZE if batch_size is None else batch_size
+        stats = {'payloads': 0, 'books_updated': 0, 'fields_updated': 0, 'errors': 0}
+        last_id = 0
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            while True:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT p.book_id, p.provider, p.payload, b.authors, b.publisher, b.published_date,
+                           COALESCE(d.description, ''), b.thumbnail_url
+                    FROM book_payloads p
+                    JOIN books b ON b.id = p.book_id
+                    LEFT JOIN book_details d ON d.book_id = p.book_id
+                    WHERE p.book_id > ? ORDER BY p.book_id LIMIT ?
+                ''', (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                for book_id, provider, payload, *current in rows:
+                    stats['payloads'] += 1
+                    try:
+                        item = json.loads(zlib.decompress(payload).decode('utf-8'))
+                        parsed = self._book_info_from_payload(provider, item, remember=False)
+                    except Exception as e:
+                        stats['errors'] += 1
+                        job_logger.warning("원본 재해석 실패: book_id=%s - %s", book_id, e)
+                        continue
+                    
+                    changed = {field: parsed[field] for field, value in zip(FRESHNESS_ISBN_FIELDS, current)
+                               if field_value_hash(parsed.get(field)) is not None and parsed[field] != value}
+                    if not changed:
+                        continue
+                    stats['books_updated'] += 1
+                    stats['fields_updated'] += len(changed)
+                    if dry_run:
+                        continue
+                    
+                    book_fields = {field: value for field, value in changed.items() if field != 'description'}
+                    if book_fields:
+                        cursor.execute(f'UPDATE books SET {self._update_assignments(book_fields)} WHERE id = ?',
+                                       (*book_fields.values(), book_id))
+                    if 'description' in changed:
+                        self._save_book_details(cursor, book_id, changed)
+                    # 다음 신선도 확인이 같은 값을 제공자 변경으로 보지 않도록 값 해시도 새 파서 기준으로 맞춤
+                    cursor.executemany('''
+                        UPDATE book_field_status SET value_hash = ? WHERE book_id = ? AND field = ?
+                    ''', [(field_value_hash(value), book_id, field) for field, value in changed.items()])
+                conn.commit()
+        finally:
+            conn.close()
         
-        conn.close()
-        return logs
+        job_logger.info("원본 재해석%s: 원본 %d건, 책 %d권 / 필드 %d개 변경, 오류 %d건",
+                        ' (dry run)' if dry_run else '', stats['payloads'], stats['books_updated'],
+                        stats['fields_updated'], stats['errors'])
+        return stats
     
-    def background_update_books(self, job_id):
-        """백그라운드에서 Unknown 책들 업데이트"""
+    @background_priority
+    def background_update_books(self, job_id, book_ids=None):
+        """백그라운드에서 보강 대기열을 우선순위 순서로 처리 (book_ids를 주면 그 책들만)
+        
+        작업 시작 시점의 대기열 크기만큼 처리하며, 실패한 책은 같은 작업에서 다시 시도하지 않습니다.
+        """
         try:
-            print(f"백그라운드 업데이트 작업 시작: {job_id}")
+            job_logger.info("백그라운드 업데이트 작업 시작: %s", job_id)
             
-            # Unknown 상태인 책들 조회
-            all_books = self.get_all_books()
-            unknown_books = [book for book in all_books if book['authors'] == 'Unknown']
-            
-            if not unknown_books:
+            total = self.enrichment_queue_size(book_ids)
+            if not total:
                 self.complete_update_job(job_id, 'completed')
-                print(f"업데이트할 책이 없음: {job_id}")
+                job_logger.info("업데이트할 책이 없음: %s", job_id)
                 return
             
             success_count = 0
             error_count = 0
+            processed = 0
             
-            for i, book in enumerate(unknown_books):
+            while processed < total:
+                next_book = self.next_enrichment_book(job_id, book_ids)
+                if next_book is None:
+                    break
+                book_id, title = next_book
+                error = None
                 try:
-                    print(f"[{i+1}/{len(unknown_books)}] 처리 중: {book['title'][:40]}...")
+                    job_logger.debug("[%d/%d] 처리 중: %s...", processed + 1, total, title[:40])
                     
                     # 책 정보 검색
-                    books_info = self.search_book_info(book['title'])
+                    books_info = self.search_book_info(title)
                     
                     if books_info and len(books_info) > 0:
                         book_info = books_info[0]
-                        update_success = self.update_book_details(book['id'], book_info)
+                        update_success = self.update_book_details(book_id, book_info)
                         
                         if update_success:
                             success_count += 1
-                            self.log_update_result(job_id, book['id'], book['title'], True, 
+                            self.log_update_result(job_id, book_id, title, True, 
                                                  f"성공: {book_info.get('authors', 'N/A')}")
-                            print(f"  ✓ 성공: {book_info.get('authors', 'N/A')}")
+                            job_logger.debug("✓ 성공: %s", book_info.get('authors', 'N/A'))
                         else:
-                            error_count += 1
-                            self.log_update_result(job_id, book['id'], book['title'], False, "DB 업데이트 실패")
-                            print(f"  ✗ DB 업데이트 실패")
+                            error = "DB 업데이트 실패"
+                            job_logger.warning("✗ DB 업데이트 실패: %s", title)
                     else:
-                        error_count += 1
-                        self.log_update_result(job_id, book['id'], book['title'], False, "검색 결과 없음")
-                        print(f"  ✗ 검색 결과 없음")
+                        error = "검색 결과 없음"
+                        job_logger.debug("✗ 검색 결과 없음: %s", title)
                         
                 except Exception as e:
+                    error = f"오류: {str(e)[:100]}"
+                    job_logger.warning("✗ 오류: %s - %s", title, error)
+                
+                if error:
                     error_count += 1
-                    error_msg = str(e)[:100]
-                    self.log_update_result(job_id, book['id'], book['title'], False, f"오류: {error_msg}")
-                    print(f"  ✗ 오류: {error_msg}")
+                    self.log_update_result(job_id, book_id, title, False, error)
+                    self.record_enrichment_failure(book_id, error)
                 
                 # 진행 상황 업데이트
-                processed = i + 1
+                processed += 1
                 self.update_job_progress(job_id, processed, success_count, error_count, 'processing')
-                
-                # API 부하 방지
-                time.sleep(0.2)
             
             # 작업 완료
             self.complete_update_job(job_id, 'completed')
-            print(f"백그라운드 업데이트 완료: {job_id} - 성공 {success_count}, 실패 {error_count}")
+            job_logger.info("백그라운드 업데이트 완료: %s - 성공 %d, 실패 %d", job_id, success_count, error_count)
             
         except Exception as e:
-            print(f"백그라운드 업데이트 오류: {job_id} - {str(e)}")
+            job_logger.exception("백그라운드 업데이트 오류: %s - %s", job_id, e)
             self.complete_update_job(job_id, 'failed')
     
-    def start_background_update(self):
-        """백그라운드 업데이트 작업 시작"""
-        # Unknown 책 개수 확인
-        all_books = self.get_all_books()
-        unknown_books = [book for book in all_books if book['authors'] == 'Unknown']
+    def start_background_update(self, book_ids=None):
+        """백그라운드 업데이트 작업 시작 (book_ids를 주면 그 중 Unknown인 책만)"""
+        # 대기열에 빠진 Unknown 책이 없도록 맞춘 뒤 처리할 책 수 확인
+        self.sync_enrichment_queue()
+        total = self.enrichment_queue_size(book_ids)
         
-        if not unknown_books:
+        if not total:
             return None, "업데이트할 책이 없습니다"
         
         # 작업 생성
-        job_id = self.create_update_job(len(unknown_books))
+        job_id = self.create_update_job(total)
         
         # 백그라운드 스레드로 실행
-        thread = threading.Thread(target=self.background_update_books, args=(job_id,))
+        thread = threading.Thread(target=self.background_update_books, args=(job_id, book_ids))
         thread.daemon = True  # 메인 프로세스 종료 시 함께 종료
         thread.start()
         
-        return job_id, f"{len(unknown_books)}권의 업데이트 작업이 시작되었습니다"
+        return job_id, f"{total}권의 업데이트 작업이 시작되었습니다"
+
+# BookTracker 인스턴스는 첫 사용 시점에 생성 (임포트만으로 DB를 열지 않아 워커 기동이 빨라짐)
+_book_tracker = None
+_book_tracker_lock = threading.Lock()
+
+# 업데이트 로그 보존 정책 (음수면 해당 정리 안 함)
+UPDATE_LOG_RETENTION_DAYS = int(os.getenv('UPDATE_LOG_RETENTION_DAYS', '30'))     # 끝난 작업의 로그를 요약만 남기고 삭제
+UPDATE_JOB_RETENTION_DAYS = int(os.getenv('UPDATE_JOB_RETENTION_DAYS', '365'))    # 끝난 작업 자체를 삭제
+LOG_PRUNE_BATCH_SIZE = int(os.getenv('LOG_PRUNE_BATCH_SIZE', '500'))             # 삭제 트랜잭션 하나당 행 수
+LOG_SUMMARY_ERROR_SAMPLES = 5                                                    # 요약에 남기는 실패 사례 수
+INCREMENTAL_VACUUM_PAGES = int(os.getenv('INCREMENTAL_VACUUM_PAGES', '2000'))     # 한 번에 파일에서 반환할 최대 페이지 수
+MAINTENANCE_INTERVAL_SECONDS = int(os.getenv('MAINTENANCE_INTERVAL_SECONDS', '3600'))  # 0이면 주기 정리 비활성
+
+# 메타데이터 신선도 - 주기 정리 때마다 오래됐거나 깨진 필드가 있는 책을 몇 권씩 ISBN으로 다시 확인
+REFRESH_BATCH_SIZE = int(os.getenv('REFRESH_BATCH_SIZE', '20'))        # 한 번에 다시 확인할 최대 권수 (0이면 비활성)
+REFRESH_MAX_AGE_DAYS = float(os.getenv('REFRESH_MAX_AGE_DAYS', '90'))  # 이 기간이 지난 필드는 다시 확인
+REFRESH_RETRY_DAYS = float(os.getenv('REFRESH_RETRY_DAYS', '7'))       # 같은 필드를 다시 시도하는 최소 간격
+
+REPROCESS_BATCH_SIZE = 500  # 원본 재해석 트랜잭션 하나당 권수
+
+def _maintenance_loop(tracker):
+    """주기적으로 로그 정리, 필드 갱신, 표지 대표색 채우기 실행 (워커 여러 개 중 claim에 성공한 한 곳만 실제로 실행)"""
+    while True:
+        try:
+            if tracker.claim_maintenance_run(MAINTENANCE_INTERVAL_SECONDS):
+                tracker.run_log_maintenance()
+                tracker.refresh_stale_fields()
+                if Image is not None:
+                    tracker.fill_cover_colors()
+        except Exception as e:
+            job_logger.warning("주기 정리 실패: %s", e)
+        time.sleep(MAINTENANCE_INTERVAL_SECONDS)
+
+def start_maintenance_thread(tracker):
+    if MAINTENANCE_INTERVAL_SECONDS <= 0:
+        return None
+    if Image is None:
+        app_logger.warning("Pillow가 설치되지 않아 표지 대표색을 계산하지 않습니다 (pip install -r requirements.txt)")
+    thread = threading.Thread(target=_maintenance_loop, args=(tracker,), name='maintenance')
+    thread.daemon = True  # 메인 프로세스 종료 시 함께 종료
+    thread.start()
+    return thread
+
+def get_book_tracker():
+    """프로세스 공용 BookTracker 반환 (처음 호출될 때 생성 및 마이그레이션, 호출 예산 기록 DB 연결, 로그 정리 스레드 시작)"""
+    global _book_tracker
+    if _book_tracker is None:
+        with _book_tracker_lock:
+            if _book_tracker is None:
+                _book_tracker = BookTracker()
+                provider_scheduler.bind(_book_tracker.db_path)
+                start_maintenance_thread(_book_tracker)
+    return _book_tracker
 
-# BookTracker 인스턴스 생성
-book_tracker = BookTracker()
+book_tracker = LocalProxy(get_book_tracker)
 
 # Jinja2 커스텀 필터 추가
 @app.template_filter('selectattr')
@@ -1305,19 +3773,249 @@ def sum_filter(items):
 
 @app.template_filter('tojsonfilter')
 def to_json_filter(obj):
-    """JSON 직렬화 필터"""
-    return json.dumps(obj, ensure_ascii=False, default=str)
+    """JSON 직렬화 필터 (BookRecord는 dict로 변환)"""
+    return json.dumps(obj, ensure_ascii=False, default=_json_default)
+
+def _json_default(obj):
+    if isinstance(obj, BookRecord):
+        return obj.to_dict()
+    return str(obj)
 
 @app.template_filter('urlencode')
 def urlencode_filter(text):
     """URL 인코딩 필터"""
     return quote(str(text), safe='')
 
+# ============== 요청 계측 ==============
+
+_first_request_seen = False
+
+def _record_first_request(now):
+    """프로세스의 첫 요청이면 모듈 로드부터 걸린 시간 기록 (콜드 스타트 지표)"""
+    global _first_request_seen
+    if _first_request_seen:
+        return
+    _first_request_seen = True
+    elapsed = now - _MODULE_LOAD_START
+    TIME_TO_FIRST_REQUEST.set(elapsed)
+    app_logger.info("첫 요청까지 %.3f초 (모듈 로드 %.3f초, pid %d)", elapsed, _MODULE_LOADED - _MODULE_LOAD_START, os.getpid())
+
+@app.before_request
+def start_request_timer():
+    """라우트 응답 시간 측정 및 구간 수집 시작"""
+    g.request_start = time.perf_counter()
+    _record_first_request(g.request_start)
+    g.span_token = _request_spans.set([])
+
+@app.after_request
+def record_request_metrics(response):
+    """라우트별 응답 시간 기록 및 Server-Timing 헤더 추가"""
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    ROUTE_LATENCY.observe(elapsed, route=route, method=request.method, status=response.status_code)
+
+    spans = _request_spans.get() or []
+    if SERVER_TIMING_ENABLED:
+        response.headers['Server-Timing'] = format_server_timing(spans, elapsed)
+    if SLOW_REQUEST_LOG_MS and elapsed * 1000 >= SLOW_REQUEST_LOG_MS:
+        app_logger.warning("느린 요청: %s %s %.1fms", request.method, request.path, elapsed * 1000, extra={
+            'route': route,
+            'status': response.status_code,
+            'spans': {name: {'ms': round(duration * 1000, 1), 'count': count}
+                      for name, duration, count in summarize_spans(spans)}
+        })
+    return response
+
+@before_render_template.connect_via(app)
+def start_render_span(sender, template, context, **extra):
+    """템플릿 렌더링 구간 시작"""
+    g.render_start = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def finish_render_span(sender, template, context, **extra):
+    """템플릿 렌더링 구간 기록"""
+    start = g.pop('render_start', None)
+    if start is not None:
+        record_span(f"render.{(template.name or 'template').rsplit('.', 1)[0]}", time.perf_counter() - start)
+
+@app.teardown_request
+def reset_request_spans(exc=None):
+    """요청 종료 시 구간 수집 해제"""
+    token = g.pop('span_token', None)
+    if token is not None:
+        _request_spans.reset(token)
+
+# ============== 조건부 GET (ETag) 및 응답 압축 ==============
+
+def _compute_build_id():
+    """코드/템플릿 내용 해시 - 배포가 바뀌면 이전 ETag가 모두 무효화되도록 ETag에 포함"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    template_dir = os.path.join(base_dir, 'templates')
+    paths = [os.path.abspath(__file__)]
+    if os.path.isdir(template_dir):
+        paths += [os.path.join(template_dir, name) for name in sorted(os.listdir(template_dir))]
+
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            continue
+    return digest.hexdigest()[:10]
+
+BUILD_ID = _compute_build_id()
+
+def _etag_digest(*parts):
+    """ETag에 넣을 수 있는 짧은 해시 (공백/따옴표가 들어간 값도 안전하게)"""
+    return hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+
+def not_modified(etag):
+    """본문 없는 304 응답"""
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional(etag, build_response):
+    """If-None-Match가 etag와 같으면 304, 아니면 build_response() 결과에 ETag를 붙여 반환"""
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag)
+    response = app.make_response(build_response())
+    if response.status_code == 200:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# 렌더링(및 압축)된 페이지 캐시 - 도서관 버전이 바뀌기 전까지 같은 페이지를 다시 렌더링하지 않음
+page_cache = VersionedCache('page', max_entries=int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '16')))
+
+def etag_by_library_version(view):
+    """도서관 버전 기준 ETag/페이지 캐시 뷰 데코레이터
+
+    버전이 그대로면 304, 캐시된 페이지가 있으면 DB 조회와 템플릿 렌더링 없이 바로 응답합니다.
+    페이지에 이번 달 통계가 들어가므로 달이 바뀌어도 새로 만듭니다.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = book_tracker.get_library_version()
+        month = stats_month()
+        etag = f"{BUILD_ID}-v{version}-{_etag_digest(request.full_path, month)}"
+        
+        def build_response():
+            encoding = _choose_encoding(request.headers.get('Accept-Encoding'))
+            cache_key = (book_tracker.db_path, request.full_path, encoding, month)
+            cached = page_cache.get(cache_key, version)
+            if cached is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                compress_in_place(response)
+                cached = (response.get_data(), response.mimetype, response.headers.get('Content-Encoding'))
+                page_cache.set(cache_key, version, cached)
+            
+            body, mimetype, content_encoding = cached
+            response = Response(body, mimetype=mimetype)
+            response.vary.add('Accept-Encoding')
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+            return response
+        
+        return conditional(etag, build_response)
+    return wrapper
+
+def job_etag(job_status, *parts):
+    """업데이트 작업 진행 상태로 만든 ETag"""
+    return f"{BUILD_ID}-job-" + _etag_digest(
+        job_status['job_id'], job_status['status'], job_status['processed_books'],
+        job_status['success_count'], job_status['error_count'], job_status['updated_at'], *parts)
+
+def _choose_encoding(accept_encoding):
+    """Accept-Encoding에서 사용할 압축 방식 선택 (br > gzip)"""
+    accepted = {item.split(';')[0].strip().lower() for item in (accept_encoding or '').split(',')
+                if not item.strip().endswith(';q=0')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress_in_place(response):
+    """큰 HTML/JSON 응답 본문을 Accept-Encoding에 맞게 gzip 또는 br로 압축"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return
+
+    response.vary.add('Accept-Encoding')
+    if 'Content-Encoding' in response.headers:
+        return
+    encoding = _choose_encoding(request.headers.get('Accept-Encoding'))
+    if not encoding:
+        return
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return
+
+    with timing_span('compress'):
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=min(COMPRESS_LEVEL, 11))
+        else:
+            compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+def _gzip_stream(chunks):
+    """문자열/바이트 조각 스트림을 gzip 스트림으로 압축"""
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip 헤더 포함
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def streaming_download(chunks, mimetype, filename):
+    """조각 스트림을 첨부파일로 전송 (클라이언트가 받으면 gzip으로 압축)"""
+    if 'gzip' in {item.split(';')[0].strip().lower() for item in request.headers.get('Accept-Encoding', '').split(',')}:
+        response = Response(_gzip_stream(chunks), mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response((chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in chunks),
+                            mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.after_request
+def compress_response(response):
+    """응답 압축"""
+    compress_in_place(response)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 메트릭 조회"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# 메인 페이지에 보여줄 최근 추가된 책 수
+RECENT_BOOKS_LIMIT = 6
+
 @app.route('/')
+@etag_by_library_version
 def index():
     """메인 페이지"""
-    books = book_tracker.get_all_books()
-    return render_template('index.html', books=books)
+    books = book_tracker.get_recent_books(RECENT_BOOKS_LIMIT)
+    total_count = book_tracker.get_book_count()
+    return render_template('index.html', books=books, total_count=total_count)
+
+# 요청 처리 중 보조 작업(예: 검색과 동시에 실행하는 중복 검사)용 스레드 풀
+search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SEARCH_EXECUTOR_WORKERS', '4')), thread_name_prefix='search')
 
 @app.route('/search', methods=['POST'])
 def search():
@@ -1331,11 +4029,13 @@ def search():
     is_korean = book_tracker.detect_language(query)
     api_used = 'naver' if is_korean else 'google'
     
-    # 중복 검사
-    is_duplicate = book_tracker.check_duplicate(query)
-    
-    # 도서 정보 검색
+    # 중복 검사(로컬 DB)와 도서 정보 검색(외부 API)은 서로 독립적이므로 동시에 실행
+    duplicate_future = search_executor.submit(contextvars.copy_context().run, book_tracker.check_duplicate, query)
     books = book_tracker.search_book_info(query)
+    is_duplicate = duplicate_future.result()
+    
+    # 검색 결과 후보별 보유 여부 표시
+    books = book_tracker.annotate_owned(books)
     
     return jsonify({
         'books': books,
@@ -1346,6 +4046,85 @@ def search():
         'search_info': f"{'한국어' if is_korean else '영어'} 검색어 감지 → {'네이버' if api_used == 'naver' else 'Google'} Books API 사용"
     })
 
+# 배치 검색 설정
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv('SEARCH_BATCH_MAX_QUERIES', '100'))
+SEARCH_BATCH_CONCURRENCY = int(os.getenv('SEARCH_BATCH_CONCURRENCY', '4'))
+
+def _search_batch_item(index, query):
+    """배치 검색 한 건 처리 -> NDJSON 한 줄에 들어갈 dict"""
+    try:
+        books = book_tracker.search_book_info(query)
+        books = book_tracker.annotate_owned(books)
+        return {
+            'index': index,
+            'query': query,
+            'success': True,
+            'books': books,
+            'is_duplicate': book_tracker.check_duplicate(query)
+        }
+    except Exception as e:
+        search_logger.exception("배치 검색 오류: %s", query)
+        return {
+            'index': index,
+            'query': query,
+            'success': False,
+            'error': f'검색 실패: {str(e)}'
+        }
+
+@app.route('/search_batch', methods=['POST'])
+def search_batch():
+    """여러 제목/ISBN 동시 검색 - 끝나는 순서대로 검색어당 한 줄씩 NDJSON으로 전송
+    
+    마지막 줄은 {"done": true, "total": ..., "errors": ...} 요약입니다.
+    """
+    data = request.get_json(silent=True) or {}
+    queries = [str(query).strip() for query in data.get('queries', []) if str(query).strip()]
+    
+    if not queries:
+        return jsonify({'success': False, 'error': '검색어 목록(queries)을 입력하세요'}), 400
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        return jsonify({
+            'success': False,
+            'error': f'한 번에 최대 {SEARCH_BATCH_MAX_QUERIES}개까지 검색할 수 있습니다'
+        }), 400
+    
+    try:
+        concurrency = max(1, min(int(data.get('concurrency', SEARCH_BATCH_CONCURRENCY)), SEARCH_BATCH_CONCURRENCY))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'잘못된 요청: {str(e)}'}), 400
+    
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='search-batch')
+        errors = 0
+        try:
+            futures = [executor.submit(_search_batch_item, index, query) for index, query in enumerate(queries)]
+            for future in as_completed(futures):
+                item = future.result()
+                if not item['success']:
+                    errors += 1
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+            yield json.dumps({'done': True, 'total': len(queries), 'errors': errors}) + '\n'
+            search_logger.info("배치 검색 완료: %d건 (실패 %d건)", len(queries), errors)
+        finally:
+            # 클라이언트가 연결을 끊으면 아직 시작하지 않은 검색은 취소
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no'  # 프록시가 줄 단위 전송을 버퍼링하지 않도록
+    return response
+
+@app.route('/suggest')
+def suggest():
+    """검색어 자동완성 (내 책 + 이전에 검색된 외부 API 결과, 외부 호출 없음)"""
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'suggestions': book_tracker.suggest(query, limit) if query else []
+    })
+
 @app.route('/add_book', methods=['POST'])
 def add_book():
     """책 추가 - 강화된 중복 방지"""
@@ -1375,7 +4154,7 @@ def add_book():
             is_duplicate = book_tracker.check_duplicate(title, isbn)
             
             if is_duplicate:
-                print(f"중복 도서 감지: {title} (ISBN: {isbn})")
+                app_logger.info("중복 도서 감지: %s (ISBN: %s)", title, isbn)
                 return jsonify({
                     'success': False,
                     'is_duplicate': True,
@@ -1384,7 +4163,7 @@ def add_book():
                 }), 409  # Conflict status code
                 
         except Exception as dup_error:
-            print(f"중복 검사 중 오류: {str(dup_error)}")
+            app_logger.warning("중복 검사 중 오류: %s", dup_error)
             # 중복 검사 실패 시에도 계속 진행 (안전 모드)
             pass
         
@@ -1404,10 +4183,80 @@ def add_book():
         }), 500
 
 @app.route('/books')
+@etag_by_library_version
 def books():
     """책 목록 페이지"""
     books = book_tracker.get_all_books()
-    return render_template('books.html', books=books)
+    stats = book_tracker.get_library_stats()
+    return render_template('books.html', books=books, stats=stats)
+
+@app.route('/stats')
+@etag_by_library_version
+def library_stats():
+    """도서관 통계 API (총 권수, 구매 금액, 출판사별 권수, 상세정보 보유율)"""
+    return jsonify({
+        'success': True,
+        'stats': book_tracker.get_library_stats()
+    })
+
+@app.route('/book/<int:book_id>/details')
+def book_details(book_id):
+    """책 상세정보 API (책 소개 등 목록에 포함되지 않는 필드)"""
+    def build_response():
+        details = book_tracker.get_book_details(book_id)
+        if not details:
+            return jsonify({
+                'success': False,
+                'error': '책을 찾을 수 없습니다'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'book': details
+        })
+    
+    # 책마다 응답이 달라 페이지 캐시 대신 ETag만 사용 (목록 페이지 캐시를 밀어내지 않도록)
+    version = book_tracker.get_library_version()
+    return conditional(f"{BUILD_ID}-v{version}-book{book_id}", build_response)
+
+# 내보내기 스트림에서 한 번에 묶어 보내는 행 수
+EXPORT_BATCH_SIZE = 500
+
+def _export_filename(extension):
+    """내보내기 파일 이름 (예: books-20240601.csv)"""
+    return f"books-{datetime.now().strftime('%Y%m%d')}.{extension}"
+
+@app.route('/export.csv')
+def export_csv():
+    """도서 목록 CSV 내보내기 - CSV 대량 추가로 다시 가져올 수 있음"""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(BookTracker.EXPORT_FIELDS)
+        for count, book in enumerate(book_tracker.iter_export_rows(EXPORT_BATCH_SIZE), 1):
+            writer.writerow([book[field] if book[field] is not None else '' for field in BookTracker.EXPORT_FIELDS])
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    return streaming_download(generate(), 'text/csv', _export_filename('csv'))
+
+@app.route('/export.jsonl')
+def export_jsonl():
+    """도서 목록 JSON Lines 내보내기 (한 줄에 책 한 권)"""
+    def generate():
+        lines = []
+        for book in book_tracker.iter_export_rows(EXPORT_BATCH_SIZE):
+            lines.append(json.dumps(book, ensure_ascii=False))
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+    
+    return streaming_download(generate(), 'application/x-ndjson', _export_filename('jsonl'))
 
 @app.route('/delete_book/<int:book_id>', methods=['DELETE'])
 def delete_book(book_id):
@@ -1466,7 +4315,7 @@ def bulk_add_csv():
         for encoding in ['utf-8', 'utf-8-sig', 'cp949', 'euc-kr', 'latin1']:
             try:
                 csv_content = raw_content.decode(encoding)
-                print(f"CSV 파일 인코딩 감지: {encoding}")
+                app_logger.debug("CSV 파일 인코딩 감지: %s", encoding)
                 break
             except UnicodeDecodeError:
                 continue
@@ -1477,9 +4326,9 @@ def bulk_add_csv():
         # CSV 파싱
         try:
             titles = book_tracker.parse_csv_content(csv_content)
-            print(f"CSV 파싱 완료: {len(titles)}개 제목 추출")
+            app_logger.info("CSV 파싱 완료: %d개 제목 추출", len(titles))
         except Exception as parse_error:
-            print(f"CSV 파싱 오류: {str(parse_error)}")
+            app_logger.warning("CSV 파싱 오류: %s", parse_error)
             return jsonify({'error': f'CSV 파싱 실패: {str(parse_error)}'}), 400
         
         if not titles:
@@ -1491,15 +4340,12 @@ def bulk_add_csv():
         
         # 서버 안정성을 위해 안전 모드 사용 (API 호출 없이 제목만 저장)
         try:
-            print(f"안전 모드로 {len(titles)}권 처리 시작 (API 호출 없이 제목만 저장)")
+            app_logger.info("안전 모드로 %d권 처리 시작 (API 호출 없이 제목만 저장)", len(titles))
             results = book_tracker.bulk_add_books_safe(titles)
             
-            print(f"안전 모드 처리 완료: 성공 {len(results['success'])}권, 오류 {len(results['errors'])}권")
             
         except Exception as process_error:
-            print(f"안전 모드에서도 오류: {str(process_error)}")
-            import traceback
-            print(f"상세 오류: {traceback.format_exc()}")
+            app_logger.exception("안전 모드에서도 오류: %s", process_error)
             
             return jsonify({
                 'success': False,
@@ -1514,9 +4360,7 @@ def bulk_add_csv():
         
     except Exception as e:
         # 더 자세한 오류 정보 제공
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"CSV 업로드 최상위 오류: {error_details}")  # 서버 로그용
+        app_logger.exception("CSV 업로드 최상위 오류: %s", e)
         
         return jsonify({
             'success': False,
@@ -1561,9 +4405,7 @@ def bulk_add_text():
         
     except Exception as e:
         # 더 자세한 오류 정보 제공
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"텍스트 대량 추가 오류: {error_details}")  # 서버 로그용
+        app_logger.exception("텍스트 대량 추가 오류: %s", e)
         
         return jsonify({
             'success': False,
@@ -1575,12 +4417,7 @@ def update_book_details(book_id):
     """개별 책 상세정보 업데이트"""
     try:
         # 현재 책 정보 조회
-        books = book_tracker.get_all_books()
-        current_book = None
-        for book in books:
-            if book['id'] == book_id:
-                current_book = book
-                break
+        current_book = book_tracker.get_book(book_id)
         
         if not current_book:
             return jsonify({'success': False, 'error': '책을 찾을 수 없습니다'}), 404
@@ -1616,233 +4453,265 @@ def update_book_details(book_id):
             'error': f'상세정보 업데이트 중 오류: {str(e)}'
         }), 500
 
+# 스마트 업데이트 설정 - 요청 한 번이 Railway HTTP 타임아웃(30초) 안에 끝나도록 마감 시간을 채울 만큼만 처리
+SMART_UPDATE_DEADLINE_SECONDS = float(os.getenv('SMART_UPDATE_DEADLINE_SECONDS', '25'))  # 요청별 마감 시간의 최대값
+SMART_UPDATE_CONCURRENCY = int(os.getenv('SMART_UPDATE_CONCURRENCY', '4'))
+SMART_UPDATE_LOOKUP_ESTIMATE = 3.0  # 아직 끝난 조회가 없을 때 한 권 처리 시간 추정치(초)
+SMART_UPDATE_GRACE_SECONDS = float(os.getenv('SMART_UPDATE_GRACE_SECONDS', '2'))  # 마감 후 진행 중인 조회를 기다리는 시간
+
+def _encode_continuation(skip_ids, batch=0):
+    """이어서 처리할 위치 토큰 - skip_ids는 이번 순회에서 이미 시도했지만 아직 대기열에 남은 책(실패/진행 중),
+    batch는 지금까지 처리한 요청 수 (성공한 책은 대기열에서 빠지므로 기록하지 않음)"""
+    payload = json.dumps({'skip': sorted(skip_ids), 'batch': batch}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_continuation(token):
+    """토큰 -> (skip_ids, batch), 형식이 잘못되면 ValueError"""
+    if not token:
+        return set(), 0
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return {int(book_id) for book_id in data['skip']}, int(data.get('batch', 0))
+    except (TypeError, KeyError, ValueError, binascii.Error) as e:
+        raise ValueError(f"잘못된 continuation 토큰: {e}")
+
+def _pending_unknown_books(skip_ids):
+    """이번 순회에서 아직 처리하지 않은 Unknown 책 (보강 대기열의 우선순위 순서)"""
+    book_tracker.sync_enrichment_queue()
+    return book_tracker.pending_enrichment_books(skip_ids)
+
+def _enrich_until_deadline(queue, deadline, concurrency):
+    """queue의 책을 순서대로 동시에 검색/저장 - 마감 전에 끝날 것으로 보이는 조회만 시작
+    
+    마감 때 이미 시작한 조회는 SMART_UPDATE_GRACE_SECONDS까지 더 기다려 결과에 포함합니다.
+    반환: (results {'success': [...], 'errors': [...]}, 끝난 책 id 집합, 유예 후에도 진행 중인 책 id 집합)
+    """
+    results = {'success': [], 'errors': []}
+    finished = set()
+    durations = []
+    inflight = {}  # future -> (책, 시작 시각)
+    next_index = 0
+    initial_estimate = min(SMART_UPDATE_LOOKUP_ESTIMATE, (deadline - time.monotonic()) / 2)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='enrich')
+    try:
+        while True:
+            # 가장 오래 걸린 조회 시간 기준으로 판단 (짧은 마감이어도 첫 조회들은 시작하도록 첫 추정치는 마감의 절반 이하)
+            estimate = max(durations) if durations else initial_estimate
+            now = time.monotonic()
+            while next_index < len(queue) and len(inflight) < concurrency and deadline - now > estimate:
+                book = queue[next_index]
+                next_index += 1
+                future = executor.submit(contextvars.copy_context().run, _update_book_from_search, book)
+                inflight[future] = (book, now)
+            if not inflight:
+                break
+            
+            past_deadline = time.monotonic() >= deadline
+            if past_deadline:
+                # 마감 - 새 조회는 시작하지 않고 진행 중인 조회만 잠깐 더 기다림
+                done, _ = wait(inflight, timeout=SMART_UPDATE_GRACE_SECONDS)
+            else:
+                done, _ = wait(inflight, timeout=deadline - time.monotonic(), return_when=FIRST_COMPLETED)
+            for future in done:
+                book, submitted = inflight.pop(future)
+                durations.append(time.monotonic() - submitted)
+                outcome, item = future.result()
+                results[outcome].append(item)
+                finished.add(book['id'])
+            if past_deadline:
+                break
+    finally:
+        # 시작하지 않은 조회는 취소 (유예 후에도 진행 중인 조회는 끝나면 저장되지만 이번 응답에는 포함되지 않음)
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results, finished, {book['id'] for book, _ in inflight.values()}
+
+def _next_continuation(candidates, finished, failed_ids, running_ids, skip_ids, batch):
+    """다음 요청용 토큰 (모두 처리했으면 None)
+    
+    실패로 끝난 책과 아직 진행 중인 책은 skip으로 넘겨 이번 순회에서 다시 제출하지 않습니다.
+    (성공한 책은 더 이상 Unknown이 아니므로 트리거가 대기열에서 뺌)
+    """
+    if len(finished) + len(running_ids) >= len(candidates):
+        return None
+    return _encode_continuation(skip_ids | failed_ids | running_ids, batch)
+
+def _update_book_from_search(book):
+    """Unknown 책 한 권을 검색해 상세정보 저장 -> ('success' 또는 'errors', 결과 항목)
+    
+    실패하면 보강 대기열에 실패 횟수를 기록합니다.
+    """
+    outcome, item = _search_and_update_book(book)
+    if outcome == 'errors':
+        book_tracker.record_enrichment_failure(book['id'], item['reason'])
+    return outcome, item
+
+def _search_and_update_book(book):
+    try:
+        books_info = book_tracker.search_book_info(book['title'])
+        if not books_info:
+            job_logger.debug("✗ 검색 실패: %s", book['title'])
+            return 'errors', {'id': book['id'], 'title': book['title'], 'reason': '검색 결과 없음'}
+        
+        book_info = books_info[0]
+        if not book_tracker.update_book_details(book['id'], book_info):
+            job_logger.warning("✗ DB 실패: %s", book['title'])
+            return 'errors', {'id': book['id'], 'title': book['title'], 'reason': 'DB 업데이트 실패'}
+        
+        job_logger.debug("✓ 성공: %s", book_info.get('authors', 'N/A'))
+        return 'success', {
+            'id': book['id'],
+            'title': book['title'],
+            'authors': book_info.get('authors', 'Unknown'),
+            'publisher': book_info.get('publisher', 'Unknown')
+        }
+    except Exception as e:
+        job_logger.warning("✗ 오류: %s - %s", book['title'], e)
+        return 'errors', {'id': book['id'], 'title': book['title'], 'reason': f'오류: {str(e)[:30]}'}
+
 @app.route('/smart_update_details', methods=['POST'])
+@background_priority
 def smart_update_details():
-    """스마트 업데이트: 사용자 지정 개수만큼 처리"""
+    """스마트 업데이트: 마감 시간(deadline_ms) 안에 끝낼 수 있는 만큼 Unknown 책을 동시에 처리
+    
+    요청: {"deadline_ms": 20000, "count": 선택(최대 권수), "continuation": 이전 응답의 토큰}
+    마감 전에 끝나지 않을 조회는 시작하지 않고, 끝난 책은 바로 저장합니다.
+    응답의 continuation을 다음 요청에 넘기면 이번에 멈춘 곳부터 이어서 처리합니다 (더 없으면 null).
+    """
     try:
-        data = request.get_json() or {}
-        update_count = data.get('count', 5)  # 기본 5권으로 축소 (Railway 30초 제한 고려)
-        
-        # Unknown 상태인 책들만 필터링
-        all_books = book_tracker.get_all_books()
-        unknown_books = [book for book in all_books if book['authors'] == 'Unknown']
-        
-        if not unknown_books:
+        data = request.get_json(silent=True) or {}
+        try:
+            deadline_seconds = float(data.get('deadline_ms', SMART_UPDATE_DEADLINE_SECONDS * 1000)) / 1000
+            deadline_seconds = max(0.0, min(deadline_seconds, SMART_UPDATE_DEADLINE_SECONDS))
+            max_count = int(data['count']) if data.get('count') else None
+            skip_ids, batch = _decode_continuation(data.get('continuation'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'잘못된 요청: {str(e)}'}), 400
+        
+        started = time.monotonic()
+        candidates = _pending_unknown_books(skip_ids)
+        if not candidates:
             return jsonify({
                 'success': True,
                 'message': '업데이트할 책이 없습니다',
-                'results': {'success': 0, 'errors': 0, 'total': 0}
+                'results': {'success': [], 'errors': [], 'total': 0, 'remaining': 0, 'cancelled': 0},
+                'continuation': None
             })
+        queue = candidates[:max_count] if max_count else candidates
         
-        # 지정된 개수만큼만 처리
-        books_to_update = unknown_books[:update_count]
-        remaining_count = len(unknown_books) - len(books_to_update)
+        results, finished, running_ids = _enrich_until_deadline(queue, started + deadline_seconds, SMART_UPDATE_CONCURRENCY)
+        continuation = _next_continuation(candidates, finished, {item['id'] for item in results['errors']},
+                                          running_ids, skip_ids, batch + 1)
+        cancelled = len(running_ids)
         
-        results = {
-            'success': [],
-            'errors': [],
-            'total': len(books_to_update),
-            'remaining': remaining_count
-        }
-        
-        print(f"스마트 업데이트: {len(books_to_update)}권 처리 시작")
-        
-        # Railway 타임아웃 방지를 위한 시간 추적
-        import time
-        start_time = time.time()
-        max_execution_time = 25  # 25초 제한 (Railway 30초 제한 고려)
-        
-        for i, book in enumerate(books_to_update):
-            # 시간 체크 - 너무 오래 걸리면 중단
-            if time.time() - start_time > max_execution_time:
-                print(f"시간 초과로 인한 조기 종료: {i}권 처리 완료")
-                results['remaining'] = len(unknown_books) - i
-                break
-            try:
-                print(f"[{i+1}/{len(books_to_update)}] 업데이트: {book['title'][:40]}...")
-                
-                books_info = book_tracker.search_book_info(book['title'])
-                
-                if books_info and len(books_info) > 0:
-                    book_info = books_info[0]
-                    success = book_tracker.update_book_details(book['id'], book_info)
-                    
-                    if success:
-                        results['success'].append({
-                            'id': book['id'],
-                            'title': book['title'],
-                            'authors': book_info.get('authors', 'Unknown'),
-                            'publisher': book_info.get('publisher', 'Unknown')
-                        })
-                        print(f"  ✓ 성공: {book_info.get('authors', 'N/A')}")
-                    else:
-                        results['errors'].append({
-                            'title': book['title'],
-                            'reason': 'DB 업데이트 실패'
-                        })
-                        print(f"  ✗ DB 실패")
-                else:
-                    results['errors'].append({
-                        'title': book['title'],
-                        'reason': '검색 결과 없음'
-                    })
-                    print(f"  ✗ 검색 실패")
-                    
-            except Exception as e:
-                results['errors'].append({
-                    'title': book['title'],
-                    'reason': f'오류: {str(e)[:30]}'
-                })
-                print(f"  ✗ 오류: {str(e)}")
-            
-            # API 부하 방지 - Railway 타임아웃 고려하여 대기시간 축소
-            import time
-            time.sleep(0.1)
+        results['total'] = len(finished)
+        results['remaining'] = len(candidates) - len(finished) - cancelled
+        results['cancelled'] = cancelled
+        results['elapsed_ms'] = round((time.monotonic() - started) * 1000)
         
-        success_count = len(results['success'])
-        error_count = len(results['errors'])
+        job_logger.info("스마트 업데이트: 성공 %d, 실패 %d, 마감 시 진행 중 %d, 남음 %d (%dms)",
+                        len(results['success']), len(results['errors']), cancelled,
+                        results['remaining'], results['elapsed_ms'])
         
-        message = f'업데이트 완료: 성공 {success_count}권, 실패 {error_count}권'
-        if remaining_count > 0:
-            message += f' (남은 Unknown 책: {remaining_count}권)'
+        message = f"업데이트 완료: 성공 {len(results['success'])}권, 실패 {len(results['errors'])}권"
+        if results['remaining'] > 0:
+            message += f" (남은 Unknown 책: {results['remaining']}권)"
         
         return jsonify({
             'success': True,
             'message': message,
-            'results': results
+            'results': results,
+            'continuation': continuation
         })
         
     except Exception as e:
-        print(f"스마트 업데이트 오류: {str(e)}")
+        job_logger.exception("스마트 업데이트 오류: %s", e)
         return jsonify({
             'success': False,
             'error': f'스마트 업데이트 오류: {str(e)}'
         }), 500
 
+# 대량 업데이트 설정 - 요청 하나는 청크 하나만 처리하고 cursor를 돌려줌
+BULK_UPDATE_CHUNK_SIZE = int(os.getenv('BULK_UPDATE_CHUNK_SIZE', '20'))           # 요청당 최대 권수
+BULK_UPDATE_BUDGET_SECONDS = float(os.getenv('BULK_UPDATE_BUDGET_SECONDS', '20'))  # 요청당 최대 처리 시간
+
 @app.route('/bulk_update_details', methods=['POST'])
+@background_priority
 def bulk_update_details():
-    """Unknown 상태인 책들의 상세정보 대량 업데이트 - 배치 처리로 안정성 향상"""
+    """Unknown 상태인 책들의 상세정보 대량 업데이트 - 요청마다 청크 하나만 처리하고 cursor 반환
+    
+    요청: {"cursor": 이전 응답의 cursor, "budget_ms": 선택, "background": true면 남은 책을 백그라운드 작업으로 넘김}
+    한 요청은 BULK_UPDATE_CHUNK_SIZE권, BULK_UPDATE_BUDGET_SECONDS초를 넘지 않습니다.
+    """
     try:
-        # Unknown 상태인 책들만 필터링
-        all_books = book_tracker.get_all_books()
-        unknown_books = [book for book in all_books if book['authors'] == 'Unknown']
+        data = request.get_json(silent=True) or {}
+        try:
+            budget_seconds = float(data.get('budget_ms', BULK_UPDATE_BUDGET_SECONDS * 1000)) / 1000
+            budget_seconds = max(0.0, min(budget_seconds, BULK_UPDATE_BUDGET_SECONDS))
+            skip_ids, batch = _decode_continuation(data.get('cursor'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'잘못된 요청: {str(e)}'}), 400
+        
+        started = time.monotonic()
+        candidates = _pending_unknown_books(skip_ids)
         
-        if not unknown_books:
+        if not candidates:
             return jsonify({
                 'success': True,
                 'message': '업데이트할 책이 없습니다 (모든 책의 상세정보가 이미 있음)',
-                'results': {'success': 0, 'errors': 0, 'total': 0}
+                'results': {'success': 0, 'errors': 0, 'total': 0},
+                'cursor': None
             })
         
-        # 배치 설정: Railway HTTP 타임아웃(30초) 고려하여 5권씩 처리
-        batch_size = 5
-        total_books = len(unknown_books)
-        
-        results = {
-            'success': [],
-            'errors': [],
-            'total': total_books,
-            'batches': []
-        }
-        
-        print(f"대량 업데이트 시작: {total_books}권을 {batch_size}권씩 배치 처리")
-        
-        # 배치 단위로 처리
-        for batch_start in range(0, total_books, batch_size):
-            batch_end = min(batch_start + batch_size, total_books)
-            batch_books = unknown_books[batch_start:batch_end]
-            current_batch = (batch_start // batch_size) + 1
-            total_batches = (total_books + batch_size - 1) // batch_size
-            
-            batch_results = {
-                'batch_num': current_batch,
-                'total_batches': total_batches,
-                'success_count': 0,
-                'error_count': 0
-            }
-            
-            print(f"배치 {current_batch}/{total_batches} 처리 시작 ({len(batch_books)}권)")
-            
-            # 배치 내 각 책 처리
-            for local_idx, book in enumerate(batch_books):
-                global_idx = batch_start + local_idx + 1
-                
-                try:
-                    print(f"  [{global_idx}/{total_books}] 업데이트: {book['title'][:40]}...")
-                    
-                    # API 검색 (타임아웃 짧게 설정)
-                    books_info = book_tracker.search_book_info(book['title'])
-                    
-                    if books_info and len(books_info) > 0:
-                        book_info = books_info[0]
-                        
-                        # 데이터베이스 업데이트
-                        success = book_tracker.update_book_details(book['id'], book_info)
-                        
-                        if success:
-                            results['success'].append({
-                                'id': book['id'],
-                                'title': book['title'],
-                                'authors': book_info.get('authors', 'Unknown'),
-                                'publisher': book_info.get('publisher', 'Unknown')
-                            })
-                            batch_results['success_count'] += 1
-                            print(f"    ✓ 성공: {book_info.get('authors', 'N/A')}")
-                        else:
-                            results['errors'].append({
-                                'id': book['id'],
-                                'title': book['title'],
-                                'reason': 'DB 업데이트 실패'
-                            })
-                            batch_results['error_count'] += 1
-                            print(f"    ✗ DB 업데이트 실패")
-                    else:
-                        results['errors'].append({
-                            'id': book['id'],
-                            'title': book['title'],
-                            'reason': '검색 결과 없음'
-                        })
-                        batch_results['error_count'] += 1
-                        print(f"    ✗ 검색 결과 없음")
-                        
-                except Exception as e:
-                    error_msg = str(e)
-                    results['errors'].append({
-                        'id': book['id'],
-                        'title': book['title'],
-                        'reason': f'오류: {error_msg[:50]}'
-                    })
-                    batch_results['error_count'] += 1
-                    print(f"    ✗ 오류: {error_msg}")
-                
-                # 개별 책 처리 간 짧은 대기 (API 부하 방지)
-                import time
-                time.sleep(0.1)
-            
-            # 배치 결과 저장
-            results['batches'].append(batch_results)
-            print(f"배치 {current_batch} 완료: 성공 {batch_results['success_count']}, 실패 {batch_results['error_count']}")
-            
-            # 배치 간 대기 (서버 부하 방지)
-            if current_batch < total_batches:
-                time.sleep(0.5)
+        chunk = candidates[:BULK_UPDATE_CHUNK_SIZE]
+        current_batch = batch + 1
+        job_logger.info("대량 업데이트 청크 %d: %d권 처리 (남은 후보 %d권, 예산 %.1f초)",
+                        current_batch, len(chunk), len(candidates), budget_seconds)
+        
+        results, finished, running_ids = _enrich_until_deadline(chunk, started + budget_seconds, SMART_UPDATE_CONCURRENCY)
+        cursor = _next_continuation(candidates, finished, {item['id'] for item in results['errors']},
+                                    running_ids, skip_ids, current_batch)
+        remaining = len(candidates) - len(finished) - len(running_ids)
+        
+        results['total'] = len(candidates)
+        results['remaining'] = remaining
+        results['batches'] = [{
+            'batch_num': current_batch,
+            'total_batches': current_batch + (remaining + BULK_UPDATE_CHUNK_SIZE - 1) // BULK_UPDATE_CHUNK_SIZE,
+            'success_count': len(results['success']),
+            'error_count': len(results['errors'])
+        }]
+        
+        # 남은 책을 백그라운드 작업으로 넘기면 이 cursor로 더 요청할 필요 없음
+        background_job_id = None
+        if data.get('background') and cursor:
+            skip_next, _ = _decode_continuation(cursor)
+            remaining_ids = [book['id'] for book in book_tracker.pending_enrichment_books(skip_next)]
+            background_job_id, _ = book_tracker.start_background_update(book_ids=remaining_ids)
+            if background_job_id:
+                cursor = None
         
         success_count = len(results['success'])
         error_count = len(results['errors'])
+        job_logger.info("대량 업데이트 청크 %d 완료: 성공 %d권, 실패 %d권, 남음 %d권 (%.1f초)",
+                        current_batch, success_count, error_count, remaining, time.monotonic() - started)
         
-        print(f"대량 업데이트 완료: 성공 {success_count}권, 실패 {error_count}권")
+        message = f'대량 업데이트 완료: 성공 {success_count}권, 실패 {error_count}권 (총 {len(candidates)}권)'
+        if background_job_id:
+            message += f' - 남은 {remaining}권은 백그라운드에서 업데이트합니다'
+        elif cursor:
+            message += f' - 남은 {remaining}권은 cursor로 이어서 요청하세요'
         
         return jsonify({
             'success': True,
-            'message': f'대량 업데이트 완료: 성공 {success_count}권, 실패 {error_count}권 (총 {total_books}권)',
-            'results': results
+            'message': message,
+            'results': results,
+            'cursor': cursor,
+            'background_job_id': background_job_id
         })
         
     except Exception as e:
         error_msg = str(e)
-        print(f"대량 업데이트 시스템 오류: {error_msg}")
-        import traceback
-        traceback.print_exc()
+        job_logger.exception("대량 업데이트 시스템 오류: %s", error_msg)
         
         return jsonify({
             'success': False,
@@ -1851,6 +4720,18 @@ def bulk_update_details():
 
 # ============== 백그라운드 업데이트 API 엔드포인트들 ==============
 
+@app.route('/enrichment_queue/<int:book_id>', methods=['POST'])
+def prioritize_enrichment(book_id):
+    """책을 상세정보 보강 대기열 맨 앞으로 (책 상세보기를 열 때, 또는 직접 요청)"""
+    try:
+        queued = book_tracker.prioritize_enrichment(book_id)
+        return jsonify({'success': True, 'queued': queued})
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'대기열 등록 실패: {str(e)}'
+        }), 500
+
 @app.route('/start_background_update', methods=['POST'])
 def start_background_update():
     """백그라운드 업데이트 작업 시작"""
@@ -1882,14 +4763,18 @@ def get_update_status(job_id):
         job_status = book_tracker.get_update_job_status(job_id)
         
         if job_status:
-            # 최근 로그도 함께 반환
-            recent_logs = book_tracker.get_update_logs(job_id, limit=5)
-            job_status['recent_logs'] = recent_logs
+            def build_response():
+                # 최근 로그도 함께 반환
+                recent_logs = book_tracker.get_update_logs(job_id, limit=5)
+                job_status['recent_logs'] = recent_logs
+                
+                return jsonify({
+                    'success': True,
+                    'status': job_status
+                })
             
-            return jsonify({
-                'success': True,
-                'status': job_status
-            })
+            # 진행 상태가 그대로면 로그 조회 없이 304
+            return conditional(job_etag(job_status, 'status'), build_response)
         else:
             return jsonify({
                 'success': False,
@@ -1907,12 +4792,19 @@ def get_update_logs_api(job_id):
     """업데이트 로그 조회"""
     try:
         limit = request.args.get('limit', 20, type=int)
-        logs = book_tracker.get_update_logs(job_id, limit=limit)
         
-        return jsonify({
-            'success': True,
-            'logs': logs
-        })
+        def build_response():
+            logs = book_tracker.get_update_logs(job_id, limit=limit)
+            
+            return jsonify({
+                'success': True,
+                'logs': logs
+            })
+        
+        job_status = book_tracker.get_update_job_status(job_id)
+        if not job_status:
+            return build_response()
+        return conditional(job_etag(job_status, 'logs', limit), build_response)
         
     except Exception as e:
         return jsonify({
@@ -1920,6 +4812,22 @@ def get_update_logs_api(job_id):
             'error': f'로그 조회 실패: {str(e)}'
         }), 500
 
+# ============== 관리 명령 ==============
+
+@app.cli.command('reprocess-payloads')
+@click.option('--batch-size', type=int, default=REPROCESS_BATCH_SIZE, show_default=True, help='트랜잭션 하나당 권수')
+@click.option('--dry-run', is_flag=True, help='바뀔 책/필드 수만 세고 저장하지 않음')
+def reprocess_payloads_command(batch_size, dry_run):
+    """저장된 외부 응답 원본을 현재 파서로 다시 해석해 책 정보 갱신 (외부 API 호출 없음)
+    
+        flask --app app reprocess-payloads --dry-run
+    """
+    # 주기 정리 스레드(외부 API 호출)를 띄우지 않도록 공용 트래커 대신 직접 생성
+    stats = BookTracker().reprocess_payloads(batch_size=batch_size, dry_run=dry_run)
+    click.echo(json.dumps(stats, ensure_ascii=False))
+
+_MODULE_LOADED = time.perf_counter()
+
 if __name__ == '__main__':
     # 로컬 개발용
     app.run(debug=True, host='127.0.0.1', port=8082)
\ No newline at end of file
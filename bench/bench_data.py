@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""데이터 계층 벤치마크 - 합성 도서관 크기별 BookTracker 메서드와 Flask 라우트 지연시간 측정
+
+    python bench/bench_data.py                          # 1k, 10k
+    python bench/bench_data.py --sizes 1000,10000,100000 --json bench_output.json
+    python bench/compare.py old.json bench_output.json  # 커밋 간 비교
+
+같은 --seed와 크기면 항상 같은 데이터가 생성되며, 생성한 DB는 --cache-dir에 보관해 재사용합니다.
+외부 API는 호출하지 않습니다.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from common import import_app, summarize, print_table, write_results
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'bookbench-libraries')
+
+KO_ADJECTIVES = ['작은', '위대한', '조용한', '불편한', '낯선', '푸른', '오래된', '새로운', '사소한', '눈부신',
+                 '어두운', '따뜻한', '완벽한', '이상한', '행복한', '슬픈', '빠른', '느린', '단단한', '투명한']
+KO_NOUNS = ['편의점', '우주', '도시', '바다', '정원', '기억', '시간', '여행', '철학', '경제', '데이터', '알고리즘',
+            '파이썬', '자바', '설계', '습관', '마음', '역사', '과학', '언어', '사물', '도서관', '밤', '계절']
+KO_SUFFIXES = ['', '', '', ' 이야기', '의 기술', ' 입문', ' 수업', '의 모든 것', ' 개정판', ' (리커버 에디션)']
+EN_ADJECTIVES = ['Clean', 'Effective', 'Practical', 'Modern', 'Hidden', 'Quiet', 'Deep', 'Pragmatic', 'Elegant',
+                 'Fluent', 'Brief', 'Lost', 'Infinite', 'Secret', 'Essential', 'Human', 'Wild', 'Simple']
+EN_NOUNS = ['Code', 'Architecture', 'Python', 'Systems', 'Garden', 'Mind', 'History', 'Design', 'Data', 'Habits',
+            'Networks', 'Algorithms', 'Cities', 'Ocean', 'Language', 'Machines', 'Time', 'Science']
+EN_SUFFIXES = ['', '', '', ': A Handbook', ', 2nd Edition', ': Patterns and Practice', ' in Action', ' for Beginners']
+KO_AUTHORS = ['김영하', '한강', '조영호', '유시민', '정유정', '김초엽', '손원평', '박상영', '천명관', '황석영']
+EN_AUTHORS = ['Robert C. Martin', 'Martin Fowler', 'Joshua Bloch', 'Martin Kleppmann', 'Luciano Ramalho',
+              'Kent Beck', 'Daniel Kahneman', 'Don Norman', 'Yuval Noah Harari', 'Ursula K. Le Guin']
+PUBLISHERS = ['창비', '문학동네', '민음사', '위키북스', '인사이트', '길벗', '한빛미디어', '김영사',
+              "O'Reilly Media", 'Addison-Wesley', 'Prentice Hall', 'MIT Press', 'Penguin']
+KO_SENTENCES = ['이 책은 일상의 사소한 순간들을 섬세하게 포착한다.', '저자는 복잡한 개념을 쉬운 예제로 풀어낸다.',
+                '실무에서 바로 적용할 수 있는 원칙과 사례를 담았다.', '출간 이후 꾸준히 사랑받아 온 스테디셀러.',
+                '독자들은 마지막 장을 덮으며 오래 여운을 느낄 것이다.']
+EN_SENTENCES = ['A thoughtful exploration of how ideas shape the world.', 'Packed with practical examples and exercises.',
+                'The author distills decades of experience into clear principles.', 'A modern classic for curious readers.',
+                'Every chapter builds on the last to form a coherent whole.']
+
+
+def _isbn13(rng):
+    """체크섬이 맞는 ISBN-13 생성"""
+    digits = [9, 7, rng.choice([8, 9])] + [rng.randrange(10) for _ in range(9)]
+    total = sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return ''.join(map(str, digits)) + str((10 - total % 10) % 10)
+
+
+def generate_book(rng, index, base_date):
+    """한국어 60% / 영어 40% 비율의 합성 도서 한 권"""
+    korean = rng.random() < 0.6
+    if korean:
+        title = f"{rng.choice(KO_ADJECTIVES)} {rng.choice(KO_NOUNS)}{rng.choice(KO_SUFFIXES)}"
+        author = rng.choice(KO_AUTHORS)
+        sentences = KO_SENTENCES
+    else:
+        title = f"The {rng.choice(EN_ADJECTIVES)} {rng.choice(EN_NOUNS)}{rng.choice(EN_SUFFIXES)}"
+        author = rng.choice(EN_AUTHORS)
+        sentences = EN_SENTENCES
+    if rng.random() < 0.5:
+        title = f"{title} {index}"  # 제목 충돌을 줄이기 위한 권차 번호
+
+    purchase = base_date - timedelta(minutes=index * 7 + rng.randrange(7))
+    enriched = rng.random() < 0.7  # 30%는 대량 추가 직후처럼 Unknown 상태
+    if not enriched:
+        return (title, 'Unknown', 'Unknown', 'Unknown', '', '', '', purchase.strftime('%Y-%m-%d %H:%M:%S'),
+                rng.choice([None, None, 15000.0]), '', '')
+
+    isbn = _isbn13(rng)
+    description = ' '.join(rng.choice(sentences) for _ in range(rng.randint(3, 30)))
+    return (
+        title,
+        author,
+        rng.choice(PUBLISHERS),
+        f"{rng.randint(1990, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        isbn,
+        description,
+        f"https://shopping-phinf.pstatic.net/main_{isbn}/{isbn}.jpg",
+        purchase.strftime('%Y-%m-%d %H:%M:%S'),
+        float(rng.randrange(8, 60) * 1000) if rng.random() < 0.6 else None,
+        rng.choice(['', '', '', '팀 스터디용', '재독 예정', 'Recommended by a colleague']),
+        f"https://product.kyobobook.co.kr/detail/S{isbn}" if korean else ''
+    )
+
+
+def build_library(app_module, path, size, seed, jobs=20, logs_per_job=None):
+    """합성 도서관 DB 생성 (도서 size권 + 업데이트 작업/로그)"""
+    app_module.BookTracker(path)  # 스키마 생성
+    rng = random.Random(seed * 1000003 + size)
+    base_date = datetime(2024, 6, 1)
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    descriptions = []
+    for i in range(size):
+        book = generate_book(rng, i, base_date)
+        cursor.execute('''
+            INSERT INTO books (title, authors, publisher, published_date, isbn,
+                               thumbnail_url, purchase_date, price, notes, kyobo_link, title_norm, isbn_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', book[:5] + book[6:] + (app_module.normalize_title_key(book[0]) or None,
+                                    app_module.normalize_isbn_key(book[4]) or None))
+        if book[5]:
+            descriptions.append((cursor.lastrowid, book[5]))
+    cursor.executemany('INSERT INTO book_details (book_id, description) VALUES (?, ?)', descriptions)
+
+    logs_per_job = logs_per_job or max(1, size // 10)
+    book_ids = [row[0] for row in cursor.execute('SELECT id FROM books LIMIT ?', (logs_per_job,))]
+    for job in range(jobs):
+        job_id = f"bench-job-{job:04d}"
+        cursor.execute('''
+            INSERT INTO update_jobs (job_id, status, total_books, processed_books, success_count, error_count, completed_at)
+            VALUES (?, 'completed', ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (job_id, len(book_ids), len(book_ids), len(book_ids), 0))
+        cursor.executemany('''
+            INSERT INTO update_logs (job_id, book_id, book_title, success, message)
+            VALUES (?, ?, ?, 1, '성공: bench')
+        ''', ((job_id, book_id, f"book {book_id}") for book_id in book_ids))
+
+    conn.commit()
+    conn.close()
+
+
+def cached_library(app_module, cache_dir, size, seed, rebuild=False):
+    """캐시 디렉터리의 템플릿 DB 경로 (없으면 생성)
+
+    파일 이름에 앱의 스키마 버전을 넣어, 마이그레이션이 추가된 커밋에서는 예전 스키마의 템플릿을 재사용하지 않습니다.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"library-{size}-seed{seed}-schema{app_module.SCHEMA_VERSION}.db")
+    if rebuild or not os.path.exists(path):
+        print(f"  합성 도서관 생성: {size}권 -> {path}")
+        start = time.perf_counter()
+        build_library(app_module, path + '.tmp', size, seed)
+        os.replace(path + '.tmp', path)
+        print(f"  생성 완료 ({time.perf_counter() - start:.1f}s)")
+    return path
+
+
+def _measure(func, repeat, setup=None):
+    """func를 repeat번 실행한 지연시간 목록과 전체 시간"""
+    latencies = []
+    wall_start = time.perf_counter()
+    for i in range(repeat):
+        arg = setup(i) if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        latencies.append(time.perf_counter() - start)
+    return latencies, time.perf_counter() - wall_start
+
+
+def _traced_bytes(build):
+    """build()가 만든 객체가 차지하는 메모리 (tracemalloc 기준, 바이트)"""
+    tracemalloc.start()
+    try:
+        kept = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return current
+
+
+def measure_row_memory(app_module, template_path, workdir, size):
+    """get_all_books 결과 메모리 비교 - 예전 dict 행 vs BookRecord 스냅샷 (10k권당 환산)
+
+    두 방식 모두 같은 SQLite 행 튜플에서 만들므로 문자열 값은 공유되고, 행 컨테이너 비용만 비교됩니다.
+    템플릿 DB는 예전 스키마일 수 있으므로 복사본을 현재 스키마로 마이그레이션한 뒤 측정합니다.
+    """
+    BookRecord = app_module.BookRecord
+    db_path = os.path.join(workdir, f"memory-{size}.db")
+    shutil.copyfile(template_path, db_path)
+    app_module.run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(f'SELECT {BookRecord.SELECT_COLUMNS} FROM books ORDER BY purchase_date DESC').fetchall()
+    conn.close()
+
+    dict_bytes = _traced_bytes(lambda: [dict(zip(BookRecord.FIELDS, row)) for row in rows])
+    record_bytes = _traced_bytes(lambda: app_module.LibrarySnapshot(0, tuple(BookRecord.from_row(row) for row in rows)))
+    per_10k = lambda value: round(value * 10000 / max(len(rows), 1) / 1024, 1)
+    return {
+        'size': size,
+        'rows': len(rows),
+        'dict_rows_kb_per_10k': per_10k(dict_bytes),
+        'snapshot_kb_per_10k': per_10k(record_bytes),
+        'ratio': round(record_bytes / dict_bytes, 3) if dict_bytes else None
+    }
+
+
+def run_size(app_module, template_path, workdir, size, args):
+    """한 크기의 도서관에 대해 모든 데이터 메서드와 라우트 측정"""
+    db_path = os.path.join(workdir, f"library-{size}.db")
+    shutil.copyfile(template_path, db_path)
+
+    tracker = app_module.BookTracker(db_path)
+    app_module.book_tracker = tracker  # 라우트가 벤치마크 DB를 사용하도록 교체
+    client = app_module.app.test_client()
+
+    conn = sqlite3.connect(db_path)
+    existing_title, existing_isbn = conn.execute(
+        "SELECT title, isbn FROM books WHERE isbn != '' ORDER BY id DESC LIMIT 1").fetchone()
+    job_id = conn.execute('SELECT job_id FROM update_jobs ORDER BY job_id DESC LIMIT 1').fetchone()[0]
+    conn.close()
+
+    books_etag = client.get('/books').headers.get('ETag', '')
+
+    repeat = args.repeat
+    # 도서 수에 비례해 느려지는 작업은 큰 도서관에서 반복 횟수를 줄여 실행 시간을 제한
+    heavy_repeat = max(1, repeat if size <= 10000 else repeat // 3)
+    new_titles = lambda i: [f"벤치마크 신규 도서 {size}-{i}-{n}" for n in range(args.bulk_batch)]
+    updated_info = {
+        'authors': '벤치 저자', 'publisher': '벤치 출판사', 'published_date': '20240101', 'isbn': '9791100000001',
+        'description': '벤치마크 갱신', 'thumbnail_url': '', 'kyobo_link': ''
+    }
+
+    def cold(i):
+        """버전 캐시를 비워 캐시 miss 경로를 측정"""
+        tracker._query_cache.clear()
+        tracker._snapshot = None
+        app_module.page_cache.clear()
+
+    cases = [
+        ('check_duplicate(hit)', lambda: tracker.check_duplicate(existing_title), heavy_repeat, None),
+        ('check_duplicate(miss)', lambda: tracker.check_duplicate('존재하지 않는 책 제목 xyz'), heavy_repeat, None),
+        ('check_duplicate(isbn)', lambda: tracker.check_duplicate('새 제목', existing_isbn.replace('9', '9-', 1)), heavy_repeat, None),
+        ('get_all_books', lambda _: tracker.get_all_books(), heavy_repeat, cold),
+        ('get_all_books (cached)', tracker.get_all_books, repeat, None),
+        ('get_all_books (after write)', lambda _: tracker.get_all_books(), repeat,
+         lambda i: tracker.update_book_details(2, updated_info)),
+        ('annotate_owned(10)', lambda: tracker.annotate_owned(
+            [{'title': existing_title, 'isbn': existing_isbn}] + [{'title': f"후보 {n}", 'isbn': ''} for n in range(9)]),
+            repeat, None),
+        ('suggest', lambda: tracker.suggest(existing_title[:2]), repeat, None),
+        ('GET /suggest', lambda: client.get('/suggest', query_string={'q': existing_title.split()[-1][:3]}), repeat, None),
+        ('get_book_details', lambda: tracker.get_book_details(size // 2), repeat, None),
+        ('get_update_logs', lambda: tracker.get_update_logs(job_id, limit=10), repeat, None),
+        ('get_update_job_status', lambda: tracker.get_update_job_status(job_id), repeat, None),
+        ('add_book_simple', lambda: tracker.add_book_simple('벤치마크 단건 추가'), repeat, None),
+        ('update_book_details', lambda: tracker.update_book_details(1, updated_info), repeat, None),
+        (f"bulk_add_books_safe({args.bulk_batch})", tracker.bulk_add_books_safe, heavy_repeat, new_titles),
+        ('delete_book', tracker.delete_book, repeat, lambda i: size - i),
+        ('GET /', lambda _: client.get('/'), heavy_repeat, cold),
+        ('GET /books', lambda _: client.get('/books'), heavy_repeat, cold),
+        ('GET /books (cached)', lambda: client.get('/books'), repeat, None),
+        ('GET /books (304)', lambda: client.get('/books', headers={'If-None-Match': books_etag}), repeat, None),
+        ('GET /export.csv', lambda: client.get('/export.csv').get_data(), heavy_repeat, None),
+        ('GET /export.jsonl (gzip)', lambda: client.get('/export.jsonl', headers={'Accept-Encoding': 'gzip'}).get_data(),
+         heavy_repeat, None),
+        ('GET /update_status/<job>', lambda: client.get(f"/update_status/{job_id}"), repeat, None),
+        ('GET /update_logs/<job>', lambda: client.get(f"/update_logs/{job_id}?limit=20"), repeat, None),
+    ]
+
+    results = []
+    for name, func, count, setup in cases:
+        if args.only and not any(token in name for token in args.only):
+            continue
+        if setup is None:
+            func()  # 워밍업 (SQLite 페이지 캐시, Jinja 템플릿 컴파일)
+        latencies, wall = _measure(func, count, setup)
+        results.append(summarize(f"{name}@{size}", latencies, wall, size=size, operation=name))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='데이터 계층 벤치마크 (합성 SQLite 도서관)')
+    parser.add_argument('--sizes', default='1000,10000', help='쉼표로 구분한 도서 수 (예: 1000,10000,100000)')
+    parser.add_argument('--repeat', type=int, default=9, help='작업별 반복 횟수')
+    parser.add_argument('--bulk-batch', type=int, default=50, help='bulk_add_books_safe 호출당 제목 수')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='생성한 합성 도서관 보관 위치')
+    parser.add_argument('--rebuild', action='store_true', help='캐시된 합성 도서관을 다시 생성')
+    parser.add_argument('--only', default='', help='이름에 포함된 작업만 실행 (쉼표로 구분)')
+    parser.add_argument('--json', dest='json_path', help='결과 JSON 저장 경로')
+    parser.add_argument('--verbose', action='store_true', help='앱 로그 출력 표시')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    args.only = [token.strip() for token in args.only.split(',') if token.strip()]
+
+    workdir = tempfile.mkdtemp(prefix='bookbench-')
+    app_module = import_app(workdir, args.verbose)
+
+    results, memory = [], []
+    try:
+        for size in sizes:
+            print(f"[{size}권]")
+            template_path = cached_library(app_module, args.cache_dir, size, args.seed, args.rebuild)
+            results.extend(run_size(app_module, template_path, workdir, size, args))
+            memory.append(measure_row_memory(app_module, template_path, workdir, size))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_table(results)
+
+    print(f"\n{'get_all_books 메모리 (10k권당)':<34}{'dict 행 KB':>14}{'스냅샷 KB':>14}{'비율':>8}")
+    for m in memory:
+        print(f"{m['size']:<34}{m['dict_rows_kb_per_10k']:>14.1f}{m['snapshot_kb_per_10k']:>14.1f}{m['ratio']:>8.3f}")
+
+    if args.json_path:
+        params = dict(vars(args), sizes=sizes)
+        write_results(args.json_path, 'data', results, params, memory=memory)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
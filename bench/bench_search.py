@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""검색 경로 벤치마크 - 스텁 API 서버를 대상으로 처리량과 p50/p95/p99 지연시간 측정
+
+    python bench/bench_search.py --latency-ms 50 --jitter-ms 20 --concurrency 4
+    python bench/bench_search.py --scenarios title,isbn --json bench_output.json
+
+측정 시나리오:
+    title       search_book_info (제목 검색, 한국어/영어 혼합)
+    isbn        search_by_isbn
+    bulk        bulk_add_books (검색 + 중복 검사 + 저장)
+    background  background_update_books (Unknown 책 상세정보 업데이트 작업)
+    batch       POST /search_batch (NDJSON 줄 도착 간격, 전체 소요시간)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import import_app, summarize, print_table, write_results
+from stub_server import StubApiServer
+
+SCENARIOS = ('title', 'isbn', 'bulk', 'background', 'batch')
+
+
+def _timed_calls(func, args_list, concurrency):
+    """args_list의 각 인자로 func를 호출하며 호출별 지연시간 측정"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run(arg):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = bool(func(arg))
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(run, args_list))
+    else:
+        for arg in args_list:
+            run(arg)
+    return latencies, time.perf_counter() - wall_start, errors
+
+
+def bench_title(app_module, workdir, stub, args):
+    tracker = app_module.BookTracker(os.path.join(workdir, 'title.db'))
+    queries = [book['title'] for book in stub.books] * args.iterations
+    latencies, wall, errors = _timed_calls(tracker.search_book_info, queries, args.concurrency)
+    return summarize('search_book_info', latencies, wall, errors, concurrency=args.concurrency)
+
+
+def bench_isbn(app_module, workdir, stub, args):
+    tracker = app_module.BookTracker(os.path.join(workdir, 'isbn.db'))
+    queries = [book['isbn13'] for book in stub.books] * args.iterations
+    latencies, wall, errors = _timed_calls(tracker.search_by_isbn, queries, args.concurrency)
+    return summarize('search_by_isbn', latencies, wall, errors, concurrency=args.concurrency)
+
+
+def bench_bulk(app_module, workdir, stub, args):
+    tracker = app_module.BookTracker(os.path.join(workdir, 'bulk.db'))
+    titles = [book['title'] for book in stub.books]
+    marks = []
+
+    wall_start = time.perf_counter()
+    results = tracker.bulk_add_books(titles, progress_callback=lambda *_: marks.append(time.perf_counter()))
+    wall = time.perf_counter() - wall_start
+
+    # 진행률 콜백 간격 = 책 한 권 처리 시간
+    marks.append(wall_start + wall)
+    latencies = [b - a for a, b in zip(marks, marks[1:])]
+    return summarize('bulk_add_books', latencies, wall, len(results['errors']),
+                     added=len(results['success']), duplicates=len(results['duplicates']))
+
+
+def bench_background(app_module, workdir, stub, args):
+    tracker = app_module.BookTracker(os.path.join(workdir, 'background.db'))
+    for book in stub.books:
+        tracker.add_book_simple(book['title'])
+
+    marks = []
+    original_log = tracker.log_update_result
+
+    def log_and_mark(*log_args, **log_kwargs):
+        marks.append(time.perf_counter())
+        return original_log(*log_args, **log_kwargs)
+
+    tracker.log_update_result = log_and_mark
+    job_id = tracker.create_update_job(len(stub.books))
+
+    wall_start = time.perf_counter()
+    tracker.background_update_books(job_id)
+    wall = time.perf_counter() - wall_start
+
+    # 로그 기록 간격 = 책 한 권 처리 시간 (작업 내 대기시간 포함)
+    starts = [wall_start] + marks[:-1]
+    latencies = [end - start for start, end in zip(starts, marks)]
+    status = tracker.get_update_job_status(job_id)
+    return summarize('background_update_books', latencies, wall, status['error_count'],
+                     success=status['success_count'])
+
+
+def bench_batch(app_module, workdir, stub, args):
+    app_module.book_tracker = app_module.BookTracker(os.path.join(workdir, 'batch.db'))
+    client = app_module.app.test_client()
+    queries = [book['title'] for book in stub.books] * args.iterations
+
+    wall_start = time.perf_counter()
+    response = client.post('/search_batch', json={'queries': queries}, buffered=False)
+    marks, errors = [], 0
+    for line in response.response:
+        item = json.loads(line)
+        if 'done' in item:
+            break
+        marks.append(time.perf_counter())
+        if not item['success']:
+            errors += 1
+    wall = time.perf_counter() - wall_start
+
+    # 줄 도착 간격 = 클라이언트가 다음 결과를 기다리는 시간
+    latencies = [b - a for a, b in zip([wall_start] + marks, marks)]
+    return summarize('POST /search_batch', latencies, wall, errors,
+                     first_line_ms=round((marks[0] - wall_start) * 1000, 3) if marks else None)
+
+
+RUNNERS = {
+    'title': bench_title,
+    'isbn': bench_isbn,
+    'bulk': bench_bulk,
+    'background': bench_background,
+    'batch': bench_batch
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='검색 경로 벤치마크 (스텁 API 서버 사용)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"쉼표로 구분 ({', '.join(SCENARIOS)})")
+    parser.add_argument('--iterations', type=int, default=3, help='title/isbn 시나리오 반복 횟수')
+    parser.add_argument('--concurrency', type=int, default=1, help='title/isbn 동시 호출 수')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--max-qps', type=int, default=0)
+    parser.add_argument('--provider-rate-limits', default='0',
+                        help="앱의 제공자별 초당 요청 제한 (PROVIDER_RATE_LIMITS, 기본 0 = 제한 없음)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_path', help='결과 JSON 저장 경로')
+    parser.add_argument('--verbose', action='store_true', help='앱 로그 출력 표시')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in RUNNERS]
+    if unknown:
+        parser.error(f"알 수 없는 시나리오: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix='bookbench-')
+    stub = StubApiServer(
+        seed=args.seed, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, max_qps=args.max_qps
+    )
+    base_url = stub.start()
+
+    os.environ['PROVIDER_RATE_LIMITS'] = args.provider_rate_limits
+    app_module = import_app(workdir, args.verbose)
+    app_module.NAVER_API_BASE_URL = base_url
+    app_module.GOOGLE_BOOKS_API_BASE_URL = base_url
+
+    print(f"스텁 서버: {base_url} (지연 {args.latency_ms}±{args.jitter_ms}ms, "
+          f"오류율 {args.error_rate}, 429 비율 {args.rate_limit_rate})\n")
+
+    results = []
+    try:
+        for name in scenarios:
+            stub.reset_stats()
+            result = RUNNERS[name](app_module, workdir, stub, args)
+            result['upstream'] = stub.stats
+            results.append(result)
+    finally:
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+
+    if args.json_path:
+        write_results(args.json_path, 'search', results, vars(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""벤치마크 공용 유틸리티 - 백분위 계산, 결과 표 출력, JSON 저장"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def import_app(workdir, verbose=False):
+    """app 모듈 임포트 - 모듈 로드 시 생성되는 기본 DB가 저장소를 오염시키지 않도록 workdir에서 임포트"""
+    # 벤치마크 표가 앱 로그에 묻히지 않도록 기본은 경고 이상만 출력
+    os.environ.setdefault('LOG_LEVEL', 'DEBUG' if verbose else 'WARNING')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import app as app_module
+    finally:
+        os.chdir(cwd)
+    return app_module
+
+
+def percentile(values, pct):
+    """nearest-rank 방식 백분위 (values는 정렬 불필요)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(scenario, latencies, wall_time, errors=0, **extra):
+    """지연시간 목록(초)을 요약 통계 dict로 변환"""
+    count = len(latencies)
+    result = {
+        'scenario': scenario,
+        'ops': count,
+        'errors': errors,
+        'wall_s': round(wall_time, 4),
+        'throughput_ops_s': round(count / wall_time, 2) if wall_time > 0 else 0.0,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3)
+    }
+    result.update(extra)
+    return result
+
+
+def print_table(results):
+    """요약 결과를 고정폭 표로 출력"""
+    header = f"{'scenario':<34}{'ops':>7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err':>6}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['scenario']:<34}{r['ops']:>7}{r['throughput_ops_s']:>10.2f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>6}")
+
+
+def git_revision():
+    """현재 커밋 해시 (git이 없으면 None)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, suite, results, params, **extra):
+    """커밋 간 비교용 JSON 결과 파일 저장 (extra는 최상위 키로 추가)"""
+    payload = {
+        'suite': suite,
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results
+    }
+    payload.update(extra)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {path}")
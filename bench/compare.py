@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""두 벤치마크 결과 JSON 비교 - 시나리오별 p50/p95 변화율 출력
+
+    python bench/compare.py baseline.json current.json --threshold 1.2
+
+threshold 배 이상 느려진 시나리오가 있으면 종료 코드 1을 반환합니다.
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    return payload, {r['scenario']: r for r in payload['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='벤치마크 결과 비교')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=1.2, help='회귀로 판단할 p50 배율')
+    args = parser.parse_args()
+
+    base_meta, base = load(args.baseline)
+    curr_meta, curr = load(args.current)
+    print(f"기준: {base_meta.get('revision')} ({base_meta.get('timestamp')})")
+    print(f"현재: {curr_meta.get('revision')} ({curr_meta.get('timestamp')})\n")
+
+    header = f"{'scenario':<40}{'p50 old':>10}{'p50 new':>10}{'ratio':>8}{'p95 old':>10}{'p95 new':>10}"
+    print(header)
+    print('-' * len(header))
+
+    regressions = []
+    for scenario, old in base.items():
+        new = curr.get(scenario)
+        if not new:
+            continue
+        ratio = new['p50_ms'] / old['p50_ms'] if old['p50_ms'] else 0.0
+        flag = ' !' if ratio >= args.threshold else ''
+        if flag:
+            regressions.append(scenario)
+        print(f"{scenario:<40}{old['p50_ms']:>10.2f}{new['p50_ms']:>10.2f}{ratio:>7.2f}x"
+              f"{old['p95_ms']:>10.2f}{new['p95_ms']:>10.2f}{flag}")
+
+    if regressions:
+        print(f"\n회귀 {len(regressions)}건 (p50 {args.threshold}배 이상): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
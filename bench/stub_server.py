@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""네이버 Books/쇼핑, Google Books API 흉내를 내는 오프라인 스텁 서버
+
+fixtures/books.json 의 도서 데이터로 각 API의 JSON 응답 형식을 그대로 재현하고,
+제공자별로 지연시간, 오류율, 429(요청 한도 초과) 응답을 주입할 수 있습니다.
+
+단독 실행:
+    python bench/stub_server.py --port 8090 --latency-ms 80 --jitter-ms 20
+
+앱을 스텁 서버에 연결:
+    NAVER_API_BASE_URL=http://127.0.0.1:8090 \\
+    GOOGLE_BOOKS_API_BASE_URL=http://127.0.0.1:8090 python app.py
+
+실행 중 설정 변경 (제공자: naver_book, naver_shop, google):
+    curl -X POST localhost:8090/__config -d '{"naver_book": {"rate_limit_rate": 0.2}}'
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'books.json')
+
+PROVIDERS = ('naver_book', 'naver_shop', 'google')
+
+DEFAULT_PROFILE = {
+    'latency_ms': 0,         # 평균 응답 지연
+    'jitter_ms': 0,          # 지연 편차 (균등 분포 ±jitter)
+    'error_rate': 0.0,       # 500 응답 비율
+    'rate_limit_rate': 0.0,  # 무작위 429 응답 비율
+    'max_qps': 0             # 초당 허용 요청 수 (0이면 무제한, 초과분은 429)
+}
+
+
+def _normalize(text):
+    """매칭용 문자열 정규화"""
+    return re.sub(r'[^\w가-힣]+', ' ', (text or '').lower()).strip()
+
+
+class StubApiServer:
+    """스레드에서 동작하는 스텁 API 서버"""
+
+    def __init__(self, fixtures_path=DEFAULT_FIXTURES, host='127.0.0.1', port=0, seed=None, **profile):
+        with open(fixtures_path, encoding='utf-8') as f:
+            self.books = json.load(f)
+
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.profiles = {name: dict(DEFAULT_PROFILE) for name in PROVIDERS}
+        self.configure(**profile)
+        self.reset_stats()
+
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def configure(self, provider=None, **profile):
+        """제공자별(또는 전체) 지연/오류 프로필 변경"""
+        unknown = set(profile) - set(DEFAULT_PROFILE)
+        if unknown:
+            raise ValueError(f"알 수 없는 설정: {', '.join(sorted(unknown))}")
+
+        targets = [provider] if provider else PROVIDERS
+        with self.lock:
+            for name in targets:
+                self.profiles[name].update(profile)
+
+    def reset_stats(self):
+        """요청 통계 초기화"""
+        with self.lock:
+            self.stats = {name: {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0} for name in PROVIDERS}
+            self._windows = {name: [0, 0] for name in PROVIDERS}  # [초, 요청 수]
+
+    def start(self):
+        """백그라운드 스레드에서 서버 시작 후 base_url 반환"""
+        server = ThreadingHTTPServer((self.host, self.port), _StubHandler)
+        server.daemon_threads = True
+        server.stub = self
+        self._server = server
+        self.port = server.server_address[1]
+
+        self._thread = threading.Thread(target=server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        """서버 종료"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ============== 장애 주입 ==============
+
+    def _inject(self, provider):
+        """지연 적용 후 주입할 오류 상태코드 반환 (없으면 None)"""
+        with self.lock:
+            profile = dict(self.profiles[provider])
+            stats = self.stats[provider]
+            stats['requests'] += 1
+
+            status = None
+            if profile['max_qps']:
+                now = int(time.time())
+                window = self._windows[provider]
+                if window[0] != now:
+                    window[0], window[1] = now, 0
+                window[1] += 1
+                if window[1] > profile['max_qps']:
+                    status = 429
+
+            roll = self.random.random()
+            if status is None and roll < profile['rate_limit_rate']:
+                status = 429
+            elif status is None and roll < profile['rate_limit_rate'] + profile['error_rate']:
+                status = 500
+
+            delay = profile['latency_ms']
+            if profile['jitter_ms']:
+                delay += self.random.uniform(-profile['jitter_ms'], profile['jitter_ms'])
+
+            if status == 429:
+                stats['rate_limited'] += 1
+            elif status:
+                stats['errors'] += 1
+            else:
+                stats['ok'] += 1
+
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return status
+
+    # ============== 응답 생성 ==============
+
+    def _match(self, query):
+        """검색어와 일치하는 도서 목록 (ISBN 우선, 다음은 제목 단어 일치)"""
+        query = (query or '').strip()
+        bare = re.sub(r'^isbn[:=]', '', query, flags=re.IGNORECASE).replace('-', '').replace(' ', '')
+        bare = re.sub(r'책$', '', bare)
+
+        if re.match(r'^\d{9}[\dX]$|^\d{13}$', bare, re.IGNORECASE):
+            return [book for book in self.books if bare in (book['isbn10'], book['isbn13'])]
+
+        words = _normalize(re.sub(r'\s책$', '', query)).split()
+        if not words:
+            return []
+
+        scored = []
+        for book in self.books:
+            title_words = set(_normalize(book['title']).split())
+            common = sum(1 for word in words if word in title_words)
+            if common:
+                scored.append((common / len(words), book))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [book for _, book in scored]
+
+    def naver_book(self, params):
+        query = params.get('query', '')
+        display = int(params.get('display', 10))
+        start = int(params.get('start', 1))
+        matches = self._match(query)
+        items = []
+        for book in matches[start - 1:start - 1 + display]:
+            items.append({
+                'title': self._highlight(book['title'], query),
+                'link': f"https://search.shopping.naver.com/book/catalog/{book['isbn13']}",
+                'image': f"https://shopping-phinf.pstatic.net/stub/{book['isbn13']}.jpg",
+                'author': '^'.join(book['authors']),
+                'discount': str(book.get('price', '')),
+                'publisher': book['publisher'],
+                'pubdate': book['published_date'].replace('-', ''),
+                'isbn': ' '.join(filter(None, (book.get('isbn10'), book['isbn13']))),  # 실제 API처럼 "ISBN10 ISBN13"
+                'description': book['description']
+            })
+        return {
+            'lastBuildDate': time.strftime('%a, %d %b %Y %H:%M:%S +0900'),
+            'total': len(matches),
+            'start': start,
+            'display': len(items),
+            'items': items
+        }
+
+    def naver_shop(self, params):
+        query = params.get('query', '')
+        display = int(params.get('display', 10))
+        items = []
+        for book in self._match(query)[:display]:
+            items.append({
+                'title': self._highlight(book['title'], query),
+                'link': f"https://search.shopping.naver.com/gate.nhn?id={book['isbn13']}",
+                'image': f"https://shopping-phinf.pstatic.net/stub/{book['isbn13']}.jpg",
+                'lprice': str(book.get('price', '')),
+                'hprice': '',
+                'mallName': '네이버',
+                'productId': book['isbn13'],
+                'productType': '1'
+            })
+            items.append({
+                'title': book['title'],
+                'link': f"https://product.kyobobook.co.kr/detail/S{book['isbn13']}",
+                'image': '',
+                'lprice': str(book.get('price', '')),
+                'hprice': '',
+                'mallName': '교보문고',
+                'productId': f"K{book['isbn13']}",
+                'productType': '2'
+            })
+        items = items[:display]
+        return {
+            'lastBuildDate': time.strftime('%a, %d %b %Y %H:%M:%S +0900'),
+            'total': len(items),
+            'start': 1,
+            'display': len(items),
+            'items': items
+        }
+
+    def google(self, params):
+        query = params.get('q', '')
+        matches = self._match(query)
+        items = []
+        for book in matches[:10]:
+            items.append({
+                'kind': 'books#volume',
+                'id': f"stub{book['isbn13']}",
+                'volumeInfo': {
+                    'title': book['title'],
+                    'authors': book['authors'],
+                    'publisher': book['publisher'],
+                    'publishedDate': book['published_date'],
+                    'description': re.sub(r'<[^>]+>', '', book['description']),
+                    'industryIdentifiers': [
+                        {'type': 'ISBN_13', 'identifier': book['isbn13']},
+                        {'type': 'ISBN_10', 'identifier': book['isbn10']}
+                    ],
+                    'imageLinks': {
+                        'thumbnail': f"http://books.google.com/books/content?id=stub{book['isbn13']}&printsec=frontcover&img=1&zoom=1"
+                    }
+                }
+            })
+        result = {'kind': 'books#volumes', 'totalItems': len(matches)}
+        if items:
+            result['items'] = items
+        return result
+
+    def _highlight(self, title, query):
+        """네이버처럼 일치 단어를 <b> 태그로 감싸기"""
+        for word in _normalize(query).split():
+            if len(word) > 1 and word in title:
+                title = title.replace(word, f"<b>{word}</b>", 1)
+        return title
+
+
+ROUTES = {
+    '/v1/search/book.json': 'naver_book',
+    '/v1/search/shop.json': 'naver_shop',
+    '/books/v1/volumes': 'google'
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # keep-alive 연결에서 헤더/본문 분리 전송 시 지연 ACK 대기 방지
+
+    def log_message(self, format, *args):
+        pass  # 벤치마크 출력이 묻히지 않도록 접근 로그 생략
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        stub = self.server.stub
+        parsed = urlparse(self.path)
+
+        if parsed.path == '/__stats':
+            with stub.lock:
+                return self._send_json(200, {'stats': stub.stats, 'profiles': stub.profiles})
+
+        provider = ROUTES.get(parsed.path)
+        if not provider:
+            return self._send_json(404, {'errorMessage': 'Not Found'})
+
+        status = stub._inject(provider)
+        if status == 429:
+            return self._send_json(429, {'errorMessage': 'Rate limit exceeded.', 'errorCode': '012'})
+        if status:
+            return self._send_json(status, {'errorMessage': 'System error.', 'errorCode': '999'})
+
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        return self._send_json(200, getattr(stub, provider)(params))
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send_json(400, {'error': 'invalid json'})
+
+        if self.path == '/__reset':
+            stub.reset_stats()
+            return self._send_json(200, {'success': True})
+
+        if self.path == '/__config':
+            try:
+                for key, value in body.items():
+                    if key in PROVIDERS:
+                        stub.configure(key, **value)
+                    else:
+                        stub.configure(**{key: value})
+            except (ValueError, TypeError) as e:
+                return self._send_json(400, {'error': str(e)})
+            return self._send_json(200, {'profiles': stub.profiles})
+
+        return self._send_json(404, {'error': 'Not Found'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='네이버/Google Books 스텁 API 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--max-qps', type=int, default=0)
+    args = parser.parse_args()
+
+    stub = StubApiServer(
+        args.fixtures, args.host, args.port, args.seed,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, max_qps=args.max_qps
+    )
+    print(f"스텁 API 서버 실행: {stub.start()} (도서 {len(stub.books)}권)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""외부 API 없이 도는 내부 로직 테스트 (임시 SQLite DB 사용)"""
+
+import sys
+import os
+import sqlite3
+import threading
+import time
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app
+from app import (BookTracker, BookRecord, LibrarySnapshot, SuggestIndex, normalize_title_key, run_migrations,
+                 SCHEMA_VERSION, MIGRATIONS, ProviderScheduler, ProviderQuotaExceeded,
+                 PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+def _create_legacy_db(db_path):
+    """마이그레이션 도입 전 init_db가 만들던 스키마 (user_version 0, books.description 컬럼에 책 소개 저장)"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            authors TEXT,
+            publisher TEXT,
+            published_date TEXT,
+            isbn TEXT,
+            description TEXT,
+            thumbnail_url TEXT,
+            purchase_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            price REAL,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO books (title, authors, publisher, isbn, description, purchase_date) VALUES (?, ?, ?, ?, ?, ?)',
+        [('클린 코드', '로버트 C. 마틴', '인사이트', '978-89-6626-247-2', '애자일 소프트웨어 장인 정신', '2024-01-01'),
+         ('사물의 투명성', 'Unknown', 'Unknown', '', '', '2024-02-01')])
+    conn.commit()
+    conn.close()
+
+def test_migrations_upgrade_legacy_db(tmp_path):
+    """버전 정보가 없는 기존 DB도 모든 단계를 적용하고 데이터를 보존"""
+    db_path = str(tmp_path / 'legacy.db')
+    _create_legacy_db(db_path)
+
+    applied = run_migrations(db_path)
+    assert applied == [name for _, name, _ in MIGRATIONS]
+    assert run_migrations(db_path) == []  # 두 번째 실행은 할 일 없음
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(books)')}
+    assert {'kyobo_link', 'title_norm', 'isbn_norm', 'cover_color'} <= columns
+    isbn_norm, description = conn.execute(
+        "SELECT isbn_norm, description FROM books WHERE title = '클린 코드'").fetchone()
+    assert isbn_norm == '9788966262472'
+    assert description is None  # book_details로 옮겨짐
+    queued = [row[0] for row in conn.execute(
+        'SELECT b.title FROM enrichment_queue q JOIN books b ON b.id = q.book_id')]
+    assert queued == ['사물의 투명성']
+    conn.close()
+
+    tracker = BookTracker(db_path)
+    books = tracker.get_all_books()
+    assert [book['title'] for book in books] == ['사물의 투명성', '클린 코드']
+    clean_code = next(book for book in books if book['title'] == '클린 코드')
+    assert tracker.get_book_details(clean_code['id'])['description'] == '애자일 소프트웨어 장인 정신'
+    assert tracker.get_book_count() == 2
+
+def _record(book_id, title, isbn='', purchase_date='2024-01-01'):
+    values = {'id': book_id, 'title': title, 'authors': '저자', 'publisher': '출판사', 'published_date': '',
+              'isbn': isbn, 'thumbnail_url': '', 'purchase_date': purchase_date, 'price': None, 'notes': '',
+              'kyobo_link': '', 'created_at': purchase_date, 'cover_color': None}
+    return BookRecord.from_row(tuple(values[field] for field in BookRecord.FIELDS))
+
+def test_suggest_index_lookup():
+    """단어 시작 접두어와 ISBN으로 찾고, 내 책을 외부 결과보다 먼저 보여줌"""
+    index = SuggestIndex()
+    index.rebuild_library(1, [_record(1, '클린 코드', '8966262473 9788966262472'), _record(2, '클린 아키텍처')],
+                          owned_keys=[(normalize_title_key('클린 코드'), 1)])
+    index.add_provider_results([
+        {'title': '클린 코드', 'isbn': '9788966262472', 'authors': '로버트 C. 마틴'},  # 이미 내 책으로 나옴
+        {'title': '클린 소프트웨어', 'isbn': '9788966260959', 'authors': '로버트 C. 마틴'},
+    ])
+
+    assert [item['title'] for item in index.lookup('클린')] == ['클린 코드', '클린 아키텍처', '클린 소프트웨어']
+    assert [item['source'] for item in index.lookup('클린')] == ['library', 'library', 'cache']
+    assert [item['book_id'] for item in index.lookup('코드')] == [1]  # 둘째 단어부터 검색
+    assert [item['book_id'] for item in index.lookup('978-89-6626-247')] == [1]
+    assert index.lookup('없는 제목') == []
+
+def test_suggest_index_incremental_update():
+    """바로 다음 버전의 쓰기만 증분 반영하고, 건너뛴 버전은 무시 (다음 조회 때 재구성)"""
+    index = SuggestIndex()
+    index.rebuild_library(1, [_record(1, '클린 코드')])
+    index.add_provider_results([{'title': '리팩터링', 'isbn': '9791162242742', 'authors': '마틴 파울러'}])
+    assert index.lookup('리팩')[0]['is_owned'] is False
+
+    index.apply_library_change(2, 2, _record(2, '리팩터링', '9791162242742'))
+    assert [(item['source'], item.get('book_id')) for item in index.lookup('리팩')] == [('library', 2)]
+
+    index.apply_library_change(3, 1, None)  # 삭제
+    assert index.lookup('클린') == []
+
+    index.apply_library_change(3, 2, None)  # 같은 버전 다시 적용 - 무시
+    index.apply_library_change(5, 2, None)  # 버전을 건너뜀 - 무시
+    assert index.library_version == 3
+    assert [item['book_id'] for item in index.lookup('리팩')] == [2]
+
+def test_provider_scheduler_limits_reserve():
+    """background 호출은 대화형 몫(reserve)을 뺀 한도, 일일 한도는 제공자 그룹이 공유"""
+    scheduler = ProviderScheduler({'naver_book': 10, 'naver_shop': 1}, {'naver': 100}, reserve=0.3)
+    interactive = {scope: limit for scope, _, limit in scheduler._limits('naver_book', PRIORITY_INTERACTIVE)}
+    background = {scope: limit for scope, _, limit in scheduler._limits('naver_book', PRIORITY_BACKGROUND)}
+    assert interactive == {'second:naver_book': 10, 'day:naver': 100}
+    assert background == {'second:naver_book': 7, 'day:naver': 70}
+    # 한도가 작아도 background가 아예 막히지는 않음
+    assert {scope: limit for scope, _, limit in scheduler._limits('naver_shop', PRIORITY_BACKGROUND)} == \
+        {'second:naver_shop': 1, 'day:naver': 70}
+    assert scheduler._limits('google', PRIORITY_INTERACTIVE) == []
+
+def test_provider_scheduler_decide():
+    """같은 구간에서 한도를 다 쓰면 초당 한도는 대기, 일일 한도는 예외 - 구간이 바뀌면 다시 가능"""
+    limits = [('second:naver_book', '1000', 2), ('day:naver', '2024-01-01', 5)]
+    assert ProviderScheduler._decide(limits, {}) == 0.0
+    assert ProviderScheduler._decide(limits, {'second:naver_book': ('1000', 1)}) == 0.0
+    assert ProviderScheduler._decide(limits, {'second:naver_book': ('999', 2)}) == 0.0
+    assert 0.0 < ProviderScheduler._decide(limits, {'second:naver_book': ('1000', 2)}) <= 1.001
+    with pytest.raises(ProviderQuotaExceeded):
+        ProviderScheduler._decide(limits, {'day:naver': ('2024-01-01', 5)})
+    assert ProviderScheduler._decide(limits, {'day:naver': ('2023-12-31', 5)}) == 0.0
+
+def test_provider_scheduler_shares_usage_through_db(tmp_path):
+    """bind한 스케줄러끼리(다른 워커) provider_quota 테이블로 사용량을 공유"""
+    db_path = str(tmp_path / 'quota.db')
+    run_migrations(db_path)
+    first = ProviderScheduler({}, {'naver': 3}, lease_size=1)
+    second = ProviderScheduler({}, {'naver': 3}, lease_size=1)
+    first.bind(db_path)
+    second.bind(db_path)
+    limits = [('day:naver', '2024-01-01', 3)]
+
+    assert first._take(limits) == 0.0
+    assert second._take(limits) == 0.0
+    assert first._take(limits) == 0.0
+    with pytest.raises(ProviderQuotaExceeded):
+        second._take(limits)
+    assert second._take([('day:naver', '2024-01-02', 3)]) == 0.0  # 다음 날은 새로 시작
+
+def test_provider_scheduler_leases_daily_quota(tmp_path):
+    """일일 예산은 lease_size개씩 받아 메모리에서 쓰고, 초당 한도는 DB에 기록하지 않음"""
+    db_path = str(tmp_path / 'lease.db')
+    run_migrations(db_path)
+    first = ProviderScheduler({}, {'naver': 5}, lease_size=3)
+    second = ProviderScheduler({}, {'naver': 5}, lease_size=3)
+    first.bind(db_path)
+    second.bind(db_path)
+    day = [('day:naver', '2024-01-01', 5)]
+
+    def db_used():
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute("SELECT used FROM provider_quota WHERE scope = 'day:naver'").fetchone()[0]
+        finally:
+            conn.close()
+
+    assert first._take(day) == 0.0
+    assert db_used() == 3  # 3개를 받아 둠
+    assert first._take(day) == 0.0 and first._take(day) == 0.0
+    assert db_used() == 3
+    assert second._take(day) == 0.0  # 남은 2개를 받음
+    assert db_used() == 5
+    with pytest.raises(ProviderQuotaExceeded):
+        first._take(day)
+    assert second._take(day) == 0.0  # 받아 둔 몫은 그대로 사용
+    with pytest.raises(ProviderQuotaExceeded):
+        second._take(day)
+
+    # background 한도는 받아 둔 몫이 남아 있어도 넘지 않음
+    third = ProviderScheduler({}, {'naver': 5}, lease_size=5)
+    third.bind(str(tmp_path / 'reserve.db'))
+    run_migrations(third.db_path)
+    assert third._take([('day:naver', '2024-01-01', 5)]) == 0.0
+    assert third._take([('day:naver', '2024-01-01', 2)]) == 0.0
+    with pytest.raises(ProviderQuotaExceeded):
+        third._take([('day:naver', '2024-01-01', 2)])
+    assert third._take([('day:naver', '2024-01-01', 5)]) == 0.0  # 대화형 호출은 남은 몫을 계속 사용
+
+    second_limits = [('second:naver_book', '1000', 1)]
+    assert second._take(second_limits) == 0.0
+    assert second._take(second_limits) > 0.0
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM provider_quota WHERE scope LIKE 'second:%'").fetchone()[0] == 0
+    conn.close()
+
+def test_continuation_token_round_trip():
+    """토큰은 이미 시도한 책 id와 요청 수만 담고, 잘못된 토큰은 ValueError"""
+    token = app._encode_continuation({5, 3}, batch=2)
+    assert app._decode_continuation(token) == ({3, 5}, 2)
+    assert app._decode_continuation(None) == (set(), 0)
+    for bad in ('not-a-token', app._encode_continuation(set())[:-2] + '!!'):
+        with pytest.raises(ValueError):
+            app._decode_continuation(bad)
+
+def test_next_continuation():
+    """실패/진행 중인 책은 skip에 남기고, 남은 후보가 없으면 None"""
+    candidates = [{'id': book_id} for book_id in (4, 2, 9, 7)]
+    token = app._next_continuation(candidates, finished={4, 2}, failed_ids={2}, running_ids={9},
+                                   skip_ids={1}, batch=3)
+    assert app._decode_continuation(token) == ({1, 2, 9}, 3)
+    assert app._next_continuation(candidates, finished={4, 2, 7}, failed_ids=set(), running_ids={9},
+                                  skip_ids=set(), batch=1) is None
+
+def test_enrich_until_deadline_waits_for_inflight(monkeypatch):
+    """마감 때 진행 중인 조회는 유예 시간만큼 기다리고, 그래도 안 끝난 책은 진행 중으로 반환"""
+    release = threading.Event()
+
+    def fake_update(book):
+        if book['id'] == 2:
+            release.wait(5)  # 유예 시간 안에 끝나지 않는 조회
+        return 'success', {'id': book['id']}
+
+    monkeypatch.setattr(app, '_update_book_from_search', fake_update)
+    monkeypatch.setattr(app, 'SMART_UPDATE_GRACE_SECONDS', 0.2)
+    queue = [{'id': book_id} for book_id in (1, 2, 3)]
+    try:
+        results, finished, running = app._enrich_until_deadline(queue, time.monotonic() + 0.3, concurrency=3)
+    finally:
+        release.set()
+    assert finished == {1, 3}
+    assert running == {2}
+    assert sorted(item['id'] for item in results['success']) == [1, 3]
+
+def test_pending_unknown_books_follow_queue_priority(tmp_path, monkeypatch):
+    """스마트/대량 업데이트 후보는 보강 대기열의 우선순위 순서 (요청한 책 먼저, 여러 번 실패한 책은 맨 뒤)"""
+    tracker = BookTracker(str(tmp_path / 'queue.db'))
+    monkeypatch.setattr(app, 'book_tracker', tracker)
+    first, second, third = (tracker.add_book_simple(title) for title in ('첫째 책', '둘째 책', '셋째 책'))
+    tracker.prioritize_enrichment(third)
+    assert [book['id'] for book in app._pending_unknown_books(set())] == [third, first, second]
+    assert [book['id'] for book in app._pending_unknown_books({third})] == [first, second]
+
+    for _ in range(app.ENRICH_FAILING_AFTER_ATTEMPTS):
+        tracker.record_enrichment_failure(third, '검색 결과 없음')
+    assert [book['id'] for book in app._pending_unknown_books(set())] == [first, second, third]
+
+def test_library_snapshot_apply_change():
+    """쓰기를 제자리에 반영해도 구매일 최신순을 유지하고, 이미 받아 간 튜플은 바뀌지 않음"""
+    snapshot = LibrarySnapshot(1, [_record(3, '셋', purchase_date='2024-03-01'),
+                                   _record(2, '둘', purchase_date='2024-02-01'),
+                                   _record(1, '하나', purchase_date='2024-01-01')])
+    before = snapshot.records
+
+    assert snapshot.apply_change(2, 4, _record(4, '넷', purchase_date='2024-04-01'))
+    assert snapshot.apply_change(3, 2, _record(2, '둘 (수정)', purchase_date='2024-02-01'))
+    assert snapshot.apply_change(4, 3, None)
+    assert [record.title for record in snapshot.records] == ['넷', '둘 (수정)', '하나']
+    assert [record.id for record in before] == [3, 2, 1]
+    assert snapshot.version == 4
+
+    # 가장 최근 책보다 오래된 구매일의 새 책은 제자리 반영 불가 -> 다시 읽도록 False
+    assert not snapshot.apply_change(5, 5, _record(5, '다섯', purchase_date='2023-12-01'))
+    assert snapshot.version == 4
+
+def _book_info(title, isbn):
+    return {'title': title, 'authors': '로버트 C. 마틴', 'publisher': '인사이트', 'published_date': '2013-12-24',
+            'isbn': isbn, 'thumbnail_url': '', 'kyobo_link': ''}
+
+def test_owned_books_match_each_naver_isbn(tmp_path):
+    """네이버 형식("ISBN10 ISBN13")으로 저장한 책도 어느 한 ISBN으로 보유/중복 판정"""
+    tracker = BookTracker(str(tmp_path / 'owned.db'))
+    book_id = tracker.add_book(_book_info('클린 코드', '8966260950 9788966260959'))
+
+    candidates = tracker.annotate_owned([{'title': '다른 제목', 'isbn': '8966260950 9788966260959'},
+                                         {'title': '다른 제목', 'isbn': '9788966260959'},
+                                         {'title': '다른 제목', 'isbn': '896-626-095-0'},
+                                         {'title': '다른 제목', 'isbn': '9788966262472'}])
+    assert [book['owned_book_id'] for book in candidates] == [book_id, book_id, book_id, None]
+    assert tracker.check_duplicate('다른 제목', '9788966260959')
+    assert tracker.check_duplicate('다른 제목', '8966260950 9788966260959')
+    assert not tracker.check_duplicate('다른 제목', '9788966262472')
+
+    # ISBN이 바뀌면 예전 키는 지워지고, 책을 지우면 키도 지워짐
+    tracker.update_book_details(book_id, _book_info('클린 코드', '8966262473 9788966262472'))
+    assert not tracker.check_duplicate('다른 제목', '9788966260959')
+    assert tracker.check_duplicate('다른 제목', '9788966262472')
+    tracker.delete_book(book_id)
+    assert not tracker.check_duplicate('다른 제목', '8966262473')
+
+def test_book_isbns_migration_backfills_joined_keys(tmp_path):
+    """isbn_norm에 두 ISBN을 이어 붙여 저장했던 DB도 마이그레이션 후 ISBN별로 찾음"""
+    db_path = str(tmp_path / 'joined.db')
+    conn = sqlite3.connect(db_path)
+    for version, _, step in MIGRATIONS:
+        if version < 14:
+            step(conn.cursor())
+    conn.execute("INSERT INTO books (title, authors, isbn, isbn_norm) VALUES ('클린 코드', '로버트 C. 마틴', ?, ?)",
+                 ('8966260950 9788966260959', '89662609509788966260959'))
+    conn.execute('PRAGMA user_version = 13')
+    conn.commit()
+    conn.close()
+
+    assert 'book_isbns' in run_migrations(db_path)
+    tracker = BookTracker(db_path)
+    assert tracker.annotate_owned([{'title': '', 'isbn': '9788966260959'}])[0]['is_owned']
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT isbn_norm FROM books').fetchone()[0] == '9788966260959'
+    conn.close()
+
+def test_suggest_marks_cached_result_for_owned_multi_isbn_book(tmp_path):
+    """"ISBN10 ISBN13"으로 저장한 내 책과 ISBN이 같은 외부 검색 결과는 보유로 표시"""
+    tracker = BookTracker(str(tmp_path / 'suggest.db'))
+    book_id = tracker.add_book(_book_info('클린 코드', '8966260950 9788966260959'))
+    tracker.get_all_books()
+    tracker._suggest_index.library_version = None  # DB에서 다시 만들도록
+    tracker.suggest('클린')
+    tracker._suggest_index.add_provider_results([
+        {'title': 'Clean Code 클린 코드 (개정판)', 'isbn': '8966260950', 'authors': '로버트 C. 마틴'},
+    ])
+    cached = [item for item in tracker.suggest('clean') if item['source'] == 'cache']
+    assert [(item['is_owned'], item['owned_book_id']) for item in cached] == [(True, book_id)]
+
+def test_save_payload_reads_through_to_stored_payload(tmp_path, monkeypatch):
+    """이 워커 메모리에 없는 원본(다른 워커에서 검색)은 book_payloads에 저장된 같은 원본을 복사"""
+    monkeypatch.setattr(app, 'raw_payloads', app.RawPayloadCache())
+    tracker = BookTracker(str(tmp_path / 'payloads.db'))
+    item = {'title': '클린 코드', 'author': '로버트 C. 마틴', 'isbn': '8966260950 9788966260959'}
+    info = dict(_book_info('클린 코드', '8966260950 9788966260959'), payload_key=app.raw_payloads.put('naver_book', item))
+    first = tracker.add_book(info)
+
+    monkeypatch.setattr(app, 'raw_payloads', app.RawPayloadCache())  # 다른 워커
+    second = tracker.add_book(info)
+    third = tracker.add_book(dict(info, payload_key='naver_book:0000000000000000'))
+
+    conn = sqlite3.connect(tracker.db_path)
+    rows = dict(conn.execute('SELECT book_id, payload FROM book_payloads').fetchall())
+    conn.close()
+    assert set(rows) == {first, second}
+    assert rows[first] == rows[second]
+    assert third not in rows